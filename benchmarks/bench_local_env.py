@@ -0,0 +1,114 @@
+"""Benchmark the fast local-environment mode against the exact ChemEnv mode.
+
+For the bundled test structures (SrTiO3, InCuS2, TlCr5Se8, N2), as supercells of
+the requested sizes with their full symmetry ("high") and with every site slightly
+displaced ("low", all sites inequivalent), the script times
+`LocalEnvAnalyzer.get_local_environments` in the "exact" and the "fast" mode and
+reports how often the fast mode finds the same neighbours as the exact one. Both
+modes use the native SMILES backend, whose SMILES only depend on the species of
+the centre and its neighbours, so a site agrees if its SMILES are identical.
+
+.. code-block:: bash
+
+        python benchmarks/bench_local_env.py
+        python benchmarks/bench_local_env.py --sizes 5 50 200 --symmetries low
+"""
+
+import argparse
+import itertools
+import sys
+import warnings
+from collections import Counter
+
+from bench_representations import lower_symmetry, make_supercell
+from common import (
+    BASELINE_DIR,
+    add_common_arguments,
+    finish,
+    load_structures,
+    print_result,
+    time_call,
+)
+from xtal2txt.local_env import LocalEnvAnalyzer
+from xtal2txt.profiling import track_memory
+
+MODES = ("exact", "fast")
+
+
+def site_environments(envs: list) -> Counter:
+    """Multiset of (site, Wyckoff label, SMILES) of the environments of a structure."""
+    return Counter((env["Site"], env["Wyckoff Label"], env["SMILES"]) for env in envs)
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Measure all requested (structure, symmetry, size, mode) cases."""
+    results = {}
+    analyzers = {
+        mode: LocalEnvAnalyzer(smiles_backend="native", mode=mode) for mode in MODES
+    }
+    # set up the chemenv engine before timing
+    analyzers["exact"].get_local_environments(next(iter(load_structures().values())))
+
+    n_sites, n_agreeing, n_cases, n_identical = 0, 0, 0, 0
+    for (name, structure), symmetry, size in itertools.product(
+        load_structures().items(), args.symmetries, args.sizes
+    ):
+        cell = make_supercell(structure, size)
+        if symmetry == "low":
+            cell = lower_symmetry(cell)
+        environments = {}
+        for mode, analyzer in analyzers.items():
+            case = f"{name}/{symmetry}/{len(cell)}/{mode}"
+            envs, unknown_sites, _ = analyzer.get_local_environments(cell)
+            environments[mode] = site_environments(envs)
+            seconds = time_call(
+                lambda: analyzer.get_local_environments(cell), args.repeat
+            )
+            with track_memory() as usage:
+                analyzer.get_local_environments(cell)
+            results[case] = {
+                "seconds": seconds,
+                "peak_bytes": usage["peak_traced_bytes"],
+                "sites": sum(environments[mode].values()) + len(unknown_sites),
+            }
+            print_result(case, results[case])
+
+        exact, fast = environments["exact"], environments["fast"]
+        agreeing = sum((exact & fast).values())
+        total = results[f"{name}/{symmetry}/{len(cell)}/exact"]["sites"]
+        results[f"{name}/{symmetry}/{len(cell)}/fast"]["agreement"] = (
+            agreeing / total if total else 1.0
+        )
+        n_sites += total
+        n_agreeing += agreeing
+        n_cases += 1
+        n_identical += exact == fast
+
+    print(
+        f"fast mode agrees with the exact mode on {n_agreeing}/{n_sites} inequivalent "
+        f"sites ({n_agreeing / max(n_sites, 1):.1%}), "
+        f"identical for {n_identical}/{n_cases} structures"
+    )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser, BASELINE_DIR / "local_env.json")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[5, 50],
+        help="Approximate number of sites of the supercells.",
+    )
+    parser.add_argument(
+        "--symmetries", nargs="+", choices=["high", "low"], default=["high", "low"]
+    )
+    args = parser.parse_args(argv)
+    warnings.filterwarnings("ignore")
+    return finish(args, run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Benchmark the representation generators on synthetic supercells.
+
+Supercells of the bundled test structures (SrTiO3, InCuS2, TlCr5Se8, N2) are built
+with roughly 5 to 2,000 sites. The "high" symmetry variant is the plain supercell,
+the "low" symmetry variant has every site displaced by a small random vector.
+Every `RepresentationType` is timed on every cell and the peak traced allocation
+of one additional call is recorded.
+
+.. code-block:: bash
+
+        # compare with benchmarks/baselines/representations.json
+        python benchmarks/bench_representations.py
+        # record a new baseline
+        python benchmarks/bench_representations.py --save-baseline
+        # a quick subset
+        python benchmarks/bench_representations.py --sizes 5 50 --reps cif_p1 zmatrix
+
+Once a representation exceeds `--max-seconds` on a cell, it is not repeated and larger
+cells of the same structure and symmetry are skipped for it.
+"""
+
+import argparse
+import itertools
+import sys
+import time
+import warnings
+
+import numpy as np
+from pymatgen.core import Structure
+
+from common import (
+    BASELINE_DIR,
+    add_common_arguments,
+    finish,
+    load_structures,
+    print_result,
+    time_call,
+)
+from xtal2txt.core import TextRep
+
+DEFAULT_SIZES = [5, 50, 200, 500, 2000]
+
+
+def make_supercell(structure: Structure, n_sites: int) -> Structure:
+    """Build a near-cubic supercell with approximately `n_sites` sites (at least the unit cell)."""
+    cells = max(1, round(n_sites / len(structure)))
+    # hand out the prime factors of the cell count, largest first, to the currently shortest axis
+    factors = [1, 1, 1]
+    for prime in _prime_factors(cells)[::-1]:
+        axis = min(range(3), key=lambda i: factors[i] * structure.lattice.abc[i])
+        factors[axis] *= prime
+    return structure * factors
+
+
+def _prime_factors(n: int) -> list:
+    """Return the prime factors of n in ascending order."""
+    factors = []
+    divisor = 2
+    while n > 1:
+        while n % divisor == 0:
+            factors.append(divisor)
+            n //= divisor
+        divisor += 1
+    return factors
+
+
+def lower_symmetry(structure: Structure, distance: float = 0.05, seed: int = 0):
+    """Displace every site by a random vector of length `distance` (in angstrom)."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((len(structure), 3))
+    vectors *= distance / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return Structure(
+        structure.lattice,
+        structure.species,
+        structure.cart_coords + vectors,
+        coords_are_cartesian=True,
+    )
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Measure all requested (structure, symmetry, size, representation) cases."""
+    results = {}
+    reps = args.reps or TextRep.get_available_representations()
+
+    # load lazy backends (SLICES/m3gnet, chemenv tables) before timing
+    warmup = TextRep(next(iter(load_structures().values())))
+    warmup.get_requested_text_reps(reps)
+
+    for (name, structure), symmetry in itertools.product(
+        load_structures().items(), args.symmetries
+    ):
+        too_slow = set()
+        for size in args.sizes:
+            cell = make_supercell(structure, size)
+            if symmetry == "low":
+                cell = lower_symmetry(cell)
+            for rep in reps:
+                case = f"{name}/{symmetry}/{size}/{rep}"
+                if rep in too_slow:
+                    continue
+                result = measure(
+                    cell, rep, args.decimal_places, args.repeat, args.max_seconds
+                )
+                result["n_sites"] = len(cell)
+                results[case] = result
+                print_result(f"{case} ({len(cell)} sites)", result)
+                if result["seconds"] is None or result["seconds"] > args.max_seconds:
+                    too_slow.add(rep)
+    return results
+
+
+def measure(
+    cell: Structure, rep: str, decimal_places: int, repeat: int, max_seconds: float
+) -> dict:
+    """Time a representation and record its peak traced allocation."""
+    text_rep = TextRep(cell)
+
+    def generate():
+        return text_rep.get_requested_text_reps(rep, decimal_places)
+
+    start = time.perf_counter()
+    if generate() is None:
+        return {"seconds": None, "peak_bytes": None, "error": text_rep.errors.get(rep)}
+    seconds = time.perf_counter() - start
+    # slow cases are not repeated, their run time is far above the timer noise
+    if repeat > 1 and seconds < max_seconds:
+        seconds = time_call(generate, repeat)
+    # tracemalloc slows down the call, memory is measured in a separate call
+    text_rep.get_requested_text_reps(rep, decimal_places, profile_memory=True)
+    return {
+        "seconds": seconds,
+        "peak_bytes": text_rep.memory_usage[rep]["peak_traced_bytes"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser, BASELINE_DIR / "representations.json")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--symmetries", nargs="+", default=["high", "low"], choices=["high", "low"]
+    )
+    parser.add_argument(
+        "--reps", nargs="+", choices=TextRep.get_available_representations()
+    )
+    parser.add_argument("--decimal-places", type=int, default=2)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=5.0,
+        help="Skip larger cells once a representation takes longer than this.",
+    )
+    args = parser.parse_args(argv)
+    # e.g. the non-unique site labels of supercell CIFs
+    warnings.filterwarnings("ignore")
+    return finish(args, run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Benchmark the throughput of the xtal2txt tokenizers.
+
+The corpus consists of the representations of the bundled test structures
+(SrTiO3, InCuS2, TlCr5Se8, N2), each tokenizer is fed the representation it was
+built for. For every tokenizer, with and without `special_num_token`, the script
+times `tokenize`, `encode` and `decode` called once per sequence ("single") and
+the batched `__call__`/`batch_decode` ("batch") and reports tokens/s and
+sequences/s together with the peak traced allocation of one additional pass.
+
+.. code-block:: bash
+
+        # compare with benchmarks/baselines/tokenizers.json
+        python benchmarks/bench_tokenizers.py
+        # record a new baseline
+        python benchmarks/bench_tokenizers.py --save-baseline
+        # a quick subset
+        python benchmarks/bench_tokenizers.py --tokenizers CifTokenizer --copies 5
+"""
+
+import argparse
+import sys
+import warnings
+from typing import Callable, Dict, List
+
+from common import (
+    BASELINE_DIR,
+    add_common_arguments,
+    finish,
+    load_structures,
+    print_result,
+    time_call,
+)
+from xtal2txt.core import TextRep
+from xtal2txt.profiling import track_memory
+from xtal2txt.tokenizer import (
+    CifTokenizer,
+    CompositionTokenizer,
+    CrysllmTokenizer,
+    RobocrysTokenizer,
+    SliceTokenizer,
+    SmilesTokenizer,
+)
+
+#: Tokenizer class and the representation it tokenizes.
+TOKENIZERS = {
+    "CifTokenizer": (CifTokenizer, "cif_p1"),
+    "SliceTokenizer": (SliceTokenizer, "slices"),
+    "CompositionTokenizer": (CompositionTokenizer, "composition"),
+    "CrysllmTokenizer": (CrysllmTokenizer, "crystal_text_llm"),
+    "SmilesTokenizer": (SmilesTokenizer, "local_env"),
+    "RobocrysTokenizer": (RobocrysTokenizer, "robocrys_rep"),
+}
+
+
+def build_corpus(rep_names: List[str], copies: int) -> Dict[str, List[str]]:
+    """Generate the representations of the test structures, each repeated `copies` times."""
+    corpus = {rep_name: [] for rep_name in rep_names}
+    for structure in load_structures().values():
+        reps = TextRep(structure).get_requested_text_reps(rep_names)
+        for rep_name, value in reps.items():
+            if value is not None:
+                corpus[rep_name].append(value)
+    return {rep_name: texts * copies for rep_name, texts in corpus.items()}
+
+
+def operations(tokenizer, texts: List[str]) -> Dict[str, Callable]:
+    """The timed operations of a tokenizer on a list of texts."""
+    token_ids = [tokenizer.encode(text) for text in texts]
+    return {
+        "single/tokenize": lambda: [tokenizer.tokenize(text) for text in texts],
+        "single/encode": lambda: [tokenizer.encode(text) for text in texts],
+        "single/decode": lambda: [tokenizer.decode(ids) for ids in token_ids],
+        "batch/encode": lambda: tokenizer(texts)["input_ids"],
+        "batch/decode": lambda: tokenizer.batch_decode(token_ids),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Measure all requested (tokenizer, number mode, operation) cases."""
+    results = {}
+    names = args.tokenizers or list(TOKENIZERS)
+    corpus = build_corpus([TOKENIZERS[name][1] for name in names], args.copies)
+
+    for name in names:
+        tokenizer_class, rep_name = TOKENIZERS[name]
+        texts = corpus[rep_name]
+        if not texts:
+            print(f"No {rep_name} representations, skipping {name}", file=sys.stderr)
+            continue
+        # RobocrysTokenizer is a BPE tokenizer without a number mode
+        modes = [False] if tokenizer_class is RobocrysTokenizer else [False, True]
+        for special_num_token in modes:
+            if tokenizer_class is RobocrysTokenizer:
+                tokenizer = tokenizer_class()
+            else:
+                tokenizer = tokenizer_class(special_num_token=special_num_token)
+            n_tokens = sum(len(tokenizer.encode(text)) for text in texts)
+            mode = "num" if special_num_token else "default"
+            for operation, func in operations(tokenizer, texts).items():
+                case = f"{name}/{mode}/{operation}"
+                seconds = time_call(func, args.repeat)
+                with track_memory() as usage:
+                    func()
+                result = {
+                    "seconds": seconds,
+                    "peak_bytes": usage["peak_traced_bytes"],
+                    "sequences_per_second": len(texts) / seconds,
+                    "tokens_per_second": n_tokens / seconds,
+                }
+                results[case] = result
+                print_result(case, result)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_common_arguments(parser, BASELINE_DIR / "tokenizers.json")
+    parser.add_argument("--tokenizers", nargs="+", choices=list(TOKENIZERS))
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=25,
+        help="Number of copies of each representation in the corpus.",
+    )
+    args = parser.parse_args(argv)
+    warnings.filterwarnings("ignore")
+    return finish(args, run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Shared helpers of the xtal2txt benchmark scripts.
+
+Each benchmark produces a dictionary mapping a case id to its measurements
+(`seconds`, the median wall-clock time, and `peak_bytes`, the peak traced allocation).
+Results can be stored as a baseline in `benchmarks/baselines/` and later runs are
+compared against it, cases that got slower or use more memory than the baseline
+by more than a threshold are reported as regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from pymatgen.core import Structure
+
+BENCHMARK_DIR = Path(__file__).parent
+BASELINE_DIR = BENCHMARK_DIR / "baselines"
+DATA_DIR = BENCHMARK_DIR.parent / "tests" / "data"
+
+#: The bundled test structures the benchmarks are built from.
+STRUCTURE_FILES = {
+    "SrTiO3": "SrTiO3_p1.cif",
+    "InCuS2": "InCuS2_p1.cif",
+    "TlCr5Se8": "TlCr5Se8_p1.cif",
+    "N2": "N2_p1.cif",
+}
+
+
+def load_structures() -> Dict[str, Structure]:
+    """Load the bundled test structures."""
+    return {
+        name: Structure.from_file(str(DATA_DIR / filename))
+        for name, filename in STRUCTURE_FILES.items()
+    }
+
+
+def time_call(func: Callable, repeat: int = 3) -> float:
+    """Return the median wall-clock time of `repeat` calls of func."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def environment() -> dict:
+    """Describe the machine and library versions a baseline was recorded with."""
+    from xtal2txt.cache import get_library_versions
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": get_library_versions(),
+    }
+
+
+def save_baseline(path: Path, results: Dict[str, dict]) -> None:
+    """Store results as baseline."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {"environment": environment(), "results": results},
+            file,
+            indent=1,
+            sort_keys=True,
+        )
+        file.write("\n")
+
+
+def load_baseline(path: Path) -> Dict[str, dict]:
+    """Load the results of a baseline."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def compare(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    threshold: float = 1.25,
+    min_seconds: float = 0.005,
+) -> List[str]:
+    """
+    Compare results with a baseline.
+
+    Args:
+        results: Results of the current run.
+        baseline: Results of the baseline.
+        threshold: Ratio to the baseline above which a case is a regression.
+        min_seconds: Time differences below this are considered noise.
+
+    Returns:
+        List[str]: Descriptions of the regressions, cases that succeeded in the baseline
+            and fail now included.
+    """
+    regressions = []
+    for case, current in sorted(results.items()):
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        if current.get("seconds") is None and reference.get("seconds") is not None:
+            regressions.append(f"{case}: ok -> {current.get('error') or 'failed'}")
+            continue
+        for metric, floor in [("seconds", min_seconds), ("peak_bytes", 1024**2)]:
+            new, old = current.get(metric), reference.get(metric)
+            if new is None or old is None:
+                continue
+            if new > old * threshold and new - old > floor:
+                regressions.append(
+                    f"{case}: {metric} {old:.4g} -> {new:.4g} ({new / old:.2f}x)"
+                )
+    return regressions
+
+
+def add_common_arguments(parser: argparse.ArgumentParser, baseline: Path) -> None:
+    """Add the options shared by all benchmarks to an argument parser."""
+    parser.add_argument(
+        "--baseline", type=Path, default=baseline, help="Path of the baseline."
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Ratio to the baseline above which a case is flagged as regression.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed calls per case (median)."
+    )
+    parser.add_argument("--output", type=Path, help="Also write the results here.")
+
+
+def finish(args: argparse.Namespace, results: Dict[str, dict]) -> int:
+    """Store or compare the results according to the command line arguments."""
+    if args.output:
+        save_baseline(args.output, results)
+    if args.save_baseline:
+        # failed cases have nothing to compare against
+        failed = sorted(case for case, result in results.items() if "error" in result)
+        save_baseline(
+            args.baseline,
+            {case: result for case, result in results.items() if "error" not in result},
+        )
+        print(
+            f"Baseline written to {args.baseline}, {len(failed)} failed cases left out"
+        )
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, nothing to compare.")
+        return 0
+    regressions = compare(results, load_baseline(args.baseline), args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions (threshold {args.threshold}x)")
+    return 1 if regressions else 0
+
+
+def print_result(case: str, result: Optional[dict]) -> None:
+    """Print the result of a single case as it finishes."""
+    seconds = result.get("seconds")
+    peak = result.get("peak_bytes")
+    timing = f"{seconds:10.4f} s" if seconds is not None else "    failed  "
+    memory = f"{peak / 1024**2:10.2f} MiB" if peak is not None else ""
+    print(f"{case:<60} {timing} {memory}", file=sys.stderr)
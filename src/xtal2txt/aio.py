@@ -0,0 +1,169 @@
+"""Asyncio API for converting and decoding structures without blocking the event loop.
+
+Conversions and decodings are offloaded to an executor shared by the whole process.
+Its number of workers bounds how many of them run at the same time, further calls
+wait in its queue. Cancelling a call that is still queued removes it from the queue,
+a call that already runs completes in the background and its result is discarded.
+
+.. code-block:: python
+
+        from xtal2txt import aio
+
+        aio.configure_executor(max_workers=4)
+        reps = await text_rep.aget_requested_text_reps(["cif_p1", "slices"])
+        async for text_rep, reps, error in aio.stream_text_reps(structures, ["cif_p1", "slices"]):
+            ...
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Union,
+)
+
+_executor: Optional[Executor] = None
+_owns_executor = False
+_executor_lock = threading.Lock()
+
+
+def configure_executor(
+    max_workers: Optional[int] = None, executor: Optional[Executor] = None
+) -> Executor:
+    """
+    Set the executor the async API offloads to.
+
+    The previous executor is shut down if it was created by this module, the calls
+    already submitted to it still complete.
+
+    Args:
+        max_workers: Number of threads of a new thread pool, i.e. the maximum number
+            of concurrent calls. Defaults to the `ThreadPoolExecutor` default.
+        executor: Executor to use instead of a new thread pool. It is not shut down
+            by this module.
+
+    Returns:
+        Executor: The executor used from now on.
+    """
+    global _executor, _owns_executor
+    owns = executor is None
+    if owns:
+        executor = ThreadPoolExecutor(max_workers, thread_name_prefix="xtal2txt-aio")
+    with _executor_lock:
+        previous, owned_previous = _executor, _owns_executor
+        _executor, _owns_executor = executor, owns
+    if previous is not None and owned_previous and previous is not executor:
+        previous.shutdown(wait=False)
+    return executor
+
+
+def get_executor() -> Executor:
+    """Return the executor of the async API, a default thread pool is created on the first call."""
+    with _executor_lock:
+        executor = _executor
+    return executor if executor is not None else configure_executor()
+
+
+async def run_in_executor(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run `func(*args, **kwargs)` in the shared executor and wait for its result.
+
+    Args:
+        func: Function to call.
+        *args: Positional arguments to pass to func.
+        **kwargs: Keyword arguments to pass to func.
+
+    Returns:
+        Result of func.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def stream_text_reps(
+    structures: Union[Iterable, AsyncIterable],
+    requested_reps: Union[str, list],
+    max_pending: Optional[int] = None,
+    **kwargs,
+) -> AsyncIterator[tuple]:
+    """
+    Convert the structures of an (async) iterable, yielding the results as they complete.
+
+    At most `max_pending` structures are read ahead and converted at a time, so the
+    iterable may be unbounded. When the consumer stops iterating or is cancelled,
+    the pending conversions are cancelled. A structure that can not be converted, e.g.
+    an invalid CIF, does not end the stream, its exception is yielded instead.
+
+    Args:
+        structures: TextRep objects or inputs of `TextRep.from_input` (Structure,
+            CIF file or CIF string).
+        requested_reps: Representations to generate, see `TextRep.get_requested_text_reps`.
+        max_pending: Maximum number of structures converted at a time. Defaults to 8.
+        **kwargs: Further arguments of `TextRep.get_requested_text_reps`.
+
+    Yields:
+        tuple: The TextRep of a structure (with its `errors` and `timeouts`), its
+            representations and None, in the order the conversions complete. If the
+            conversion failed, the item of `structures`, None and the exception.
+    """
+    # TextRep uses this module for its async methods
+    from xtal2txt.core import TextRep
+
+    async def convert(item: Any) -> tuple:
+        text_rep = (
+            item
+            if isinstance(item, TextRep)
+            else await run_in_executor(TextRep.from_input, item)
+        )
+        return text_rep, await text_rep.aget_requested_text_reps(
+            requested_reps, **kwargs
+        )
+
+    max_pending = max_pending or 8
+    items = _aiter(structures)
+    pending: Dict[asyncio.Future, Any] = {}
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(convert(item))] = item
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = pending.pop(task)
+                try:
+                    text_rep, reps = task.result()
+                except Exception as e:
+                    yield item, None, e
+                else:
+                    yield text_rep, reps, None
+    finally:
+        for task in pending:
+            task.cancel()
+        # let the cancelled conversions finish before the stream is closed
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,300 @@
+"""Persistent, content-addressed cache of text representations.
+
+Representations such as Robocrys, local_env and SLICES are deterministic for a given
+structure and set of parameters but expensive to compute. The cache stores their
+output in a local SQLite database keyed by a fingerprint of the structure, the
+representation name, the generation parameters and the versions of the libraries
+that produce them, so that rebuilding a dataset only computes new or changed entries.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+from pymatgen.core import Structure
+
+from xtal2txt.utils import xtal2txt_storage
+
+#: Libraries whose versions are part of every cache key.
+VERSIONED_PACKAGES = ("xtal2txt", "pymatgen", "robocrys", "slices")
+
+
+def get_library_versions() -> Dict[str, str]:
+    """
+    Get the installed versions of the libraries that produce the representations.
+
+    Returns:
+        Dict[str, str]: Mapping of package name to version ("none" if not installed).
+    """
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = "none"
+    return versions
+
+
+def structure_fingerprint(structure: Structure, decimal_places: int = 6) -> str:
+    """
+    Compute a hash of the lattice, species and rounded fractional coordinates of a structure.
+
+    Site order is part of the fingerprint since several representations
+    (e.g. `cif_p1`, `crystal_text_llm`) depend on it.
+
+    Args:
+        structure: pymatgen Structure object.
+        decimal_places: Number of decimal places the lattice and coordinates are rounded to.
+
+    Returns:
+        str: Hex digest identifying the structure.
+    """
+    lattice = np.round(structure.lattice.matrix, decimal_places) + 0.0
+    # wrap after rounding so that 0.9999999 and 0.0 hash identically
+    frac_coords = np.mod(np.round(structure.frac_coords, decimal_places), 1.0)
+    frac_coords = np.round(frac_coords, decimal_places) + 0.0
+
+    digest = hashlib.sha256()
+    digest.update(lattice.astype("<f8").tobytes())
+    digest.update("|".join(site.species_string for site in structure).encode())
+    digest.update(frac_coords.astype("<f8").tobytes())
+    return digest.hexdigest()
+
+
+class RepresentationCache:
+    """
+    SQLite-backed cache of text representations with size-based eviction.
+
+    Entries are evicted in least-recently-used order once the total size of the
+    stored representations exceeds `max_size_bytes`. The cache can be shared
+    between processes, the database handles the locking.
+
+    The total size is kept in a metadata row maintained by triggers, so storing an
+    entry does not scan the table. Lookups do not write: their access times are
+    collected in memory and written in one transaction once `touch_batch_size` of them
+    are pending, `touch_interval` seconds passed, before evicting and on `close`.
+
+    Attributes:
+        path : location of the SQLite database
+        max_size_bytes : maximum total size of the stored representations
+        touch_batch_size : number of pending access times that triggers writing them
+        touch_interval : seconds after which pending access times are written
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_size_bytes: int = 1024**3,
+        touch_batch_size: int = 256,
+        touch_interval: float = 30.0,
+    ) -> None:
+        """
+        Initialize RepresentationCache instance.
+
+        Args:
+            path: Path to the SQLite database. Defaults to `representations.sqlite`
+                in the xtal2txt pystow directory.
+            max_size_bytes: Maximum total size of the cached representations in bytes.
+            touch_batch_size: Number of pending access times that triggers writing them.
+            touch_interval: Seconds after which pending access times are written.
+        """
+        if path is None:
+            path = xtal2txt_storage.join("cache", name="representations.sqlite")
+        self.path = Path(path)
+        self.max_size_bytes = max_size_bytes
+        self.touch_batch_size = touch_batch_size
+        self.touch_interval = touch_interval
+        self._versions = get_library_versions()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._touched: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+
+    def __getstate__(self) -> dict:
+        # connections can not be pickled, workers reconnect lazily
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        state["_lock"] = None
+        state["_touched"] = {}
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Lazily open the database and create the table if needed."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(self.path), timeout=60, check_same_thread=False
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS representations ("
+                "key TEXT PRIMARY KEY, rep_name TEXT, value TEXT, "
+                "size INTEGER, last_access REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_access "
+                "ON representations (last_access)"
+            )
+            # the triggers keep the total size up to date, replaced rows included
+            connection.execute("PRAGMA recursive_triggers = ON")
+            connection.executescript(
+                "BEGIN IMMEDIATE;"
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), total_size INTEGER);"
+                "INSERT OR IGNORE INTO metadata SELECT 0, COALESCE(SUM(size), 0) "
+                "FROM representations;"
+                "CREATE TRIGGER IF NOT EXISTS add_size AFTER INSERT ON representations "
+                "BEGIN UPDATE metadata SET total_size = total_size + NEW.size; END;"
+                "CREATE TRIGGER IF NOT EXISTS remove_size AFTER DELETE ON representations "
+                "BEGIN UPDATE metadata SET total_size = total_size - OLD.size; END;"
+                "COMMIT;"
+            )
+            self._connection = connection
+        return self._connection
+
+    def make_key(
+        self,
+        structure: Structure,
+        rep_name: str,
+        decimal_places: Optional[int] = None,
+        transformations: Optional[list] = None,
+        options: Optional[dict] = None,
+    ) -> str:
+        """
+        Build the cache key of a representation.
+
+        Args:
+            structure: pymatgen Structure object the representation is generated from.
+            rep_name: Name of the representation.
+            decimal_places: Number of decimal places the representation is rounded to.
+            transformations: list of (transformation_name, params) tuples applied to the structure.
+            options: Further settings the representation depends on.
+
+        Returns:
+            str: The cache key.
+        """
+        key = {
+            "structure": structure_fingerprint(structure),
+            "rep_name": rep_name,
+            "decimal_places": decimal_places,
+            "transformations": transformations or [],
+            "versions": self._versions,
+        }
+        if options:
+            key["options"] = options
+        payload = json.dumps(key, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached representation.
+
+        Args:
+            key: Cache key as returned by `make_key`.
+
+        Returns:
+            The cached representation or None if it is not in the cache.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value FROM representations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if (
+                len(self._touched) >= self.touch_batch_size
+                or time.monotonic() - self._last_flush >= self.touch_interval
+            ):
+                self._flush_touched()
+                self.connection.commit()
+        return row[0]
+
+    def _flush_touched(self) -> None:
+        """Write the pending access times, the caller commits."""
+        if self._touched:
+            self.connection.executemany(
+                "UPDATE representations SET last_access = ? WHERE key = ?",
+                [(last_access, key) for key, last_access in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def set(self, key: str, rep_name: str, value: str) -> None:
+        """
+        Store a representation and evict old entries if the cache is full.
+
+        Args:
+            key: Cache key as returned by `make_key`.
+            rep_name: Name of the representation.
+            value: The representation.
+        """
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO representations VALUES (?, ?, ?, ?, ?)",
+                (key, rep_name, value, size, time.time()),
+            )
+            self._touched.pop(key, None)
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits into `max_size_bytes`."""
+        total = self._total_size()
+        if total <= self.max_size_bytes:
+            return
+        # the least recently used entries are the ones not looked up lately
+        self._flush_touched()
+        rows = self.connection.execute(
+            "SELECT key, size FROM representations ORDER BY last_access ASC"
+        )
+        stale = []
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM representations WHERE key = ?", stale)
+
+    def _total_size(self) -> int:
+        return self.connection.execute(
+            "SELECT total_size FROM metadata WHERE id = 0"
+        ).fetchone()[0]
+
+    def size_bytes(self) -> int:
+        """Return the total size of the cached representations in bytes."""
+        with self._lock:
+            return self._total_size()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM representations"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._touched.clear()
+            self.connection.execute("DELETE FROM representations")
+            self.connection.commit()
+
+    def close(self) -> None:
+        """Write the pending access times and close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._flush_touched()
+                self._connection.commit()
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,553 @@
+"""Command line interface of xtal2txt.
+
+.. code-block:: bash
+
+        xtal2txt convert structures/ -o reps/ --reps cif_p1 slices --workers 8
+        xtal2txt serve --port 8000 --workers 4
+"""
+
+import argparse
+import json
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from xtal2txt.cache import RepresentationCache
+from xtal2txt.core import HEAVY_REPRESENTATIONS, TextRep, read_structure
+from xtal2txt.dedup import StructureDeduplicator
+from xtal2txt.preload import init_worker, preload
+from xtal2txt.workers import WorkerPool, configure_shared_workers
+
+SHARD_PATTERN = "reps-{:05d}.jsonl"
+FAILURES_FILE = "failures.jsonl"
+DUPLICATES_FILE = "duplicates.json"
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+LIST_SUFFIXES = (".txt", ".lst")
+
+
+def _is_cif(name: str) -> bool:
+    return name.lower().endswith(".cif")
+
+
+def iter_cif_sources(inputs: List[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Iterate over the CIFs found in directories, archives, lists of paths or single files.
+
+    Args:
+        inputs: Paths to directories (searched recursively), tar/zip archives,
+            text files with one CIF path per line or CIF files.
+
+    Yields:
+        Tuple[str, str]: structure id and either the path to the CIF or its content.
+    """
+    for item in inputs:
+        path = Path(item)
+        name = path.name.lower()
+        if path.is_dir():
+            for cif in sorted(p for p in path.rglob("*") if _is_cif(p.name)):
+                yield str(cif.relative_to(path).with_suffix("")), str(cif)
+        elif name.endswith(TAR_SUFFIXES):
+            with tarfile.open(path) as archive:
+                for member in archive:
+                    if member.isfile() and _is_cif(member.name):
+                        content = archive.extractfile(member).read().decode("utf-8")
+                        yield str(Path(member.name).with_suffix("")), content
+        elif name.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for member in sorted(archive.namelist()):
+                    if _is_cif(member):
+                        content = archive.read(member).decode("utf-8")
+                        yield str(Path(member).with_suffix("")), content
+        elif name.endswith(LIST_SUFFIXES):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        yield str(Path(line).with_suffix("")), line
+        else:
+            yield str(path.with_suffix("")), str(path)
+
+
+def _read_done_ids(output_dir: Path) -> set:
+    """
+    Collect the ids of the structures handled by previous runs.
+
+    These are the structures written to the output shards and the structures that
+    could not be read, which are only listed in the failures file.
+    """
+    done = set()
+    for shard in output_dir.glob(SHARD_PATTERN.replace("{:05d}", "*")):
+        with open(shard, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line)["id"])
+                except (json.JSONDecodeError, KeyError):
+                    # a truncated last line from an interrupted run
+                    continue
+    failures_path = output_dir / FAILURES_FILE
+    if failures_path.exists():
+        with open(failures_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    failure = json.loads(line)
+                    if "input" in failure.get("errors", {}):
+                        done.add(failure["id"])
+                except (json.JSONDecodeError, KeyError, AttributeError):
+                    continue
+    return done
+
+
+def _convert_one(task: tuple) -> Tuple[str, Optional[dict], dict]:
+    """Worker function: generate the requested representations of a single structure."""
+    structure_id, source, reps, decimal_places, cache, timeout = task
+    try:
+        text_rep = TextRep.from_input(source, cache=cache, structure_id=structure_id)
+    except Exception as e:
+        return structure_id, None, {"errors": {"input": f"{type(e).__name__}: {e}"}}
+    results = text_rep.get_requested_text_reps(
+        reps, decimal_places=decimal_places, timeout=timeout
+    )
+    failures = {}
+    if text_rep.errors:
+        failures["errors"] = dict(text_rep.errors)
+    if text_rep.timeouts:
+        failures["timeouts"] = dict(text_rep.timeouts)
+    return structure_id, results, failures
+
+
+def deduplicate_sources(
+    sources: Iterable[Tuple[str, str]],
+) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+    """
+    Match the sources against the unique crystals seen so far, one source at a time.
+
+    The sources are read lazily, so that the conversion of the representatives can
+    start before all sources have been read.
+
+    Args:
+        sources: structure ids and CIF paths or contents, see `iter_cif_sources`.
+
+    Yields:
+        Tuple[str, str, Optional[str], Optional[str]]: structure id, source, id of the
+            representative (the structure id itself for a new crystal) and the error
+            message if the source could not be read (the representative is then None).
+    """
+    deduplicator = StructureDeduplicator()
+    for structure_id, source in sources:
+        try:
+            # only parse the CIF, the TextRep is built by the worker converting it
+            structure = read_structure(source)
+        except Exception as e:
+            yield structure_id, source, None, f"{type(e).__name__}: {e}"
+            continue
+        yield structure_id, source, deduplicator.add(structure_id, structure), None
+
+
+class DuplicateFanOut:
+    """
+    Track the duplicates whose records are written from the record of their representative.
+
+    Duplicates found before the record of their representative is written are written
+    along with it. The ones found afterwards, or whose representative was written by a
+    previous run, are written by `write_late` from the shards at the end.
+
+    Attributes:
+        duplicate_of : representative id of every duplicate id seen so far
+    """
+
+    def __init__(self, done: set) -> None:
+        """
+        Initialize DuplicateFanOut instance.
+
+        Args:
+            done: Ids of the structures already written by previous runs.
+        """
+        self.done = done
+        self.duplicate_of: Dict[str, str] = {}
+        self._waiting: Dict[str, List[str]] = {}
+        self._late: Dict[str, List[str]] = {}
+        self._written = set()
+
+    def add(self, duplicate: str, representative: str) -> None:
+        """Register a duplicate of a representative."""
+        self.duplicate_of[duplicate] = representative
+        if duplicate in self.done:
+            return
+        if representative in self._written or representative in self.done:
+            self._late.setdefault(representative, []).append(duplicate)
+        else:
+            self._waiting.setdefault(representative, []).append(duplicate)
+
+    def finish(self, representative: str) -> List[str]:
+        """Mark the record of a representative as written and return the duplicates to write with it."""
+        self._written.add(representative)
+        return self._waiting.pop(representative, [])
+
+    def write_late(self, output_dir: Path, writer: "ShardWriter") -> None:
+        """Write the records of the late duplicates, copied from the records of their representatives."""
+        if not self._late:
+            return
+        # new records go into new shards, the existing ones are only read
+        writer.close()
+        for shard in sorted(output_dir.glob(SHARD_PATTERN.replace("{:05d}", "*"))):
+            with open(shard, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                        duplicates = self._late.pop(record["id"], [])
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+                    for duplicate in duplicates:
+                        writer.write({**record, "id": duplicate})
+        writer.close()
+
+
+def _write_duplicates(path: Path, duplicate_of: Dict[str, str]) -> None:
+    """Write the mapping of the duplicate ids to the ids of their representatives."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(duplicate_of, file, indent=1)
+
+
+def _imap_unordered(
+    executor: Executor, func: Callable, tasks: Iterable, window: int
+) -> Iterator:
+    """Like `Pool.imap_unordered`, with at most `window` tasks submitted at a time."""
+    tasks = iter(tasks)
+    pending = set()
+    while True:
+        for task in tasks:
+            pending.add(executor.submit(func, task))
+            if len(pending) >= window:
+                break
+        if not pending:
+            return
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            yield future.result()
+
+
+class ShardWriter:
+    """Write records as JSON lines into shards of at most `shard_size` records."""
+
+    def __init__(self, output_dir: Path, shard_size: int) -> None:
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        existing = sorted(output_dir.glob(SHARD_PATTERN.replace("{:05d}", "*")))
+        # never append to shards of previous runs, they might end in a partial line
+        self.shard_index = len(existing)
+        self.count = 0
+        self._file = None
+
+    def write(self, record: dict) -> None:
+        if self._file is None or self.count >= self.shard_size:
+            self.close()
+            shard = self.output_dir / SHARD_PATTERN.format(self.shard_index)
+            self._file = open(shard, "w", encoding="utf-8")
+            self.shard_index += 1
+            self.count = 0
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _report_progress(
+    done: int, total: int, failed: int, start: float, complete: bool = True
+) -> None:
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    # the total is only known once all inputs have been read
+    total = f"{total}" if complete else f"{total}+"
+    sys.stderr.write(
+        f"\r{done}/{total} structures | {rate:.2f} structures/s | {failed} with failures"
+    )
+    sys.stderr.flush()
+
+
+def convert(args: argparse.Namespace) -> int:
+    """Run the `convert` subcommand."""
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    reps = args.reps or TextRep.get_available_representations()
+    cache = RepresentationCache(args.cache) if args.cache else None
+
+    done = _read_done_ids(output_dir) if args.resume else set()
+    failures_file = open(
+        output_dir / FAILURES_FILE, "a" if args.resume else "w", encoding="utf-8"
+    )
+    # with --dedup, representations are computed once per unique crystal and
+    # written for all its duplicates
+    fan_out = DuplicateFanOut(done) if args.dedup else None
+
+    def iter_sources() -> Iterator[Tuple[str, str]]:
+        if fan_out is None:
+            yield from iter_cif_sources(args.inputs)
+            return
+        for structure_id, source, representative, error in deduplicate_sources(
+            iter_cif_sources(args.inputs)
+        ):
+            if error is not None:
+                if structure_id not in done:
+                    failures_file.write(
+                        json.dumps({"id": structure_id, "errors": {"input": error}})
+                        + "\n"
+                    )
+                    failures_file.flush()
+            elif representative == structure_id:
+                yield structure_id, source
+            else:
+                fan_out.add(structure_id, representative)
+
+    # the inputs are read once, the tasks are counted as they are submitted
+    queued = {"total": 0, "complete": False}
+
+    def iter_tasks() -> Iterator[tuple]:
+        for structure_id, source in iter_sources():
+            if structure_id not in done:
+                queued["total"] += 1
+                yield (
+                    structure_id,
+                    source,
+                    reps,
+                    args.decimal_places,
+                    cache,
+                    args.timeout,
+                )
+        queued["complete"] = True
+
+    tasks = iter_tasks()
+
+    writer = ShardWriter(output_dir, args.shard_size)
+    n_done, n_failed = 0, 0
+    start = time.perf_counter()
+    # with --timeout, the heavy representations run in the supervised workers
+    supervised_reps = (
+        [rep_name for rep_name in reps if rep_name in HEAVY_REPRESENTATIONS]
+        if args.timeout is not None
+        else []
+    )
+    max_rss_bytes = _megabytes(args.max_rss)
+    pool = None
+    if args.workers > 1:
+        # the workers are recycled, as are the supervised workers they start
+        pool = WorkerPool(
+            args.workers,
+            initializer=init_worker,
+            initargs=(reps, supervised_reps, args.max_tasks_per_worker, max_rss_bytes),
+            max_tasks=args.max_tasks_per_worker,
+            max_rss_bytes=max_rss_bytes,
+        )
+        pool.start()
+    elif supervised_reps or args.max_tasks_per_worker or max_rss_bytes:
+        configure_shared_workers(
+            initializer=preload,
+            initargs=(supervised_reps,),
+            max_tasks=args.max_tasks_per_worker,
+            max_rss_bytes=max_rss_bytes,
+        )
+    try:
+        results = (
+            _imap_unordered(pool, _convert_one, tasks, 2 * args.workers)
+            if pool is not None
+            else map(_convert_one, tasks)
+        )
+        for structure_id, reps_dict, failures in results:
+            duplicates = fan_out.finish(structure_id) if fan_out is not None else []
+            if reps_dict is not None:
+                for member in [structure_id, *duplicates]:
+                    writer.write({"id": member, **reps_dict})
+            if failures:
+                n_failed += 1
+                failures_file.write(json.dumps({"id": structure_id, **failures}) + "\n")
+                failures_file.flush()
+            n_done += 1
+            if not args.quiet:
+                _report_progress(
+                    n_done, queued["total"], n_failed, start, queued["complete"]
+                )
+        if fan_out is not None:
+            fan_out.write_late(output_dir, writer)
+            _write_duplicates(output_dir / DUPLICATES_FILE, fan_out.duplicate_of)
+    finally:
+        writer.close()
+        failures_file.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    if not args.quiet:
+        sys.stderr.write("\n")
+    return 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    """Run the `serve` subcommand."""
+    # the server pulls in the tokenizers, only import it when serving
+    from xtal2txt.server import Xtal2txtService, create_server
+
+    service = Xtal2txtService(
+        reps=args.reps,
+        n_workers=args.workers,
+        tokenizer_names=args.tokenizers,
+        batch_window=args.batch_window,
+        max_batch_size=args.max_batch_size,
+        max_tasks=args.max_tasks_per_worker,
+        max_rss_bytes=_megabytes(args.max_rss),
+    )
+    warm_up_seconds = service.start()
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    sys.stderr.write(
+        f"Serving on http://{host}:{port} (warm-up {warm_up_seconds:.1f} s)\n"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def _megabytes(value: Optional[float]) -> Optional[int]:
+    return None if value is None else int(value * 1024**2)
+
+
+def _add_recycling_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        help="Tasks after which a worker process, or a supervised process for "
+        "timeouts, is replaced by a fresh one (default: never).",
+    )
+    parser.add_argument(
+        "--max-rss",
+        type=float,
+        help="Resident set size in MB above which a worker process, or a supervised "
+        "process for timeouts, is replaced by a fresh one (default: no limit).",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of the `xtal2txt` command."""
+    parser = argparse.ArgumentParser(
+        prog="xtal2txt",
+        description="Convert crystal structures into text representations.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="Convert CIFs into text representations."
+    )
+    convert_parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Directories, tar/zip archives, text files listing CIF paths, or CIF files.",
+    )
+    convert_parser.add_argument(
+        "-o", "--output-dir", required=True, help="Directory for the output shards."
+    )
+    convert_parser.add_argument(
+        "-r",
+        "--reps",
+        nargs="+",
+        choices=TextRep.get_available_representations(),
+        help="Representations to generate (default: all).",
+    )
+    convert_parser.add_argument(
+        "-d",
+        "--decimal-places",
+        type=int,
+        default=2,
+        help="Decimal places to round to.",
+    )
+    convert_parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Number of worker processes."
+    )
+    convert_parser.add_argument(
+        "--shard-size", type=int, default=10000, help="Structures per output shard."
+    )
+    convert_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip structures already present in the output shards.",
+    )
+    convert_parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Wall-clock budget in seconds for each of robocrys_rep, local_env and slices.",
+    )
+    convert_parser.add_argument(
+        "--cache", help="Path to a representation cache (SQLite) to use."
+    )
+    convert_parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Convert only one representative per unique crystal and write its "
+        f"representations for all duplicates (listed in {DUPLICATES_FILE}).",
+    )
+    _add_recycling_arguments(convert_parser)
+    convert_parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Do not display progress."
+    )
+    convert_parser.set_defaults(func=convert)
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve representations and tokenizers over HTTP with warm workers.",
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to bind to.")
+    serve_parser.add_argument(
+        "-p", "--port", type=int, default=8000, help="Port to bind to."
+    )
+    serve_parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Number of worker processes."
+    )
+    serve_parser.add_argument(
+        "-r",
+        "--reps",
+        nargs="+",
+        choices=TextRep.get_available_representations(),
+        help="Representations to warm up the workers with and to generate when a "
+        "request names none (default: all).",
+    )
+    serve_parser.add_argument(
+        "-t",
+        "--tokenizers",
+        nargs="+",
+        help="Tokenizers to load at start (default: all).",
+    )
+    serve_parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.005,
+        help="Seconds to wait for further tokenization requests to batch.",
+    )
+    serve_parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=64,
+        help="Maximum number of texts tokenized in one call.",
+    )
+    _add_recycling_arguments(serve_parser)
+    serve_parser.set_defaults(func=serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the `xtal2txt` command."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
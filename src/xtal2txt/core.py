@@ -1,19 +1,27 @@
 import logging
 import random
 import re
+import time
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import Union, Callable, Any, Optional, Dict, List
+from typing import Union, Callable, Any, Optional, Dict, List, Tuple
 
 from pymatgen.core import Structure
-from pymatgen.core.structure import Molecule
 from pymatgen.io.cif import CifWriter
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
 from robocrys import StructureCondenser, StructureDescriber
 
-from xtal2txt.transforms import TransformationCallback
-from xtal2txt.local_env import LocalEnvAnalyzer
+from xtal2txt import metrics
+from xtal2txt.aio import run_in_executor
+from xtal2txt.cache import RepresentationCache, structure_fingerprint
+from xtal2txt.plan import INTERMEDIATES, ExecutionPlan
+from xtal2txt.profiling import SlowestProfiles, track_memory
+from xtal2txt.transforms import compile_transformations, derive_seed
+from xtal2txt.local_env import DEFAULT_SMILES_BACKEND, LocalEnvAnalyzer
+from xtal2txt.workers import RepresentationTimeout, get_shared_worker
+from xtal2txt.zmatrix import get_zmatrix
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +41,103 @@ class RepresentationType(Enum):
     LOCAL_ENV = "local_env"
 
 
+#: Representations that can take very long or crash for pathological structures.
+#: A scalar timeout applies to these, they are then run in a supervised subprocess.
+HEAVY_REPRESENTATIONS = (
+    RepresentationType.ROBOCRYS.value,
+    RepresentationType.LOCAL_ENV.value,
+    RepresentationType.SLICES.value,
+)
+
+#: Representations that hold the GIL for most of their run time. With `concurrent=True`,
+#: each runs in a supervised worker process of its own, the others run in threads.
+PROCESS_REPRESENTATIONS = HEAVY_REPRESENTATIONS
+
+#: Representations taking milliseconds, generated first when a deadline is set.
+CHEAP_REPRESENTATIONS = (
+    RepresentationType.COMPOSITION.value,
+    RepresentationType.ATOM_SEQUENCES.value,
+    RepresentationType.ATOM_SEQUENCES_PLUSPLUS.value,
+    RepresentationType.CRYSTAL_TEXT_LLM.value,
+)
+
+
+def _deadline_order(rep_name: str) -> int:
+    """Rank of a representation when scheduling under a deadline, cheap ones first."""
+    if rep_name in CHEAP_REPRESENTATIONS:
+        return 0
+    if rep_name in HEAVY_REPRESENTATIONS:
+        return 2
+    return 1
+
+
+def _deadline_exceeded(deadline: float) -> None:
+    """Stand-in generator for the representations not started before the deadline."""
+    raise RepresentationTimeout(deadline)
+
+
+def read_structure(input_data: Union[str, Path, Structure]) -> Structure:
+    """
+    Read a structure from a cif file, a cif string or a pymatgen Structure object.
+
+    Args:
+        input_data: A cif file of a crystal structure, a cif string,
+            or a pymatgen Structure object (returned as is).
+
+    Returns:
+        Structure: The structure.
+    """
+    if isinstance(input_data, Structure):
+        return input_data
+    if isinstance(input_data, (str, Path)):
+        try:
+            if Path(input_data).is_file():
+                return Structure.from_file(str(input_data))
+        except (OSError, ValueError):
+            pass
+    return Structure.from_str(str(input_data), "cif")
+
+
+def generate_representation(
+    structure: Structure, rep_name: str, decimal_places: int
+) -> str:
+    """
+    Generate a single representation of an (already transformed) structure.
+
+    Module level so that it can be sent to worker processes. Exceptions are not caught.
+
+    Args:
+        structure: pymatgen Structure object.
+        rep_name: Name of the representation.
+        decimal_places: Number of decimal places to round to.
+
+    Returns:
+        str: The representation.
+    """
+    return TextRep(structure)._rep_registry[rep_name](decimal_places)
+
+
+def generate_representation_tracking_memory(
+    structure: Structure, rep_name: str, decimal_places: int
+) -> Tuple[str, Dict[str, Optional[int]]]:
+    """
+    Generate a single representation and measure the memory used by its generator.
+
+    Module level so that the memory is measured in the worker process running it.
+
+    Args:
+        structure: pymatgen Structure object.
+        rep_name: Name of the representation.
+        decimal_places: Number of decimal places to round to.
+
+    Returns:
+        Tuple[str, Dict[str, Optional[int]]]: The representation and its memory usage, see `track_memory`.
+    """
+    with track_memory() as usage:
+        value = generate_representation(structure, rep_name, decimal_places)
+    return value, usage
+
+
 class TextRep:
     """
     Generate text representations of crystal structure for Language modelling.
@@ -40,6 +145,13 @@ class TextRep:
     Attributes:
         structure : pymatgen structure
         transformations : list of transformations to apply
+        cache : optional persistent cache of generated representations
+        structure_id : identifier of the structure used in profiles
+        profiler : optional profiler keeping the slowest representation generator calls
+        errors : error messages of the representations that failed, keyed by representation name
+        timeouts : budgets (in seconds) of the representations that timed out, keyed by representation name
+        memory_usage : peak traced allocation and RSS delta per representation, if memory profiling was requested
+        plan : execution plan of the intermediates of the last `get_all_text_reps`/`get_requested_text_reps` call
 
     Methods:
         from_input : classmethod to create TextRep from various inputs
@@ -51,6 +163,7 @@ class TextRep:
         get_composition : get composition
         get_local_env_rep : get local environment representation
         get_crystal_text_llm : get Crystal-LLM representation
+        get_crystal_text_llm_views : get Crystal-LLM representations with permuted atoms
         get_robocrys_rep : get Robocrystallographer representation
         get_wyckoff_positions : get Wyckoff positions
         get_wycryst : get Wycryst representation
@@ -65,6 +178,9 @@ class TextRep:
         structure: Structure,
         transformations: list[tuple[str, dict]] = None,
         enable_logging: bool = False,
+        cache: Optional[RepresentationCache] = None,
+        structure_id: Optional[str] = None,
+        profiler: Optional[SlowestProfiles] = None,
     ) -> None:
         """
         Initialize TextRep instance.
@@ -73,10 +189,19 @@ class TextRep:
             structure: Pymatgen Structure object.
             transformations: list of (transformation_name, params) tuples to apply.
             enable_logging: Whether to log errors when representations fail.
+            cache: Optional RepresentationCache used to store and look up generated representations.
+            structure_id: Identifier of the structure. Defaults to the start of its fingerprint.
+            profiler: Optional SlowestProfiles that profiles every representation generator call
+                run in this process. Generators run in a supervised subprocess are not profiled.
         """
         self.structure = structure
         self.transformations = transformations or []
         self.enable_logging = enable_logging
+        self.cache = cache
+        self.errors: Dict[str, str] = {}
+        self.timeouts: Dict[str, float] = {}
+        self.memory_usage: Dict[str, Dict[str, Optional[int]]] = {}
+        self.plan: Optional[ExecutionPlan] = None
 
         # SLICES backend is lazy-loaded as versions keep changing
         self._backend = None
@@ -88,6 +213,9 @@ class TextRep:
 
         self.apply_transformations()
 
+        self.structure_id = structure_id or structure_fingerprint(self.structure)[:16]
+        self.profiler = profiler
+
     @property
     def backend(self):
         """Lazy-load SLICES backend as versions keep changing."""
@@ -151,6 +279,9 @@ class TextRep:
         input_data: Union[str, Path, Structure],
         transformations: list[tuple[str, dict]] = None,
         enable_logging: bool = False,
+        cache: Optional[RepresentationCache] = None,
+        structure_id: Optional[str] = None,
+        profiler: Optional[SlowestProfiles] = None,
     ) -> "TextRep":
         """
         Instantiate the TextRep class object with the pymatgen structure from a cif file, a cif string, or a pymatgen Structure object.
@@ -160,57 +291,286 @@ class TextRep:
                 or a pymatgen Structure object.
             transformations: list of transformations to apply.
             enable_logging: Whether to log errors when representations fail.
+            cache: Optional RepresentationCache used to store and look up generated representations.
+            structure_id: Identifier of the structure. Defaults to the start of its fingerprint.
+            profiler: Optional SlowestProfiles that profiles every representation generator call.
 
         Returns:
             TextRep: A TextRep object.
         """
-        if isinstance(input_data, Structure):
-            structure = input_data
-
-        elif isinstance(input_data, (str, Path)):
-            try:
-                if Path(input_data).is_file():
-                    structure = Structure.from_file(str(input_data))
-                else:
-                    raise ValueError
-            except (OSError, ValueError):
-                structure = Structure.from_str(str(input_data), "cif")
-
-        else:
-            structure = Structure.from_str(str(input_data), "cif")
-
-        return cls(structure, transformations, enable_logging)
+        return cls(
+            read_structure(input_data),
+            transformations,
+            enable_logging,
+            cache,
+            structure_id,
+            profiler,
+        )
 
     def apply_transformations(self) -> None:
         """
         Apply transformations to the structure.
+
+        The transformations are compiled into a single update of the coordinates, the
+        result is the same as applying the `TransformationCallback` methods in order.
         """
-        for transformation, params in self.transformations:
-            transform_func = getattr(TransformationCallback, transformation)
-            self.structure = transform_func(self.structure, **params)
+        if self.transformations:
+            self.structure = compile_transformations(self.transformations)(
+                self.structure
+            )
 
     def _safe_call(
-        self, func: Callable, *args, rep_name: Optional[str] = None, **kwargs
+        self,
+        func: Callable,
+        *args,
+        rep_name: Optional[str] = None,
+        profile: bool = True,
+        **kwargs,
     ) -> Optional[Any]:
         """
         Safely call a function and return None if it fails.
 
+        The error message is recorded in `errors` under the representation name,
+        exceeded wall-clock budgets are recorded in `timeouts` instead.
+
         Args:
             func: Function to call.
             *args: Positional arguments to pass to func.
             rep_name: Optional representation name for better error messages.
+            profile: Whether to run func under the `profiler`, if one is set. Calls that
+                only wait for a subprocess are not profiled.
             **kwargs: Keyword arguments to pass to func.
 
         Returns:
             Result of func or None if exception occurs.
         """
+        name = rep_name if rep_name else func.__name__
+        self.errors.pop(name, None)
+        self.timeouts.pop(name, None)
+        registry = metrics.get_metrics()
+        start = time.perf_counter()
+        outcome = "ok"
         try:
+            if profile and self.profiler is not None:
+                return self.profiler.profile(
+                    self.structure_id, name, self.structure, func, *args, **kwargs
+                )
             return func(*args, **kwargs)
+        except RepresentationTimeout as e:
+            outcome = "timeout"
+            self.timeouts[name] = e.timeout
+            if self.enable_logging:
+                logger.warning(f"Representation '{name}' timed out: {e}")
+            return None
         except Exception as e:
+            outcome = "failure"
+            self.errors[name] = f"{type(e).__name__}: {e}"
             if self.enable_logging:
-                name = rep_name if rep_name else func.__name__
                 logger.warning(f"Failed to generate representation '{name}': {e}")
             return None
+        finally:
+            if registry is not None:
+                registry.observe_representation(
+                    name, time.perf_counter() - start, outcome
+                )
+
+    @staticmethod
+    def _resolve_timeout(
+        rep_name: str, timeout: Optional[Union[float, Dict[str, float]]]
+    ) -> Optional[float]:
+        """
+        Get the wall-clock budget of a representation.
+
+        A scalar timeout applies to the `HEAVY_REPRESENTATIONS`, a dictionary
+        gives the budget per representation name.
+        """
+        if isinstance(timeout, dict):
+            return timeout.get(rep_name)
+        if rep_name in HEAVY_REPRESENTATIONS:
+            return timeout
+        return None
+
+    def _run_supervised(
+        self,
+        rep_name: str,
+        decimal_places: int,
+        timeout: Optional[float],
+        worker: Optional[str] = None,
+        profile_memory: bool = False,
+    ):
+        """
+        Generate a representation in a shared supervised worker process.
+
+        With `profile_memory`, the memory is measured in the worker and recorded in
+        `memory_usage` if the representation could be generated.
+        """
+        if not profile_memory:
+            return get_shared_worker(worker).run(
+                generate_representation,
+                self.structure,
+                rep_name,
+                decimal_places,
+                timeout=timeout,
+            )
+        value, usage = get_shared_worker(worker).run(
+            generate_representation_tracking_memory,
+            self.structure,
+            rep_name,
+            decimal_places,
+            timeout=timeout,
+        )
+        self.memory_usage[rep_name] = usage
+        return value
+
+    def _generate(
+        self,
+        rep_name: str,
+        decimal_places: int,
+        timeout: Optional[float] = None,
+        profile_memory: bool = False,
+        worker: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Generate a registered representation, going through the cache if one is set.
+
+        Failed and timed out representations (None) are not cached.
+
+        Args:
+            rep_name: Name of the representation.
+            decimal_places: Number of decimal places to round to.
+            timeout: Wall-clock budget in seconds. If set, the representation is
+                generated in a supervised subprocess that is killed once the budget is exceeded.
+            profile_memory: Whether to record the memory used by the generator in `memory_usage`,
+                measured in the subprocess if the representation is generated in one.
+            worker: Name of the shared supervised worker to generate the representation in,
+                even without timeout.
+
+        Returns:
+            The representation or None if it could not be generated.
+        """
+        supervised = timeout is not None or worker is not None
+        if supervised:
+            args = (
+                self._run_supervised,
+                rep_name,
+                decimal_places,
+                timeout,
+                worker,
+                profile_memory,
+            )
+        else:
+            args = (self._rep_registry[rep_name], decimal_places)
+
+        def compute() -> Optional[str]:
+            # the profiler and track_memory would only see the parent waiting for the subprocess
+            if supervised or not profile_memory:
+                return self._safe_call(*args, rep_name=rep_name, profile=not supervised)
+            with track_memory() as usage:
+                value = self._safe_call(*args, rep_name=rep_name)
+            self.memory_usage[rep_name] = usage
+            return value
+
+        self.memory_usage.pop(rep_name, None)
+        if self.cache is None:
+            return compute()
+
+        options = (
+            {"smiles_backend": DEFAULT_SMILES_BACKEND}
+            if rep_name == RepresentationType.LOCAL_ENV.value
+            else None
+        )
+        key = self.cache.make_key(
+            self.structure, rep_name, decimal_places, self.transformations, options
+        )
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.cache.set(key, rep_name, value)
+        return value
+
+    def _generate_many(
+        self,
+        rep_names: List[str],
+        decimal_places: int,
+        timeout: Optional[Union[float, Dict[str, float]]],
+        profile_memory: bool,
+        concurrent: bool,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Generate registered representations one after the other or concurrently.
+
+        Concurrently, every representation runs in its own thread. The
+        `PROCESS_REPRESENTATIONS` hold the GIL for most of their run time, each of them
+        is generated in a supervised worker process of its own.
+
+        With a deadline, the `CHEAP_REPRESENTATIONS` are generated first and the
+        `HEAVY_REPRESENTATIONS` last. The heavy ones run in supervised subprocesses
+        limited to the remaining budget, which includes waiting for a worker process
+        that is still starting, see `SupervisedWorker`. The others take milliseconds and
+        stay in this process. Representations not started before the deadline are
+        recorded in `timeouts` without being generated.
+
+        The intermediates shared by the representations are computed once, see `plan`.
+        """
+        self.plan = ExecutionPlan(self.structure, rep_names)
+        end = None if deadline is None else time.monotonic() + deadline
+
+        def budget(rep_name: str) -> Optional[float]:
+            rep_timeout = self._resolve_timeout(rep_name, timeout)
+            if end is None or rep_name not in HEAVY_REPRESENTATIONS:
+                return rep_timeout
+            remaining = max(end - time.monotonic(), 0.0)
+            return remaining if rep_timeout is None else min(rep_timeout, remaining)
+
+        if not concurrent:
+            results = {}
+            ordered = (
+                rep_names if end is None else sorted(rep_names, key=_deadline_order)
+            )
+            for rep_name in ordered:
+                if end is not None and time.monotonic() >= end:
+                    results[rep_name] = self._safe_call(
+                        _deadline_exceeded, deadline, rep_name=rep_name, profile=False
+                    )
+                    continue
+                results[rep_name] = self._generate(
+                    rep_name, decimal_places, budget(rep_name), profile_memory
+                )
+            return {rep_name: results[rep_name] for rep_name in rep_names}
+
+        def worker(rep_name: str) -> Optional[str]:
+            # budgeted representations sharing a worker would wait for each other
+            return rep_name if rep_name in PROCESS_REPRESENTATIONS else None
+
+        if profile_memory:
+            raise ValueError("Memory profiling is not supported with concurrent=True")
+        if self.profiler is not None:
+            # cProfile profiles a single thread at a time
+            raise ValueError("Profiling is not supported with concurrent=True")
+        rep_names = list(dict.fromkeys(rep_names))
+        if not rep_names:
+            return {}
+        with ThreadPoolExecutor(len(rep_names)) as executor:
+            futures = {
+                rep_name: executor.submit(
+                    self._generate,
+                    rep_name,
+                    decimal_places,
+                    budget(rep_name),
+                    False,
+                    worker(rep_name),
+                )
+                for rep_name in rep_names
+            }
+            return {rep_name: future.result() for rep_name, future in futures.items()}
+
+    def _intermediate(self, name: str) -> Any:
+        """Get an intermediate from the current plan, or compute it if the plan does not include it."""
+        if self.plan is not None and name in self.plan:
+            return self.plan.get(name)
+        return INTERMEDIATES[name](self.structure)
 
     @staticmethod
     def round_numbers_in_string(original_string: str, decimal_places: int) -> str:
@@ -251,8 +611,7 @@ class TextRep:
         """
 
         if format == "symmetrized":
-            symmetry_analyzer = SpacegroupAnalyzer(self.structure)
-            symmetrized_structure = symmetry_analyzer.get_symmetrized_structure()
+            symmetrized_structure = self._intermediate("symmetrized_structure")
             cif_string = str(
                 CifWriter(
                     symmetrized_structure,
@@ -281,7 +640,8 @@ class TextRep:
             list[str]: The lattice parameters.
         """
         return [
-            str(round(i, decimal_places)) for i in self.structure.lattice.parameters
+            str(round(i, decimal_places))
+            for i in self._intermediate("lattice_parameters")
         ]
 
     def get_coords(self, name: str = "cartesian", decimal_places: int = 3) -> list[str]:
@@ -321,8 +681,8 @@ class TextRep:
         """
 
         if primitive:
-            primitive_structure = (
-                self.structure.get_primitive_structure()
+            primitive_structure = self._intermediate(
+                "primitive_structure"
             )  # convert to primitive structure
             return self.backend.structure2SLICES(primitive_structure)
         return self.backend.structure2SLICES(self.structure)
@@ -359,11 +719,16 @@ class TextRep:
         if not local_env_kwargs:
             local_env_kwargs = {}
         analyzer = LocalEnvAnalyzer(**local_env_kwargs)
-        return analyzer.structure_to_local_env_string(self.structure)
+        return analyzer.structure_to_local_env_string(
+            self.structure,
+            symmetrized_structure=self._intermediate("symmetrized_structure"),
+        )
 
     def get_crystal_text_llm(
         self,
         permute_atoms: bool = False,
+        seed: Optional[int] = None,
+        view_index: Optional[int] = None,
     ) -> str:
         """
         Code adopted from https://github.com/facebookresearch/crystal-llm/blob/main/llama_finetune.py
@@ -371,37 +736,73 @@ class TextRep:
 
         Returns the representation as per the above citation.
 
+        The permutation is drawn from a generator of its own, seeded with
+        `derive_seed(seed, structure_id, view_index)` if a seed is given, so that
+        permuted representations can be generated concurrently and reproducibly.
+
         Args:
             permute_atoms (bool): Whether to permute the atoms in the unit cell.
+            seed (int, optional): Seed of the permutation. Defaults to an unseeded permutation.
+            view_index (int, optional): Index of the permuted view the seed is derived for.
 
         Returns:
             str: The crystal-llm representation of the crystal structure.
         """
 
-        lengths = self.structure.lattice.parameters[:3]
-        angles = self.structure.lattice.parameters[3:]
-        atom_ids = self.structure.species
-        frac_coords = self.structure.frac_coords
-
+        header, site_lines = self._crystal_text_llm_parts()
         if permute_atoms:
-            atom_coord_pairs = list(zip(atom_ids, frac_coords))
-            random.shuffle(atom_coord_pairs)
-            atom_ids, frac_coords = zip(*atom_coord_pairs)
+            self._permutation_rng(seed, view_index).shuffle(site_lines)
+        return header + "\n".join(site_lines)
 
-        crystal_str = (
+    def get_crystal_text_llm_views(
+        self, n_views: int, seed: Optional[int] = None
+    ) -> List[str]:
+        """
+        Generate `n_views` Crystal-LLM representations with permuted atoms.
+
+        The lattice and the sites are formatted once, every view only joins the site
+        lines in a different order. View k is identical to
+        `get_crystal_text_llm(permute_atoms=True, seed=seed, view_index=k)`.
+
+        Args:
+            n_views (int): Number of permuted representations.
+            seed (int, optional): Seed of the permutations. Defaults to unseeded permutations.
+
+        Returns:
+            List[str]: The permuted crystal-llm representations.
+        """
+        header, site_lines = self._crystal_text_llm_parts()
+        views = []
+        for view_index in range(n_views):
+            order = list(range(len(site_lines)))
+            self._permutation_rng(seed, view_index).shuffle(order)
+            views.append(header + "\n".join([site_lines[i] for i in order]))
+        return views
+
+    def _crystal_text_llm_parts(self) -> Tuple[str, List[str]]:
+        """Format the lattice header and the lines of every site of the Crystal-LLM representation."""
+        parameters = self._intermediate("lattice_parameters")
+        lengths = parameters[:3]
+        angles = parameters[3:]
+        header = (
             " ".join(["{0:.1f}".format(x) for x in lengths])
             + "\n"
             + " ".join([str(int(x)) for x in angles])
             + "\n"
-            + "\n".join(
-                [
-                    str(t) + "\n" + " ".join(["{0:.2f}".format(x) for x in c])
-                    for t, c in zip(atom_ids, frac_coords)
-                ]
-            )
         )
+        site_lines = [
+            str(t) + "\n" + " ".join(["{0:.2f}".format(x) for x in c])
+            for t, c in zip(self.structure.species, self.structure.frac_coords)
+        ]
+        return header, site_lines
 
-        return crystal_str
+    def _permutation_rng(
+        self, seed: Optional[int], view_index: Optional[int]
+    ) -> random.Random:
+        """Generator of the atom permutation of a view, unseeded if `seed` is None."""
+        if seed is None:
+            return random.Random()
+        return random.Random(derive_seed(seed, self.structure_id, view_index))
 
     def get_robocrys_rep(self):
         """
@@ -480,10 +881,7 @@ class TextRep:
             str: The string representation of the crystal structure.
         """
 
-        try:
-            output = [site.specie.element.symbol for site in self.structure.sites]
-        except AttributeError:
-            output = [site.specie.symbol for site in self.structure.sites]
+        output = list(self._intermediate("element_symbols"))
         if lattice_params:
             params = self.get_lattice_parameters(decimal_places=decimal_places)
             params[3:] = [str(int(float(i))) for i in params[3:]]
@@ -491,86 +889,38 @@ class TextRep:
 
         return " ".join(output)
 
-    def updated_zmatrix_rep(self, zmatrix, decimal_places=1):
-        """
-        Replace the variables in the Z-matrix with their values and return the updated Z-matrix.
-        for eg: z-matrix from pymatgen
-        'N\nN 1 B1\nN 1 B2 2 A2\nN 1 B3 2 A3 3 D3\n
-        B1=3.79
-        B2=6.54
-        ....
-        is replaced to
-        'N\nN 1 3.79\nN 1 6.54 2 90\nN 1 6.54 2 90 3 120\n'
-
-        Args:
-            Zmatrix (bool): zmatrix multi line string as implemented in pymatgen.
-            decimal_places (int): The number of decimal places to round to.
-
-        Returns:
-            str: The updated Z-matrix representation of the crystal structure.
-        """
-        lines = zmatrix.split("\n")
-        main_part = []
-        variables_part = []
-
-        # Determine the main part and the variables part of the Z-matrix
-        for line in lines:
-            if "=" in line:
-                variables_part.append(line)
-            else:
-                if line.strip():  # Skip empty lines
-                    main_part.append(line)
-
-        # Extract variables from the variables part
-        variable_dict = {}
-        for var_line in variables_part:
-            var, value = var_line.split("=")
-            if var.startswith("B"):
-                rounded_value = round(float(value.strip()), decimal_places)
-            else:
-                rounded_value = int(round(float(value.strip())))
-            variable_dict[var] = (
-                f"{rounded_value}"
-                if var.startswith(("A", "D"))
-                else f"{rounded_value:.{decimal_places}f}"
-            )
-
-        # Replace variables in the main part
-        replaced_lines = []
-        for line in main_part:
-            parts = line.split()
-            # atom = parts[0]
-            replaced_line = line
-            for i in range(1, len(parts)):
-                var = parts[i]
-                if var in variable_dict:
-                    replaced_line = replaced_line.replace(var, variable_dict[var])
-            replaced_lines.append(replaced_line)
-
-        return "\n".join(replaced_lines)
-
-    def get_zmatrix_rep(self, decimal_places=1):
+    def get_zmatrix_rep(self, decimal_places=1, minimum_image=False):
         """
         Generate the Z-matrix representation of the crystal structure.
         It provides a description of each atom in terms of its atomic number,
         bond length, bond angle, and dihedral angle, the so-called internal coordinates.
 
-        Disclaimer: The Z-matrix is meant for molecules, current implementation converts atoms within unit cell to molecule.
-        Hence the current implentation might overlook bonds acrosse unit cells.
+        The Z-matrix is computed with NumPy (`xtal2txt.zmatrix.get_zmatrix`) following the
+        conventions of pymatgen's `Molecule.get_zmatrix`, with the values rendered directly
+        at `decimal_places`.
+
+        Disclaimer: The Z-matrix is meant for molecules, by default atoms within the unit cell are treated as a molecule.
+        Hence bonds across unit cells might be overlooked, unless `minimum_image` is set.
+
+        Args:
+            decimal_places (int): The number of decimal places of the bond lengths.
+            minimum_image (bool): Whether to use the periodic images of the reference atoms
+                closest to each atom.
+
+        Returns:
+            str: The Z-matrix representation of the crystal structure.
         """
-        species = [
-            s.element if hasattr(s, "element") else s for s in self.structure.species
-        ]
-        coords = [c for c in self.structure.cart_coords]
-        molecule_ = Molecule(
-            species,
-            coords,
+        return get_zmatrix(
+            self.structure, decimal_places=decimal_places, minimum_image=minimum_image
         )
-        zmatrix = molecule_.get_zmatrix()
-        return self.updated_zmatrix_rep(zmatrix, decimal_places)
 
     def get_all_text_reps(
-        self, decimal_places: int = 2, include_none: bool = False
+        self,
+        decimal_places: int = 2,
+        include_none: bool = False,
+        timeout: Optional[Union[float, Dict[str, float]]] = None,
+        profile_memory: bool = False,
+        concurrent: bool = False,
     ) -> Dict[str, Optional[str]]:
         """
         Returns all the Text representations of the crystal structure in a dictionary.
@@ -578,17 +928,29 @@ class TextRep:
         Args:
             decimal_places: Number of decimal places to round to.
             include_none: Whether to include None values for unimplemented representations.
+            timeout: Wall-clock budget in seconds. A scalar applies to the heavy representations
+                (robocrys_rep, local_env, slices), a dictionary maps representation names to budgets.
+                Representations with a budget run in a supervised subprocess, the ones exceeding it
+                are None and recorded in `timeouts`.
+            profile_memory: Whether to record the peak traced allocation and the RSS delta of each
+                generator in `memory_usage`. Generators run in a subprocess (see `timeout`) are measured
+                there, their entry is missing if they fail or time out.
+            concurrent: Whether to generate the representations concurrently, each in a thread of
+                its own and robocrys_rep, local_env and slices in supervised worker processes of
+                their own. The latency is then about the one of the slowest representation.
+                Not supported together with `profile_memory` or a `profiler`.
 
         Returns:
             dictionary mapping representation names to their values.
         """
-        results = {}
-
         # Generate all registered representations
-        for rep_name, rep_func in self._rep_registry.items():
-            results[rep_name] = self._safe_call(
-                rep_func, decimal_places, rep_name=rep_name
-            )
+        results = self._generate_many(
+            list(self._rep_registry),
+            decimal_places,
+            timeout,
+            profile_memory,
+            concurrent,
+        )
 
         # Add deprecated/unimplemented representations if requested
         if include_none:
@@ -602,6 +964,10 @@ class TextRep:
         requested_reps: Union[str, List[str]],
         decimal_places: int = 2,
         strict: bool = False,
+        timeout: Optional[Union[float, Dict[str, float]]] = None,
+        profile_memory: bool = False,
+        concurrent: bool = False,
+        deadline: Optional[float] = None,
     ) -> Union[Optional[str], Dict[str, Optional[str]]]:
         """
         Returns the requested Text representation(s) of the crystal structure.
@@ -613,6 +979,24 @@ class TextRep:
             strict: If True, raise `ValueError` when an unknown representation is requested.
                 If False (default), unknown representations are logged (if logging is enabled)
                 and `None` is returned for those entries, maintaining backward compatibility.
+            timeout: Wall-clock budget in seconds. A scalar applies to the heavy representations
+                (robocrys_rep, local_env, slices), a dictionary maps representation names to budgets.
+                Representations with a budget run in a supervised subprocess, the ones exceeding it
+                are None and recorded in `timeouts`.
+            profile_memory: Whether to record the peak traced allocation and the RSS delta of each
+                generator in `memory_usage`. Generators run in a subprocess (see `timeout`) are measured
+                there, their entry is missing if they fail or time out.
+            concurrent: Whether to generate the representations concurrently, each in a thread of
+                its own and robocrys_rep, local_env and slices in supervised worker processes of
+                their own. The latency is then about the one of the slowest representation.
+                Not supported together with `profile_memory` or a `profiler`.
+            deadline: Latency budget in seconds for the whole call. The cheap representations
+                (composition, atom_sequences, crystal_text_llm) are generated first and
+                robocrys_rep, local_env and slices last, in supervised subprocesses limited to
+                the remaining budget, including the start of a cold worker process. The others
+                are generated in this process if there is time left. Representations not
+                finished in time are None and recorded in `timeouts`. With a `cache`, the
+                completed ones are served from it by a follow-up call.
 
         Returns:
             If requested_reps is a string: the representation value (or None if failed).
@@ -625,7 +1009,7 @@ class TextRep:
         is_single = isinstance(requested_reps, str)
         reps_iter = [requested_reps] if is_single else list(requested_reps)
 
-        results = []
+        known_reps = []
         for rep_name in reps_iter:
             if rep_name not in self._rep_registry:
                 if strict:
@@ -636,11 +1020,13 @@ class TextRep:
                     )
                 if self.enable_logging:
                     logger.warning(f"Skipping unknown representation: {rep_name}")
-                results.append(None)
                 continue
+            known_reps.append(rep_name)
 
-            rep_func = self._rep_registry[rep_name]
-            results.append(self._safe_call(rep_func, decimal_places, rep_name=rep_name))
+        values = self._generate_many(
+            known_reps, decimal_places, timeout, profile_memory, concurrent, deadline
+        )
+        results = [values.get(rep_name) for rep_name in reps_iter]
 
         # Preserve existing behavior: single-string input returns a single value,
         # list/iterable input returns a dict.
@@ -650,3 +1036,34 @@ class TextRep:
 
         # Return as dict for list inputs
         return dict(zip(reps_iter, results))
+
+    async def aget_requested_text_reps(
+        self, requested_reps: Union[str, List[str]], **kwargs
+    ) -> Union[Optional[str], Dict[str, Optional[str]]]:
+        """
+        Async counterpart of `get_requested_text_reps`, run in the executor of `xtal2txt.aio`.
+
+        Concurrent calls must use different TextRep objects, they share `errors` and `timeouts`.
+
+        Args:
+            requested_reps: A single representation name or an iterable of names to generate.
+            **kwargs: Further arguments of `get_requested_text_reps`.
+
+        Returns:
+            The same as `get_requested_text_reps`.
+        """
+        return await run_in_executor(
+            self.get_requested_text_reps, requested_reps, **kwargs
+        )
+
+    async def aget_all_text_reps(self, **kwargs) -> Dict[str, Optional[str]]:
+        """
+        Async counterpart of `get_all_text_reps`, run in the executor of `xtal2txt.aio`.
+
+        Args:
+            **kwargs: Arguments of `get_all_text_reps`.
+
+        Returns:
+            dictionary mapping representation names to their values.
+        """
+        return await run_in_executor(self.get_all_text_reps, **kwargs)
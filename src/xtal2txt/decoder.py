@@ -4,6 +4,8 @@ from pymatgen.analysis.structure_matcher import StructureMatcher
 from pymatgen.core import Structure
 from pymatgen.core.lattice import Lattice
 
+from xtal2txt.aio import run_in_executor
+
 
 class DecodeTextRep:
     def __init__(self, text):
@@ -12,6 +14,25 @@ class DecodeTextRep:
     def decode(self):
         return self.text
 
+    async def adecode(self):
+        return self.decode()
+
+    async def awyckoff_decoder(self, input: str, lattice_params: bool = False):
+        """Async counterpart of `wyckoff_decoder`, run in the executor of `xtal2txt.aio`."""
+        return await run_in_executor(self.wyckoff_decoder, input, lattice_params)
+
+    async def allm_decoder(self, input: str):
+        """Async counterpart of `llm_decoder`, run in the executor of `xtal2txt.aio`."""
+        return await run_in_executor(self.llm_decoder, input)
+
+    async def acif_string_decoder_p1(self, input: str):
+        """Async counterpart of `cif_string_decoder_p1`, run in the executor of `xtal2txt.aio`."""
+        return await run_in_executor(self.cif_string_decoder_p1, input)
+
+    async def acif_string_decoder_sym(self, input: str):
+        """Async counterpart of `cif_string_decoder_sym`, run in the executor of `xtal2txt.aio`."""
+        return await run_in_executor(self.cif_string_decoder_sym, input)
+
     def wyckoff_decoder(self, input: str, lattice_params: bool = False):
         """
         Generating a pymatgen object from the output of the get_wyckoff_rep() method by using...
@@ -0,0 +1,226 @@
+"""Deduplication of structures ahead of the conversion into text representations.
+
+Public crystal databases contain many duplicates and near-duplicates. Converting
+only one representative per unique crystal and fanning its representations back
+out to the duplicates avoids paying for robocrys, local_env or SLICES more than
+once per crystal.
+
+Structures are bucketed by reduced formula, space group and number of sites. Exact
+copies (same lattice, species and coordinates in any site order) are detected by a
+fingerprint, everything else is compared with `StructureMatcher` against the
+representatives of its bucket only, using the tolerances `MatchRep` uses.
+
+Representations such as the CIF, Crystal-LLM or the Z-matrix depend on the cell,
+so only structures in the same cell are duplicates: supercells, other primitive
+cells and scaled lattices of a crystal are kept as representatives of their own.
+
+.. code-block:: python
+
+        result = deduplicate({"mp-1": structure_1, "mp-2": structure_2})
+        reps = {
+            structure_id: TextRep(structure).get_all_text_reps()
+            for structure_id, structure in result.representatives.items()
+        }
+        all_reps = result.fan_out(reps)
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from pymatgen.analysis.structure_matcher import StructureMatcher
+from pymatgen.core import Structure
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+from xtal2txt.cache import structure_fingerprint
+
+
+@dataclass
+class DeduplicationResult:
+    """
+    Representatives of the unique structures and the mapping of every structure to its representative.
+
+    Attributes:
+        representatives : unique structures by id, in input order
+        duplicate_of : representative id of every input id (representatives map to themselves)
+    """
+
+    representatives: Dict[str, Structure] = field(default_factory=dict)
+    duplicate_of: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def duplicates(self) -> Dict[str, str]:
+        """Mapping of the ids of the duplicates to the ids of their representatives."""
+        return {
+            structure_id: representative
+            for structure_id, representative in self.duplicate_of.items()
+            if structure_id != representative
+        }
+
+    def groups(self) -> Dict[str, List[str]]:
+        """Return the ids of all structures represented by each representative."""
+        groups = {representative: [] for representative in self.representatives}
+        for structure_id, representative in self.duplicate_of.items():
+            groups[representative].append(structure_id)
+        return groups
+
+    def fan_out(self, results: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Assign the results computed for the representatives to all structures.
+
+        Args:
+            results: Results by representative id, e.g. the text representations.
+
+        Returns:
+            Dict[str, Any]: Results by the id of every input structure. Structures
+                whose representative has no result are left out.
+        """
+        return {
+            structure_id: results[representative]
+            for structure_id, representative in self.duplicate_of.items()
+            if representative in results
+        }
+
+
+def canonical_fingerprint(structure: Structure, decimal_places: int = 6) -> str:
+    """
+    Compute a fingerprint of a structure that does not depend on the order of its sites.
+
+    Args:
+        structure: pymatgen Structure object.
+        decimal_places: Number of decimal places the lattice and coordinates are rounded to.
+
+    Returns:
+        str: Hex digest identifying the structure.
+    """
+    sites = sorted(
+        structure,
+        key=lambda site: (
+            site.species_string,
+            tuple(round(x % 1.0, decimal_places) % 1.0 for x in site.frac_coords),
+        ),
+    )
+    return structure_fingerprint(Structure.from_sites(sites), decimal_places)
+
+
+def bucket_key(structure: Structure, symprec: float = 0.1) -> Tuple[str, int, int]:
+    """
+    Key of the bucket a structure is matched in.
+
+    Args:
+        structure: pymatgen Structure object.
+        symprec: Tolerance of the space group determination.
+
+    Returns:
+        Tuple[str, int, int]: Reduced formula, space group number (0 if spglib fails)
+            and number of sites.
+    """
+    try:
+        spacegroup = SpacegroupAnalyzer(
+            structure, symprec=symprec
+        ).get_space_group_number()
+    except Exception:
+        spacegroup = 0
+    return structure.composition.reduced_formula, spacegroup, len(structure)
+
+
+class StructureDeduplicator:
+    """
+    Incrementally group structures into unique crystals.
+
+    Near-duplicates whose space group differs at the given `symprec` end up in
+    different buckets and are not matched. The default matcher compares the cells
+    as they are, without reducing them to primitive cells or scaling the volumes.
+
+    Attributes:
+        matcher : StructureMatcher used within the buckets
+        symprec : tolerance of the space group determination
+        result : representatives and duplicate map of the structures added so far
+    """
+
+    def __init__(
+        self,
+        ltol: float = 0.2,
+        stol: float = 0.5,
+        angle_tol: float = 5,
+        symprec: float = 0.1,
+        matcher: Optional[StructureMatcher] = None,
+    ) -> None:
+        """
+        Initialize StructureDeduplicator instance.
+
+        Args:
+            ltol: Fractional length tolerance of the StructureMatcher.
+            stol: Site tolerance of the StructureMatcher.
+            angle_tol: Angle tolerance in degrees of the StructureMatcher.
+            symprec: Tolerance of the space group determination.
+            matcher: StructureMatcher to use instead of one built from the tolerances.
+        """
+        self.matcher = matcher or StructureMatcher(
+            ltol=ltol,
+            stol=stol,
+            angle_tol=angle_tol,
+            primitive_cell=False,
+            scale=False,
+        )
+        self.symprec = symprec
+        self.result = DeduplicationResult()
+        self._buckets: Dict[Tuple[str, int, int], List[str]] = {}
+        self._fingerprints: Dict[str, str] = {}
+
+    def add(self, structure_id: str, structure: Structure) -> str:
+        """
+        Add a structure and return the id of its representative.
+
+        Args:
+            structure_id: Identifier of the structure, must be unique.
+            structure: pymatgen Structure object.
+
+        Returns:
+            str: Id of the representative, structure_id if the structure is new.
+        """
+        if structure_id in self.result.duplicate_of:
+            raise ValueError(f"Duplicate structure id '{structure_id}'")
+
+        fingerprint = canonical_fingerprint(structure)
+        representative = self._fingerprints.get(fingerprint)
+        if representative is None:
+            bucket = self._buckets.setdefault(bucket_key(structure, self.symprec), [])
+            representative = next(
+                (
+                    candidate
+                    for candidate in bucket
+                    if self.matcher.fit(
+                        self.result.representatives[candidate], structure
+                    )
+                ),
+                None,
+            )
+            if representative is None:
+                representative = structure_id
+                bucket.append(structure_id)
+                self.result.representatives[structure_id] = structure
+            self._fingerprints[fingerprint] = representative
+
+        self.result.duplicate_of[structure_id] = representative
+        return representative
+
+
+def deduplicate(
+    structures: Union[Mapping[str, Structure], Iterable[Tuple[str, Structure]]],
+    **kwargs,
+) -> DeduplicationResult:
+    """
+    Group structures into unique crystals.
+
+    Args:
+        structures: Structures by id, as mapping or iterable of (id, structure) pairs.
+        **kwargs: Arguments of `StructureDeduplicator`.
+
+    Returns:
+        DeduplicationResult: Representatives and duplicate map.
+    """
+    deduplicator = StructureDeduplicator(**kwargs)
+    items = structures.items() if isinstance(structures, Mapping) else structures
+    for structure_id, structure in items:
+        deduplicator.add(structure_id, structure)
+    return deduplicator.result
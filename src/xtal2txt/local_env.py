@@ -1,12 +1,25 @@
 """Analyze the local environment of atoms in a structure.
 
-This module requires installation of Openbabel, e.g. via conda:
+The SMILES of the local environments are written by Openbabel or by a native
+writer for the star graphs of the environments (`smiles_backend`). The two backends
+write different strings for the same environment, see `star_smiles`. The default
+backend is Openbabel if it is installed, so the local environment strings depend on
+the installation unless the backend is set, e.g. with the `XTAL2TXT_SMILES_BACKEND`
+environment variable. Openbabel can be installed, e.g. via conda:
 
 .. code-block:: bash
 
         conda install -c conda-forge openbabel
 """
 
+import json
+import multiprocessing
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from pathlib import Path
+
 from pymatgen.analysis.chemenv.coordination_environments.chemenv_strategies import (
     SimplestChemenvStrategy,
 )
@@ -16,54 +29,470 @@ from pymatgen.analysis.chemenv.coordination_environments.coordination_geometry_f
 from pymatgen.analysis.chemenv.coordination_environments.structure_environments import (
     LightStructureEnvironments,
 )
-from pymatgen.core import Structure, Molecule
+from pymatgen.core import PeriodicSite, Structure, Molecule
 from pymatgen.analysis.graphs import MoleculeGraph
 from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from pymatgen.analysis.chemenv.coordination_environments.coordination_geometries import (
-    AllCoordinationGeometries,
-)
+from pymatgen.symmetry.structure import SymmetrizedStructure
 from pymatgen.io.babel import BabelMolAdaptor
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional, Union
+
+import numpy as np
+
+from xtal2txt.workers import get_shared_pool
+
+try:
+    from openbabel import openbabel  # noqa: F401
+
+    HAS_OPENBABEL = True
+except ImportError:
+    HAS_OPENBABEL = False
+
+SMILES_BACKENDS = ("native", "openbabel")
+
+#: "exact" fits coordination geometries with ChemEnv, "fast" only uses a neighbour list
+MODES = ("exact", "fast")
+
+#: Neighbour list radii (in angstrom) the fast mode starts with and gives up at
+FAST_MODE_START_RADIUS = 3.0
+FAST_MODE_MAX_RADIUS = 24.0
+
+#: Minimum number of inequivalent sites distributed over the `n_workers` processes of
+#: `LocalEnvAnalyzer`, structures with fewer sites are analyzed in the calling process
+PARALLEL_MIN_SITES = 16
+
+#: SMILES backend used if none is passed to `LocalEnvAnalyzer`
+DEFAULT_SMILES_BACKEND = os.environ.get("XTAL2TXT_SMILES_BACKEND") or (
+    "openbabel" if HAS_OPENBABEL else "native"
+)
+
+#: Standard valences of the SMILES organic subset, atoms with other degrees are bracketed
+ORGANIC_SUBSET_VALENCES = {
+    "B": (3,),
+    "C": (4,),
+    "N": (3, 5),
+    "O": (2,),
+    "P": (3, 5),
+    "S": (2, 4, 6),
+    "F": (1,),
+    "Cl": (1,),
+    "Br": (1,),
+    "I": (1,),
+}
+
+
+def _smiles_atom(symbol: str, degree: int) -> str:
+    """Write an atom without hydrogens, bracketed unless no implicit hydrogens would be added."""
+    if degree in ORGANIC_SUBSET_VALENCES.get(symbol, ()):
+        return symbol
+    return f"[{symbol}]"
+
+
+def star_smiles(center: str, neighbors: List[str]) -> str:
+    """Write the SMILES of a centre atom bonded to each of its neighbours.
+
+    The neighbours are ordered by their element symbols, the first one starts the
+    SMILES, the last one follows the centre and the others are branches, e.g.
+    `star_smiles("Cu", ["S"] * 4)` gives "[S][Cu]([S])([S])[S]". The SMILES only
+    depends on the elements, but it is not the string Openbabel writes: Openbabel
+    orders the atoms canonically and perceives the bonds from the geometry, e.g.
+    "[Cu]S([In])([In])[Cu]" instead of "[Cu]S([Cu])([In])[In]", and
+    "[S][In]([S])[S].[S]" if one neighbour is too far for a bond.
+
+    Args:
+        center: Element symbol of the centre atom.
+        neighbors: Element symbols of the neighbours.
+
+    Returns:
+        str: The SMILES of the star graph.
+    """
+    atoms = [_smiles_atom(symbol, 1) for symbol in sorted(neighbors)]
+    center_atom = _smiles_atom(center, len(neighbors))
+    if not atoms:
+        return center_atom
+    if len(atoms) == 1:
+        return atoms[0] + center_atom
+    branches = "".join(f"({atom})" for atom in atoms[1:-1])
+    return atoms[0] + center_atom + branches + atoms[-1]
+
+
+def _element_symbol(site) -> str:
+    specie = site.specie
+    return getattr(specie, "element", specie).symbol
+
+
+class ChemenvEngine:
+    """
+    Chemenv objects to determine coordination environments with fixed cutoffs.
+
+    Setting up a `LocalGeometryFinder` parses the library of coordination
+    geometries, engines are therefore reused (see `get_chemenv_engine`).
+
+    Attributes:
+        geometry_finder : LocalGeometryFinder computing the structure environments
+        strategy : SimplestChemenvStrategy with the distance and angle cutoffs
+        all_geometries : AllCoordinationGeometries of the geometry finder
+    """
+
+    def __init__(self, distance_cutoff: float, angle_cutoff: float) -> None:
+        self.geometry_finder = LocalGeometryFinder()
+        self.strategy = SimplestChemenvStrategy(
+            distance_cutoff=distance_cutoff, angle_cutoff=angle_cutoff
+        )
+        self.all_geometries = self.geometry_finder.allcg
+
+
+# the geometry finder and the strategy keep the structure they were last used with,
+# engines are therefore not shared between threads
+_engines = threading.local()
+
+
+def get_chemenv_engine(
+    distance_cutoff: float = 1.4, angle_cutoff: float = 0.3
+) -> ChemenvEngine:
+    """
+    Get the chemenv engine of the current thread for the given cutoffs.
+
+    Args:
+        distance_cutoff: The distance cutoff of the strategy.
+        angle_cutoff: The angle cutoff of the strategy.
+
+    Returns:
+        ChemenvEngine: The engine, created on the first call.
+    """
+    engines = getattr(_engines, "engines", None)
+    if engines is None:
+        engines = _engines.engines = {}
+    key = (distance_cutoff, angle_cutoff)
+    if key not in engines:
+        engines[key] = ChemenvEngine(distance_cutoff, angle_cutoff)
+    return engines[key]
+
+
+def warm_up(distance_cutoff: float = 1.4, angle_cutoff: float = 0.3) -> None:
+    """
+    Create the chemenv engine of the current thread ahead of the first structure.
+
+    Meant as initializer of worker processes, so that the set-up is paid once per worker.
+
+    Args:
+        distance_cutoff: The distance cutoff of the strategy.
+        angle_cutoff: The angle cutoff of the strategy.
+    """
+    get_chemenv_engine(distance_cutoff, angle_cutoff)
+
+
+def environment_fingerprint(
+    center, neighbors: list, ce_symbol: Optional[str], smiles_backend: str
+) -> Tuple[str, Tuple[str, ...], Optional[str], str]:
+    """
+    Canonical fingerprint of a local environment.
+
+    Args:
+        center: Site at the centre of the environment.
+        neighbors: Neighbouring sites.
+        ce_symbol: Symbol of the coordination geometry.
+        smiles_backend: SMILES backend the environment is written with.
+
+    Returns:
+        Tuple[str, Tuple[str, ...], Optional[str], str]: Species of the centre, sorted
+            species of the neighbours, coordination geometry symbol and SMILES backend.
+    """
+    return (
+        center.species_string,
+        tuple(sorted(site.species_string for site in neighbors)),
+        ce_symbol,
+        smiles_backend,
+    )
+
+
+class EnvironmentCache:
+    """
+    Bounded LRU cache of the SMILES of local environments, keyed by `environment_fingerprint`.
+
+    Only the SMILES of the native backend are memoized, they only depend on the
+    fingerprint. Openbabel perceives bonds between the neighbours from their distances,
+    so environments with the same fingerprint can have different SMILES.
+
+    Attributes:
+        max_size : maximum number of environments kept, the least recently used ones are evicted
+        path : optional JSON file the cache is loaded from and saved to
+        hits : number of lookups that found an environment
+        misses : number of lookups that did not
+    """
+
+    def __init__(
+        self, max_size: int = 100_000, path: Optional[Union[str, Path]] = None
+    ) -> None:
+        """
+        Args:
+            max_size: Maximum number of environments kept.
+            path: JSON file to persist the cache in, loaded if it exists.
+        """
+        self.max_size = max_size
+        self.path = Path(path) if path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load(self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Look up the SMILES of an environment, None if it is not cached."""
+        with self._lock:
+            smiles = self._entries.get(key)
+            if smiles is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return smiles
+
+    def set(self, key: tuple, smiles: str) -> None:
+        """Store the SMILES of an environment."""
+        with self._lock:
+            self._entries[key] = smiles
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Add the environments saved in a JSON file."""
+        with open(path, "r", encoding="utf-8") as file:
+            entries = json.load(file)
+        for (center, neighbors, ce_symbol, backend), smiles in entries:
+            self.set((center, tuple(neighbors), ce_symbol, backend), smiles)
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        """Save the environments to a JSON file, by default to `path`."""
+        path = path if path is not None else self.path
+        if path is None:
+            raise ValueError("No path to save the environment cache to")
+        with self._lock:
+            entries = [[list(key), smiles] for key, smiles in self._entries.items()]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(entries, file)
+
+
+_env_cache: Optional[EnvironmentCache] = None
+
+_CACHE_BYPASSED = (
+    "The environment cache only memoizes the native SMILES backend, the default "
+    "backend is '{backend}'. Pass smiles_backend='native' or set "
+    "XTAL2TXT_SMILES_BACKEND=native to use it."
+)
+
+
+def enable_env_cache(cache: Optional[EnvironmentCache] = None) -> EnvironmentCache:
+    """
+    Start memoizing the SMILES of local environments in all analyzers using the native backend.
+
+    Analyzers using Openbabel do not use the cache, a warning is issued if Openbabel
+    is the default backend.
+
+    Args:
+        cache: Cache to use, a new one is created if None.
+
+    Returns:
+        EnvironmentCache: The active cache.
+    """
+    global _env_cache
+    if DEFAULT_SMILES_BACKEND != "native":
+        warnings.warn(_CACHE_BYPASSED.format(backend=DEFAULT_SMILES_BACKEND))
+    _env_cache = cache if cache is not None else EnvironmentCache()
+    return _env_cache
 
-strategy = SimplestChemenvStrategy()
 
-lgf = LocalGeometryFinder()
+def disable_env_cache() -> None:
+    """Stop memoizing the SMILES of local environments."""
+    global _env_cache
+    _env_cache = None
+
+
+def get_env_cache() -> Optional[EnvironmentCache]:
+    """Return the active environment cache, None if memoization is disabled."""
+    return _env_cache
 
 
 class LocalEnvAnalyzer:
     """A class to analyze the local environment of atoms in a structure."""
 
-    def __init__(self, distance_cutoff: float = 1.4, angle_cutoff: float = 0.3):
+    def __init__(
+        self,
+        distance_cutoff: float = 1.4,
+        angle_cutoff: float = 0.3,
+        smiles_backend: Optional[str] = None,
+        env_cache: Optional[EnvironmentCache] = None,
+        mode: str = "exact",
+        n_workers: int = 1,
+    ):
         """
         Args:
             distance_cutoff: The distance cutoff to use for determining the nearest neighbors of each atom.
             angle_cutoff: The angle cutoff to use for determining the nearest neighbors of each atom.
+            smiles_backend: "native" or "openbabel", defaults to `DEFAULT_SMILES_BACKEND`.
+            env_cache: Cache of the SMILES of environments, defaults to the one of `enable_env_cache`.
+                Only used with the native SMILES backend, passing one with Openbabel issues a warning.
+                The "Molecule" of an environment found in the cache is None.
+            mode: "exact" determines the neighbours and the coordination geometries with ChemEnv.
+                "fast" takes all neighbours closer than `distance_cutoff` times the distance to the
+                nearest neighbour from a periodic neighbour list, ignores `angle_cutoff` and does
+                not fit coordination geometries ("Environment" is None).
+            n_workers: Number of processes the sites are distributed over if there are at
+                least `PARALLEL_MIN_SITES` inequivalent sites. The processes are a pool
+                shared by the analyzers with the same cutoffs (`xtal2txt.workers.get_shared_pool`),
+                started with the chemenv engine set up on first use. The environments are the
+                same and in the same order as with a single process. Environments found by
+                workers are not added to the environment cache.
         """
+        self.n_workers = n_workers
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', use one of {MODES}")
+        self.mode = mode
+        self.env_cache = env_cache
         self.distance_cutoff = distance_cutoff
         self.angle_cutoff = angle_cutoff
+        self.smiles_backend = smiles_backend or DEFAULT_SMILES_BACKEND
+        if self.smiles_backend not in SMILES_BACKENDS:
+            raise ValueError(
+                f"Unknown SMILES backend '{self.smiles_backend}', use one of {SMILES_BACKENDS}"
+            )
+        if env_cache is not None and self.smiles_backend != "native":
+            warnings.warn(_CACHE_BYPASSED.format(backend=self.smiles_backend))
 
     def get_local_environments(
-        self, structure: Structure
+        self,
+        structure: Structure,
+        symmetrized_structure: Optional[SymmetrizedStructure] = None,
     ) -> Tuple[List[dict], List[dict], str]:
         """Get the local environments of the atoms in a structure.
 
         Args:
             structure: pymatgen Structure object
+            symmetrized_structure: The symmetrized structure, if it has already been computed.
 
         Returns:
             Tuple[List[dict], List[dict]]: A list of dictionaries containing the local environments of the atoms in the structure,
-                and a list of dictionaries containing the unknown sites.
+                and a list of dictionaries containing the unknown sites. The "Molecule" of environments
+                found in the environment cache is None.
         """
         # since we do not want all chemical environments, but only the ones that are unique
         # we need to get the symmetrized structure
-        sga = SpacegroupAnalyzer(structure)
-        symm_struct = sga.get_symmetrized_structure()
+        symm_struct = symmetrized_structure
+        if symm_struct is None:
+            symm_struct = SpacegroupAnalyzer(structure).get_symmetrized_structure()
 
         inequivalent_indices = [
             indices[0] for indices in symm_struct.equivalent_indices
         ]
         wyckoffs = symm_struct.wyckoff_symbols
 
+        if self._parallel(len(inequivalent_indices)):
+            site_envs = self._parallel_site_environments(
+                structure, inequivalent_indices
+            )
+        else:
+            site_envs = self._site_environments(structure, inequivalent_indices)
+
+        envs = []
+        unknown_sites = []
+        for index, wyckoff in zip(inequivalent_indices, wyckoffs):
+            if index not in site_envs:
+                unknown_sites.append(f"{structure[index].species_string} ({wyckoff})")
+                continue
+            envs.append(
+                {
+                    "Site": structure[index].species_string,
+                    "Wyckoff Label": wyckoff,
+                    **site_envs[index],
+                }
+            )
+
+        return envs, unknown_sites, symm_struct.spacegroup.int_symbol
+
+    def _site_environments(
+        self, structure: Structure, indices: List[int]
+    ) -> Dict[int, dict]:
+        """
+        Determine the environments of sites.
+
+        Returns:
+            Dict[int, dict]: "Environment", "Molecule" and "SMILES" of each site with neighbours.
+        """
+        if self.mode == "fast":
+            environments = self._neighbor_list_environments(structure, indices)
+        else:
+            environments = self._chemenv_environments(structure, indices)
+        env_cache = self.env_cache if self.env_cache is not None else _env_cache
+        if self.smiles_backend != "native":
+            # Openbabel SMILES depend on the geometry, not only on the fingerprint
+            env_cache = None
+
+        site_envs = {}
+        for index in indices:
+            if index not in environments:
+                continue
+            neighbors, ce_symbol, co = environments[index]
+            key = environment_fingerprint(
+                structure[index], neighbors, ce_symbol, self.smiles_backend
+            )
+            smiles = env_cache.get(key) if env_cache is not None else None
+            mg = None
+            if smiles is None:
+                mg = self._molecule_graph(structure[index], neighbors)
+                smiles = self._smiles(structure[index], neighbors, mg)
+                if env_cache is not None:
+                    env_cache.set(key, smiles)
+            site_envs[index] = {"Environment": co, "Molecule": mg, "SMILES": smiles}
+        return site_envs
+
+    def _parallel(self, n_sites: int) -> bool:
+        # daemonic processes, e.g. the supervised workers of TextRep, cannot have children
+        return (
+            self.n_workers > 1
+            and n_sites >= PARALLEL_MIN_SITES
+            and not multiprocessing.current_process().daemon
+        )
+
+    def _parallel_site_environments(
+        self, structure: Structure, indices: List[int]
+    ) -> Dict[int, dict]:
+        """Determine the environments of sites in chunks on the shared `n_workers` pool."""
+        n_chunks = min(self.n_workers, len(indices))
+        # interleaved chunks balance the expensive sites, which tend to be adjacent
+        chunks = [indices[k::n_chunks] for k in range(n_chunks)]
+        params = {
+            "distance_cutoff": self.distance_cutoff,
+            "angle_cutoff": self.angle_cutoff,
+            "smiles_backend": self.smiles_backend,
+            "mode": self.mode,
+        }
+        # the pool is spawned once and its workers keep their chemenv engine
+        pool = get_shared_pool(
+            self.n_workers, warm_up, (self.distance_cutoff, self.angle_cutoff)
+        )
+        futures = [
+            pool.submit(_site_environments_task, params, structure, chunk)
+            for chunk in chunks
+        ]
+        site_envs = {}
+        for future in futures:
+            site_envs.update(future.result())
+        return site_envs
+
+    def _chemenv_environments(
+        self, structure: Structure, indices: List[int]
+    ) -> Dict[int, tuple]:
+        """
+        Determine the neighbours and coordination geometries of sites with ChemEnv.
+
+        Returns:
+            Dict[int, tuple]: neighbouring sites, coordination geometry symbol and
+                coordination geometry of each site with neighbours.
+        """
         # a Voronoi tessellation is used to determine the local environment of each atom
         # that is, the nearest neighbors of each atom
         # this has been proposed in O’Keeffe, M. (1979). Acta Cryst. A35, 772–775.
@@ -72,58 +501,106 @@ class LocalEnvAnalyzer:
         # to determine the coordination environment of each atom
         # according to the tutorial (https://matgenb.materialsvirtuallab.org/2018/01/01/ChemEnv-How-to-automatically-identify-coordination-environments-in-a-structure.html)
         # "The strategy is correct in about 85% of the cases if one uses distance_cutoff=1.4 and angle_cutoff=0.3"
-        lgf = LocalGeometryFinder()
-        lgf.setup_structure(structure=structure)
-        se = lgf.compute_structure_environments(
+        engine = get_chemenv_engine(self.distance_cutoff, self.angle_cutoff)
+        engine.geometry_finder.setup_structure(structure=structure)
+        se = engine.geometry_finder.compute_structure_environments(
             maximum_distance_factor=self.distance_cutoff + 0.01,
-            only_indices=inequivalent_indices,
-        )
-        strategy = SimplestChemenvStrategy(
-            distance_cutoff=self.distance_cutoff, angle_cutoff=self.angle_cutoff
+            only_indices=indices,
         )
         lse = LightStructureEnvironments.from_structure_environments(
-            strategy=strategy, structure_environments=se
+            strategy=engine.strategy, structure_environments=se
         )
 
-        all_ce = AllCoordinationGeometries()
-
-        envs = []
-        unknown_sites = []
-        for index, wyckoff in zip(inequivalent_indices, wyckoffs):
+        environments = {}
+        for index in indices:
             if not lse.neighbors_sets[index]:
-                unknown_sites.append(f"{structure[index].species_string} ({wyckoff})")
                 continue
-
-            # represent the local environment as a molecule
-            mol = Molecule.from_sites(
-                [structure[index]] + lse.neighbors_sets[index][0].neighb_sites
-            )
-            mol = mol.get_centered_molecule()
-            mg = MoleculeGraph.with_empty_graph(molecule=mol)
-            for i in range(1, len(mol)):
-                mg.add_edge(0, i)
-
-            env = lse.coordination_environments[index]
+            ce_symbol = lse.coordination_environments[index][0]["ce_symbol"]
             try:
-                co = all_ce.get_geometry_from_mp_symbol(env[0]["ce_symbol"])
+                co = engine.all_geometries.get_geometry_from_mp_symbol(ce_symbol)
             except KeyError:
                 co = "Unknown"
-            moladapter = BabelMolAdaptor.from_molecule_graph(mg)
-            smiles = moladapter.pybel_mol.write("can").strip()
-            envs.append(
-                {
-                    "Site": structure[index].species_string,
-                    "Wyckoff Label": wyckoff,
-                    "Environment": co,
-                    "Molecule": mg,
-                    "SMILES": smiles,
-                }
+            environments[index] = (
+                lse.neighbors_sets[index][0].neighb_sites,
+                ce_symbol,
+                co,
             )
+        return environments
 
-        return envs, unknown_sites, symm_struct.spacegroup.int_symbol
+    def _neighbor_list_environments(
+        self, structure: Structure, indices: List[int]
+    ) -> Dict[int, tuple]:
+        """
+        Determine the neighbours of sites with a periodic neighbour list.
+
+        The neighbours of a site are all sites closer than `distance_cutoff` times the
+        distance to its nearest neighbour. The radius of the neighbour list is doubled
+        for the sites whose neighbours might lie beyond it.
+
+        Returns:
+            Dict[int, tuple]: neighbouring sites, None and None of each site with neighbours.
+        """
+        environments = {}
+        remaining = list(indices)
+        radius = FAST_MODE_START_RADIUS
+        while remaining and radius <= FAST_MODE_MAX_RADIUS:
+            centers, points, images, distances = structure.get_neighbor_list(
+                radius, sites=[structure[index] for index in remaining]
+            )
+            retry = []
+            for k, index in enumerate(remaining):
+                # the neighbour list of explicitly given sites contains the sites themselves
+                candidates = np.flatnonzero((centers == k) & (distances > 1e-8))
+                if len(candidates) == 0:
+                    retry.append(index)
+                    continue
+                cutoff = self.distance_cutoff * distances[candidates].min()
+                if cutoff > radius:
+                    retry.append(index)
+                    continue
+                selected = candidates[distances[candidates] <= cutoff + 1e-6]
+                selected = selected[np.argsort(distances[selected], kind="stable")]
+                environments[index] = (
+                    [
+                        PeriodicSite(
+                            structure[points[j]].species,
+                            structure[points[j]].frac_coords + images[j],
+                            structure.lattice,
+                            properties=structure[points[j]].properties,
+                        )
+                        for j in selected
+                    ],
+                    None,
+                    None,
+                )
+            remaining = retry
+            radius *= 2
+        return environments
+
+    @staticmethod
+    def _molecule_graph(center, neighbors: list) -> MoleculeGraph:
+        """Represent a local environment as a molecule with a bond from the centre to each neighbour."""
+        mol = Molecule.from_sites([center] + neighbors)
+        mol = mol.get_centered_molecule()
+        mg = MoleculeGraph.with_empty_graph(molecule=mol)
+        for i in range(1, len(mol)):
+            mg.add_edge(0, i)
+        return mg
+
+    def _smiles(self, center, neighbors: list, mg: MoleculeGraph) -> str:
+        """Write the SMILES of a local environment with the SMILES backend."""
+        if self.smiles_backend == "native":
+            return star_smiles(
+                _element_symbol(center), [_element_symbol(site) for site in neighbors]
+            )
+        moladapter = BabelMolAdaptor.from_molecule_graph(mg)
+        return moladapter.pybel_mol.write("can").strip()
 
     def structure_to_local_env_string(
-        self, structure: Structure, add_space_group: bool = True
+        self,
+        structure: Structure,
+        add_space_group: bool = True,
+        symmetrized_structure: Optional[SymmetrizedStructure] = None,
     ) -> str:
         """Convert a structure to a string representation of its local environments.
 
@@ -134,11 +611,14 @@ class LocalEnvAnalyzer:
         Args:
             structure (Structure): pymatgen Structure object
             add_space_group (bool): Whether to add the space group to the string. Defaults to True.
+            symmetrized_structure (SymmetrizedStructure, optional): The symmetrized structure, if it has already been computed.
 
         Returns:
             str: A string representation of the local environments of the atoms in the structure.
         """
-        envs, unknown_sites, spacegroup = self.get_local_environments(structure)
+        envs, unknown_sites, spacegroup = self.get_local_environments(
+            structure, symmetrized_structure
+        )
         env_str = []
 
         if add_space_group:
@@ -152,3 +632,10 @@ class LocalEnvAnalyzer:
             for site in unknown_sites:
                 env_str.append(str(site))
         return "\n".join(env_str)
+
+
+def _site_environments_task(
+    params: dict, structure: Structure, indices: List[int]
+) -> Dict[int, dict]:
+    """Worker function: determine the environments of a chunk of sites."""
+    return LocalEnvAnalyzer(**params)._site_environments(structure, indices)
@@ -0,0 +1,232 @@
+"""Opt-in metrics for representation generators and tokenizers.
+
+When enabled, every representation generated through `TextRep` records its latency
+and outcome, and every call of a tokenizer entry point records its latency and the
+number of tokens produced, padding excluded. The collected metrics can be inspected from Python or
+dumped as JSON or in the Prometheus text exposition format.
+
+.. code-block:: python
+
+        from xtal2txt import metrics
+
+        registry = metrics.enable_metrics()
+        ...  # generate representations, tokenize
+        print(registry.to_prometheus())
+"""
+
+import bisect
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+#: Upper bounds (in seconds) of the latency histogram buckets, ten per decade from 0.1 ms to 10^4 s.
+LATENCY_BUCKETS: List[float] = [10 ** (i / 10) for i in range(-40, 41)]
+
+
+class LatencyHistogram:
+    """Histogram of latencies with fixed, logarithmically spaced buckets."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add one observation to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation within the bucket that contains it.
+
+        Args:
+            q: The quantile, between 0 and 1.
+
+        Returns:
+            The estimated quantile in seconds, None if there are no observations.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread-safe collection of representation and tokenizer metrics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all collected metrics."""
+        with self._lock:
+            self._latencies: Dict[str, LatencyHistogram] = {}
+            self._outcomes: Dict[str, Dict[str, int]] = {}
+            self._tokenizers: Dict[str, Dict[str, float]] = {}
+
+    def observe_representation(
+        self, rep_name: str, seconds: float, outcome: str = "ok"
+    ) -> None:
+        """
+        Record one call of a representation generator.
+
+        Args:
+            rep_name: Name of the representation.
+            seconds: Wall-clock time of the call.
+            outcome: "ok", "failure" or "timeout".
+        """
+        with self._lock:
+            if rep_name not in self._latencies:
+                self._latencies[rep_name] = LatencyHistogram()
+                self._outcomes[rep_name] = {"ok": 0, "failure": 0, "timeout": 0}
+            self._latencies[rep_name].observe(seconds)
+            self._outcomes[rep_name][outcome] += 1
+
+    def observe_tokenization(
+        self, tokenizer_name: str, seconds: float, n_tokens: int
+    ) -> None:
+        """
+        Record one call of a tokenizer entry point.
+
+        Args:
+            tokenizer_name: Name of the tokenizer class.
+            seconds: Wall-clock time of the call.
+            n_tokens: Number of tokens produced, padding excluded.
+        """
+        with self._lock:
+            stats = self._tokenizers.setdefault(
+                tokenizer_name, {"calls": 0, "tokens": 0, "seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["tokens"] += n_tokens
+            stats["seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        """
+        Get a summary of the collected metrics.
+
+        Returns:
+            dict: Per representation the number of calls, failures and timeouts and the
+                p50/p95/p99 latencies, per tokenizer the number of calls and tokens and the throughput.
+        """
+        with self._lock:
+            representations = {}
+            for rep_name, histogram in self._latencies.items():
+                outcomes = self._outcomes[rep_name]
+                representations[rep_name] = {
+                    "calls": histogram.count,
+                    "failures": outcomes["failure"],
+                    "timeouts": outcomes["timeout"],
+                    "total_seconds": histogram.sum,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p95_seconds": histogram.quantile(0.95),
+                    "p99_seconds": histogram.quantile(0.99),
+                    "max_seconds": histogram.max,
+                }
+            tokenizers = {}
+            for tokenizer_name, stats in self._tokenizers.items():
+                tokenizers[tokenizer_name] = {
+                    **stats,
+                    "tokens_per_second": (
+                        stats["tokens"] / stats["seconds"] if stats["seconds"] else None
+                    ),
+                }
+        return {"representations": representations, "tokenizers": tokenizers}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Dump the snapshot as JSON string."""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Dump the collected metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP xtal2txt_representation_seconds Latency of representation generators.",
+            "# TYPE xtal2txt_representation_seconds histogram",
+        ]
+        with self._lock:
+            for rep_name, histogram in self._latencies.items():
+                label = f'representation="{rep_name}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'xtal2txt_representation_seconds_bucket{{{label},le="{bound:.6g}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'xtal2txt_representation_seconds_bucket{{{label},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(
+                    f"xtal2txt_representation_seconds_sum{{{label}}} {histogram.sum}"
+                )
+                lines.append(
+                    f"xtal2txt_representation_seconds_count{{{label}}} {histogram.count}"
+                )
+            for metric, outcome in [("failures", "failure"), ("timeouts", "timeout")]:
+                lines.append(f"# TYPE xtal2txt_representation_{metric}_total counter")
+                for rep_name, outcomes in self._outcomes.items():
+                    lines.append(
+                        f'xtal2txt_representation_{metric}_total{{representation="{rep_name}"}} '
+                        f"{outcomes[outcome]}"
+                    )
+            for metric in ["calls", "tokens", "seconds"]:
+                lines.append(f"# TYPE xtal2txt_tokenizer_{metric}_total counter")
+                for tokenizer_name, stats in self._tokenizers.items():
+                    lines.append(
+                        f'xtal2txt_tokenizer_{metric}_total{{tokenizer="{tokenizer_name}"}} '
+                        f"{stats[metric]}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def enable_metrics(registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """
+    Start collecting metrics.
+
+    Args:
+        registry: Registry to collect into, a new one is created if None.
+
+    Returns:
+        MetricsRegistry: The active registry.
+    """
+    global _registry
+    _registry = registry if registry is not None else MetricsRegistry()
+    return _registry
+
+
+def disable_metrics() -> None:
+    """Stop collecting metrics."""
+    global _registry
+    _registry = None
+
+
+def get_metrics() -> Optional[MetricsRegistry]:
+    """Return the active registry, None if metrics are disabled."""
+    return _registry
+
+
+def observe_tokenization(tokenizer_name: str, start: float, n_tokens: int) -> None:
+    """Record a tokenizer call that started at `start` (`time.perf_counter`), if metrics are enabled."""
+    if _registry is not None:
+        _registry.observe_tokenization(
+            tokenizer_name, time.perf_counter() - start, n_tokens
+        )
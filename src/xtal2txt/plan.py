@@ -0,0 +1,124 @@
+"""Execution plans sharing structural intermediates between representations.
+
+Several representations start from the same intermediate, e.g. the symmetrized
+structure is needed for the symmetrized CIF and for the local environments. An
+`ExecutionPlan` lists the intermediates a set of representations needs and computes
+each of them at most once, on first use.
+
+.. code-block:: python
+
+        plan = ExecutionPlan(structure, ["cif_symmetrized", "local_env", "composition"])
+        plan.describe()
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from pymatgen.core import Structure
+from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+
+
+def _element_symbols(structure: Structure) -> List[str]:
+    try:
+        return [site.specie.element.symbol for site in structure.sites]
+    except AttributeError:
+        return [site.specie.symbol for site in structure.sites]
+
+
+#: Functions computing the intermediates from the structure.
+INTERMEDIATES: Dict[str, Callable[[Structure], Any]] = {
+    "symmetrized_structure": lambda structure: SpacegroupAnalyzer(
+        structure
+    ).get_symmetrized_structure(),
+    "primitive_structure": lambda structure: structure.get_primitive_structure(),
+    "element_symbols": _element_symbols,
+    "lattice_parameters": lambda structure: structure.lattice.parameters,
+}
+
+#: Intermediates used by each representation, representations not listed use none.
+REPRESENTATION_INTERMEDIATES: Dict[str, tuple] = {
+    "cif_symmetrized": ("symmetrized_structure",),
+    "local_env": ("symmetrized_structure",),
+    "slices": ("primitive_structure",),
+    "atom_sequences": ("element_symbols",),
+    "atom_sequences_plusplus": ("element_symbols", "lattice_parameters"),
+    "crystal_text_llm": ("lattice_parameters",),
+}
+
+
+class ExecutionPlan:
+    """
+    The intermediates needed by a set of representations of a structure.
+
+    Intermediates are computed on first use and then reused, intermediates not
+    needed by any of the representations are never computed.
+
+    Attributes:
+        structure : the structure the intermediates are computed from
+        rep_names : the representations of the plan
+        steps : the intermediates used by each representation
+        intermediates : the intermediates needed, in the order of first use
+        seconds : time spent computing each intermediate computed so far
+    """
+
+    def __init__(self, structure: Structure, rep_names: List[str]) -> None:
+        """
+        Build the plan of a set of representations.
+
+        Args:
+            structure: pymatgen Structure object.
+            rep_names: Names of the representations.
+        """
+        self.structure = structure
+        self.rep_names = list(dict.fromkeys(rep_names))
+        self.steps = {
+            rep_name: REPRESENTATION_INTERMEDIATES.get(rep_name, ())
+            for rep_name in self.rep_names
+        }
+        self.intermediates = list(
+            dict.fromkeys(name for names in self.steps.values() for name in names)
+        )
+        self.seconds: Dict[str, float] = {}
+        self._values: Dict[str, Any] = {}
+        # representations may be generated in concurrent threads
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.intermediates
+
+    def get(self, name: str) -> Any:
+        """
+        Get an intermediate, computing it on first use.
+
+        Args:
+            name: Name of the intermediate, see `INTERMEDIATES`.
+
+        Returns:
+            The intermediate.
+        """
+        with self._lock:
+            if name not in self._values:
+                start = time.perf_counter()
+                self._values[name] = INTERMEDIATES[name](self.structure)
+                self.seconds[name] = time.perf_counter() - start
+            return self._values[name]
+
+    def describe(self) -> Dict[str, Any]:
+        """
+        Describe the plan for debugging.
+
+        Returns:
+            Dict[str, Any]: The intermediates of every representation, the intermediates
+                needed and the seconds spent on the ones computed so far.
+        """
+        return {
+            "representations": {
+                rep_name: list(names) for rep_name, names in self.steps.items()
+            },
+            "intermediates": list(self.intermediates),
+            "computed": dict(self.seconds),
+        }
+
+    def __repr__(self) -> str:
+        return f"ExecutionPlan({self.describe()})"
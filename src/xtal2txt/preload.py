@@ -0,0 +1,162 @@
+"""Preloading of the backends of representation generators in worker processes.
+
+Robocrys, SLICES/m3gnet and the chemenv geometry tables are loaded lazily, on the
+first structure a process converts. In worker processes this slows down the first
+task of every worker. `preload` is an initializer that loads the backends of a set
+of representations up front by generating them once for a small structure.
+`init_worker` also preloads and recycles the supervised workers a worker process
+starts for timeouts, and `preload_tokenizers` compiles the vocabularies of tokenizers.
+
+.. code-block:: python
+
+        from xtal2txt.preload import init_worker, preload
+        from xtal2txt.workers import WorkerPool
+
+        pool = WorkerPool(8, initializer=preload, initargs=(["robocrys_rep", "slices"],))
+        pool = WorkerPool(
+            8,
+            initializer=init_worker,
+            initargs=(["cif_p1", "slices"], ["slices"], 1000),
+            max_tasks=1000,
+        )
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from pymatgen.core import Lattice, Structure
+
+from xtal2txt.core import TextRep
+from xtal2txt.workers import configure_shared_workers, get_shared_worker
+
+logger = logging.getLogger(__name__)
+
+#: Seconds spent on preloading each representation in this process, and in total.
+warm_up_seconds: Dict[str, float] = {}
+
+
+def warm_up_structure() -> Structure:
+    """Small structure (cubic SrTiO3) the representations are generated for when preloading."""
+    return Structure.from_spacegroup(
+        "Pm-3m",
+        Lattice.cubic(3.905),
+        ["Sr", "Ti", "O"],
+        [[0.5, 0.5, 0.5], [0, 0, 0], [0.5, 0, 0]],
+    )
+
+
+def preload(reps: Iterable[str]) -> Dict[str, float]:
+    """
+    Load the backends of representations by generating them once.
+
+    Meant as initializer of worker processes. The time spent is logged and kept in
+    `warm_up_seconds`. A representation that fails is logged, its backend is then
+    loaded by the first task instead.
+
+    Args:
+        reps: Names of the representations (`RepresentationType` values).
+
+    Returns:
+        Dict[str, float]: Seconds spent on each representation and in total ("total").
+
+    Raises:
+        ValueError: If a representation is unknown.
+    """
+    reps = list(reps)
+    unknown = set(reps) - set(TextRep.get_available_representations())
+    if unknown:
+        raise ValueError(f"Unknown representations: {', '.join(sorted(unknown))}")
+
+    start = time.perf_counter()
+    text_rep = TextRep(warm_up_structure())
+    seconds = {}
+    for rep_name in reps:
+        rep_start = time.perf_counter()
+        text_rep.get_requested_text_reps([rep_name])
+        seconds[rep_name] = time.perf_counter() - rep_start
+        if rep_name in text_rep.errors:
+            logger.warning(
+                f"Preloading '{rep_name}' failed: {text_rep.errors[rep_name]}"
+            )
+    seconds["total"] = time.perf_counter() - start
+    warm_up_seconds.clear()
+    warm_up_seconds.update(seconds)
+    logger.info(f"Process {os.getpid()} preloaded {reps} in {seconds['total']:.2f} s")
+    return seconds
+
+
+def init_worker(
+    reps: Iterable[str],
+    supervised_reps: Iterable[str] = (),
+    max_tasks: Optional[int] = None,
+    max_rss_bytes: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Initializer of worker processes that generate some representations with a timeout.
+
+    The representations run with a timeout are generated in the shared supervised
+    worker of the process, see `xtal2txt.workers.get_shared_worker`. They are preloaded
+    in that worker, which is started right away, and the other representations in
+    this process. The shared supervised workers are recycled after `max_tasks` tasks
+    or above `max_rss_bytes`, like the worker process itself should be.
+
+    Args:
+        reps: Names of the representations the process generates.
+        supervised_reps: Names of the representations generated with a timeout.
+        max_tasks: Number of tasks after which a supervised worker is recycled.
+        max_rss_bytes: Resident set size in bytes above which a supervised worker is recycled.
+
+    Returns:
+        Dict[str, float]: Seconds spent on each representation and in total ("total").
+
+    Raises:
+        ValueError: If a representation is unknown.
+    """
+    start = time.perf_counter()
+    reps = list(reps)
+    supervised_reps = [rep_name for rep_name in supervised_reps if rep_name in reps]
+    configure_shared_workers(
+        initializer=preload,
+        initargs=(supervised_reps,),
+        max_tasks=max_tasks,
+        max_rss_bytes=max_rss_bytes,
+    )
+    seconds = preload(
+        [rep_name for rep_name in reps if rep_name not in supervised_reps]
+    )
+    if supervised_reps:
+        worker = get_shared_worker()
+        worker.start()
+        seconds.update(
+            (rep_name, worker_seconds)
+            for rep_name, worker_seconds in worker.warm_up.items()
+            if rep_name != "total"
+        )
+    seconds["total"] = time.perf_counter() - start
+    warm_up_seconds.update(seconds)
+    return seconds
+
+
+def preload_tokenizers(tokenizers: Mapping[str, Any]) -> Dict[str, float]:
+    """
+    Compile the vocabulary patterns of tokenizers, which is otherwise done on their first call.
+
+    Tokenizers without a vocabulary pattern (e.g. the BPE `RobocrysTokenizer`, which is
+    loaded when created) are skipped.
+
+    Args:
+        tokenizers: Tokenizers by name.
+
+    Returns:
+        Dict[str, float]: Seconds spent on each tokenizer.
+    """
+    seconds = {}
+    for name, tokenizer in tokenizers.items():
+        if not hasattr(tokenizer, "vocab_pattern"):
+            continue
+        start = time.perf_counter()
+        tokenizer.vocab_pattern()
+        seconds[name] = time.perf_counter() - start
+    return seconds
@@ -0,0 +1,202 @@
+"""Profiling of the slowest representation generators.
+
+`SlowestProfiles` runs each representation generator under `cProfile` and keeps
+the profiles of the N slowest (structure, representation) pairs seen so far,
+together with the CIF of the structure, so that pathological cases can be
+reproduced and their hotspots inspected, e.g. with
+
+.. code-block:: bash
+
+        python -m pstats profiles/mp-1234__robocrys_rep.pstats
+
+`track_memory` measures the peak traced allocation and the change of the resident
+set size of a block of code, e.g. a single representation generator.
+"""
+
+import cProfile
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from pymatgen.core import Structure
+
+
+@dataclass
+class SlowProfile:
+    """A profiled call of a representation generator."""
+
+    seconds: float
+    structure_id: str
+    rep_name: str
+    pstats_path: Path
+    cif_path: Path
+
+
+class SlowestProfiles:
+    """
+    Keep cProfile dumps of the N slowest representation generator calls.
+
+    Attributes:
+        n : number of profiles to keep
+        output_dir : directory the pstats dumps and CIFs are written to
+    """
+
+    def __init__(self, output_dir: Union[str, Path], n: int = 10) -> None:
+        """
+        Initialize SlowestProfiles instance.
+
+        Args:
+            output_dir: Directory the pstats dumps and CIFs are written to.
+            n: Number of profiles to keep.
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.n = n
+        self._heap = []  # min-heap of (seconds, counter, SlowProfile)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def _is_candidate(self, seconds: float) -> bool:
+        return len(self._heap) < self.n or seconds > self._heap[0][0]
+
+    def profile(
+        self,
+        structure_id: str,
+        rep_name: str,
+        structure: Structure,
+        func: Callable,
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Call `func(*args, **kwargs)` under cProfile and keep the profile if it is among the N slowest.
+
+        The call is timed and kept even if func raises, the exception is re-raised.
+
+        Args:
+            structure_id: Identifier of the structure.
+            rep_name: Name of the representation.
+            structure: The structure the representation is generated from, saved as CIF.
+            func: Function to call.
+            *args: Positional arguments to pass to func.
+            **kwargs: Keyword arguments to pass to func.
+
+        Returns:
+            Result of func.
+        """
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                if self._is_candidate(seconds):
+                    self._keep(seconds, structure_id, rep_name, structure, profiler)
+
+    def _keep(
+        self,
+        seconds: float,
+        structure_id: str,
+        rep_name: str,
+        structure: Structure,
+        profiler: cProfile.Profile,
+    ) -> None:
+        counter = next(self._counter)
+        stem = re.sub(r"[^\w.-]", "_", f"{structure_id}__{rep_name}__{counter}")
+        entry = SlowProfile(
+            seconds=seconds,
+            structure_id=structure_id,
+            rep_name=rep_name,
+            pstats_path=self.output_dir / f"{stem}.pstats",
+            cif_path=self.output_dir / f"{stem}.cif",
+        )
+        profiler.dump_stats(str(entry.pstats_path))
+        structure.to(filename=str(entry.cif_path), fmt="cif")
+
+        heapq.heappush(self._heap, (seconds, counter, entry))
+        if len(self._heap) > self.n:
+            _, _, evicted = heapq.heappop(self._heap)
+            evicted.pstats_path.unlink(missing_ok=True)
+            evicted.cif_path.unlink(missing_ok=True)
+
+    def entries(self) -> List[SlowProfile]:
+        """Return the kept profiles, slowest first."""
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def report(self) -> str:
+        """Return a table of the kept profiles, slowest first."""
+        lines = [
+            f"{entry.seconds:10.3f} s  {entry.rep_name:<24} {entry.structure_id}  {entry.pstats_path}"
+            for entry in self.entries()
+        ]
+        return "\n".join(lines)
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    Get the resident set size of the current process.
+
+    Uses psutil if it is installed and falls back to /proc/self/statm.
+
+    Returns:
+        The resident set size in bytes, None if it can not be determined.
+    """
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@contextmanager
+def track_memory() -> Iterator[Dict[str, Optional[int]]]:
+    """
+    Measure the memory used by the code in the `with` block.
+
+    The yielded dictionary is filled when the block exits with
+
+    - `peak_traced_bytes`: peak of the memory allocated by Python (tracemalloc) above the level at the start
+    - `rss_delta_bytes`: change of the resident set size of the process (None if unavailable)
+
+    Allocations of C extensions that bypass the Python allocator are only visible in the RSS delta.
+    tracemalloc is started if needed and stopped again afterwards.
+
+    Yields:
+        Dict[str, Optional[int]]: The memory usage, filled on exit.
+    """
+    usage: Dict[str, Optional[int]] = {}
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_traced, _ = tracemalloc.get_traced_memory()
+    start_rss = get_rss_bytes()
+    try:
+        yield usage
+    finally:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        end_rss = get_rss_bytes()
+        if not was_tracing:
+            tracemalloc.stop()
+        usage["peak_traced_bytes"] = max(peak_traced - start_traced, 0)
+        usage["rss_delta_bytes"] = (
+            end_rss - start_rss
+            if start_rss is not None and end_rss is not None
+            else None
+        )
@@ -0,0 +1,708 @@
+"""Local HTTP service generating and tokenizing text representations.
+
+Every start of xtal2txt pays for loading robocrys, SLICES/m3gnet, the chemenv
+geometry tables and the tokenizer vocabularies, which makes one CLI call per
+structure too slow for generation loops. The service keeps them loaded:
+representations are generated and tokenized in a pool of worker processes warmed up
+at start, and tokenization requests arriving within a short window are tokenized in one batch.
+A worker process that crashes only fails the structure it was converting, it is
+restarted and warmed up again while the other workers keep serving.
+
+.. code-block:: bash
+
+        xtal2txt serve --port 8000 --workers 4 --reps cif_p1 slices composition
+
+Endpoints:
+
+- ``POST /represent`` with ``{"structures": [{"id": ..., "cif": ...}, {"id": ..., "structure": ...}],
+  "reps": [...], "decimal_places": 2, "timeout": null, "deadline": null, "tokenize": false}``
+  streams one JSON line per structure as soon as its representations are generated.
+  Structures are given as CIF strings or as pymatgen `Structure.as_dict()`.
+- ``POST /tokenize`` with ``{"tokenizer": "cif", "texts": [...]}`` returns the token ids.
+- ``GET /health`` reports the state of the service, with status 503 unless all workers are up.
+- ``GET /metrics`` returns the metrics in the Prometheus text format, ``?format=json`` as JSON.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from pymatgen.core import Structure
+
+from xtal2txt import metrics
+from xtal2txt.core import HEAVY_REPRESENTATIONS, TextRep
+from xtal2txt.metrics import MetricsRegistry
+from xtal2txt.preload import init_worker, preload, preload_tokenizers
+from xtal2txt.workers import WorkerPool
+from xtal2txt.tokenizer import (
+    CifTokenizer,
+    CompositionTokenizer,
+    CrysllmTokenizer,
+    RobocrysTokenizer,
+    SliceTokenizer,
+    SmilesTokenizer,
+)
+
+logger = logging.getLogger(__name__)
+
+#: Tokenizers served by name.
+TOKENIZERS: Dict[str, Callable] = {
+    "cif": CifTokenizer,
+    "composition": CompositionTokenizer,
+    "crystal_llm": CrysllmTokenizer,
+    "robocrys": RobocrysTokenizer,
+    "slice": SliceTokenizer,
+    "smiles": SmilesTokenizer,
+}
+
+#: Tokenizer of each representation, used for `"tokenize": true` requests.
+REPRESENTATION_TOKENIZERS: Dict[str, str] = {
+    "cif_p1": "cif",
+    "cif_symmetrized": "cif",
+    "composition": "composition",
+    "crystal_text_llm": "crystal_llm",
+    "robocrys_rep": "robocrys",
+    "slices": "slice",
+    "local_env": "smiles",
+}
+
+
+class ServiceUnavailable(RuntimeError):
+    """Raised when the service can not take requests, e.g. before it is started."""
+
+
+#: Tokenizers of the worker process, loaded by `_init_service_worker` or on first use.
+_worker_tokenizers: Dict[str, Any] = {}
+
+
+def _init_service_worker(
+    reps: List[str],
+    max_tasks: Optional[int],
+    max_rss_bytes: Optional[int],
+    tokenizer_names: List[str],
+) -> Dict[str, float]:
+    """
+    Initializer of the worker processes of the service.
+
+    The heavy representations are preloaded in the supervised worker that generates
+    them for requests with a timeout or deadline, and in the worker process itself
+    for the requests without. The tokenizers are loaded for the ``"tokenize": true``
+    requests.
+
+    Returns:
+        Dict[str, float]: Seconds spent on each representation, on each tokenizer and
+            in total ("total").
+    """
+    start = time.perf_counter()
+    supervised_reps = [
+        rep_name for rep_name in reps if rep_name in HEAVY_REPRESENTATIONS
+    ]
+    seconds = init_worker(reps, supervised_reps, max_tasks, max_rss_bytes)
+    seconds.update(
+        (f"supervised:{rep_name}", seconds.pop(rep_name))
+        for rep_name in supervised_reps
+    )
+    seconds.update(preload(supervised_reps))
+    for name in tokenizer_names:
+        _worker_tokenizers[name] = TOKENIZERS[name]()
+    seconds.update(
+        (f"tokenizer:{name}", tokenizer_seconds)
+        for name, tokenizer_seconds in preload_tokenizers(_worker_tokenizers).items()
+    )
+    seconds["total"] = time.perf_counter() - start
+    return seconds
+
+
+def _worker_tokenizer(name: str) -> Any:
+    """Get a tokenizer of the worker process, loading it if it was not configured."""
+    if name not in _worker_tokenizers:
+        _worker_tokenizers[name] = TOKENIZERS[name]()
+    return _worker_tokenizers[name]
+
+
+class _ObservationRecorder:
+    """Stands in for the metrics registry of a worker, keeping the observations of one task."""
+
+    def __init__(self) -> None:
+        self.observations: List[Tuple[str, float, str]] = []
+        self.tokenizations: List[Tuple[str, float, int]] = []
+
+    def observe_representation(
+        self, rep_name: str, seconds: float, outcome: str = "ok"
+    ) -> None:
+        self.observations.append((rep_name, seconds, outcome))
+
+    def observe_tokenization(
+        self, tokenizer_name: str, seconds: float, n_tokens: int
+    ) -> None:
+        self.tokenizations.append((tokenizer_name, seconds, n_tokens))
+
+
+def _tokenize_representations(representations: Dict[str, Optional[str]]) -> dict:
+    """Tokenize the generated representations that have a tokenizer."""
+    return {
+        rep_name: _worker_tokenizer(REPRESENTATION_TOKENIZERS[rep_name])([value])[
+            "input_ids"
+        ][0]
+        for rep_name, value in representations.items()
+        if value is not None and rep_name in REPRESENTATION_TOKENIZERS
+    }
+
+
+def _represent_one(task: tuple) -> Tuple[dict, _ObservationRecorder]:
+    """Worker function: generate and optionally tokenize the representations of one structure."""
+    structure_id, source, reps, decimal_places, timeout, deadline, tokenize = task
+    recorder = _ObservationRecorder()
+    metrics.enable_metrics(recorder)
+    try:
+        try:
+            structure = (
+                Structure.from_dict(source)
+                if isinstance(source, dict)
+                else Structure.from_str(source, "cif")
+            )
+        except Exception as e:
+            return {
+                "id": structure_id,
+                "errors": {"input": f"{type(e).__name__}: {e}"},
+            }, recorder
+        text_rep = TextRep(structure, structure_id=structure_id)
+        record = {
+            "id": structure_id,
+            "representations": text_rep.get_requested_text_reps(
+                reps, decimal_places=decimal_places, timeout=timeout, deadline=deadline
+            ),
+        }
+        if text_rep.errors:
+            record["errors"] = dict(text_rep.errors)
+        if text_rep.timeouts:
+            record["timeouts"] = dict(text_rep.timeouts)
+        if tokenize:
+            try:
+                record["tokens"] = _tokenize_representations(record["representations"])
+            except Exception as e:
+                record.setdefault("errors", {})["tokenize"] = f"{type(e).__name__}: {e}"
+        return record, recorder
+    finally:
+        metrics.disable_metrics()
+
+
+class MicroBatcher:
+    """
+    Tokenize the texts of requests arriving within a short window in one call.
+
+    Every tokenizer has a thread of its own. It waits for a request, collects the
+    requests arriving in the next `window` seconds, up to `max_batch_size` texts,
+    and tokenizes all their texts in a single call of the tokenizer.
+
+    Attributes:
+        window : seconds to wait for further requests after the first one of a batch
+        max_batch_size : maximum number of texts of a batch
+        tokenizers : the tokenizers loaded so far, by name
+        n_batches : number of tokenizer calls so far
+        n_texts : number of texts tokenized so far
+    """
+
+    def __init__(self, window: float = 0.005, max_batch_size: int = 64) -> None:
+        """
+        Initialize MicroBatcher instance.
+
+        Args:
+            window: Seconds to wait for further requests after the first one of a batch.
+            max_batch_size: Maximum number of texts of a batch.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.tokenizers: Dict[str, Any] = {}
+        self.n_batches = 0
+        self.n_texts = 0
+        self._queues: Dict[str, queue.Queue] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def load(self, name: str) -> None:
+        """
+        Load a tokenizer and start its thread, if not done yet.
+
+        Args:
+            name: Name of the tokenizer, see `TOKENIZERS`.
+
+        Raises:
+            ValueError: If the tokenizer is unknown.
+        """
+        if name not in TOKENIZERS:
+            raise ValueError(
+                f"Unknown tokenizer '{name}'. Available tokenizers: {', '.join(TOKENIZERS)}"
+            )
+        with self._lock:
+            if name in self._queues:
+                return
+            self.tokenizers[name] = TOKENIZERS[name]()
+            # compile the vocabulary before the first request
+            preload_tokenizers({name: self.tokenizers[name]})
+            self._queues[name] = queue.Queue()
+            thread = threading.Thread(
+                target=self._run, args=(name,), name=f"tokenize-{name}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, name: str, texts: List[str]) -> Future:
+        """
+        Queue texts for tokenization.
+
+        Args:
+            name: Name of the tokenizer, see `TOKENIZERS`.
+            texts: Texts to tokenize.
+
+        Returns:
+            Future: Resolves to the token ids of the texts.
+        """
+        self.load(name)
+        future: Future = Future()
+        self._queues[name].put((list(texts), future))
+        return future
+
+    def _run(self, name: str) -> None:
+        requests = self._queues[name]
+        stop = False
+        while not stop:
+            item = requests.get()
+            if item is None:
+                return
+            batch = [item]
+            n_texts = len(item[0])
+            end = time.monotonic() + self.window
+            while n_texts < self.max_batch_size:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                n_texts += len(item[0])
+
+            texts = [text for texts, _ in batch for text in texts]
+            try:
+                input_ids = self.tokenizers[name](texts)["input_ids"] if texts else []
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.n_batches += 1
+            self.n_texts += len(texts)
+            offset = 0
+            for texts, future in batch:
+                future.set_result(input_ids[offset : offset + len(texts)])
+                offset += len(texts)
+
+    def close(self) -> None:
+        """Stop the tokenizer threads once the queued requests are done."""
+        for requests in self._queues.values():
+            requests.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class Xtal2txtService:
+    """
+    Worker pool, tokenizers and metrics shared by the requests to the service.
+
+    Attributes:
+        reps : representations warmed up in the workers, generated when a request names none
+        n_workers : number of worker processes
+        max_tasks : number of tasks after which a worker process is recycled, None for no limit
+        max_rss_bytes : resident set size above which a worker process is recycled, None for no limit
+        tokenizer_names : tokenizers loaded at start, by the batcher and every worker process
+        batcher : micro-batcher of the tokenization requests
+        registry : metrics of the generated representations
+        requests : number of requests per endpoint
+        warm_up_seconds : time spent on starting and warming up, None before `start`
+        worker_warm_up_seconds : longest time a worker spent on preloading the representations
+        failed_structures : number of structures that failed because their worker process died
+    """
+
+    def __init__(
+        self,
+        reps: Optional[List[str]] = None,
+        n_workers: int = 1,
+        tokenizer_names: Optional[List[str]] = None,
+        batch_window: float = 0.005,
+        max_batch_size: int = 64,
+        max_tasks: Optional[int] = None,
+        max_rss_bytes: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize Xtal2txtService instance.
+
+        Args:
+            reps: Representations to warm up, all by default.
+            n_workers: Number of worker processes generating representations.
+            tokenizer_names: Tokenizers to load at start, all by default. The batcher
+                serves them to `tokenize`, the worker processes tokenize the
+                representations of ``"tokenize": true`` requests with them.
+            batch_window: Seconds to wait for further tokenization requests to batch.
+            max_batch_size: Maximum number of texts tokenized in one call.
+            max_tasks: Number of tasks after which a worker process, or a supervised
+                process it starts for timeouts, is recycled.
+            max_rss_bytes: Resident set size in bytes above which a worker process, or
+                a supervised process it starts for timeouts, is recycled.
+        """
+        self.reps = list(reps or TextRep.get_available_representations())
+        self.n_workers = n_workers
+        self.tokenizer_names = list(
+            TOKENIZERS if tokenizer_names is None else tokenizer_names
+        )
+        self.max_tasks = max_tasks
+        self.max_rss_bytes = max_rss_bytes
+        self.batcher = MicroBatcher(batch_window, max_batch_size)
+        self.registry = MetricsRegistry()
+        self.requests: Dict[str, int] = {}
+        self.warm_up_seconds: Optional[float] = None
+        self.worker_warm_up_seconds: Optional[float] = None
+        self.failed_structures = 0
+        self._pool: Optional[WorkerPool] = None
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    def start(self) -> float:
+        """
+        Start the worker processes and load the tokenizers.
+
+        Returns:
+            float: Seconds spent on warming up.
+        """
+        start = time.perf_counter()
+        self._started = time.time()
+        pool = WorkerPool(
+            self.n_workers,
+            initializer=_init_service_worker,
+            initargs=(
+                self.reps,
+                self.max_tasks,
+                self.max_rss_bytes,
+                self.tokenizer_names,
+            ),
+            max_tasks=self.max_tasks,
+            max_rss_bytes=self.max_rss_bytes,
+        )
+        # returns once every worker process has run the initializer
+        self.worker_warm_up_seconds = max(pool.start())
+        self._pool = pool
+        for name in self.tokenizer_names:
+            self.batcher.load(name)
+        metrics.enable_metrics(self.registry)
+        self.warm_up_seconds = time.perf_counter() - start
+        return self.warm_up_seconds
+
+    def close(self) -> None:
+        """Stop the worker processes and the tokenizer threads."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        self.batcher.close()
+        if metrics.get_metrics() is self.registry:
+            metrics.disable_metrics()
+
+    def count_request(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def represent(
+        self,
+        structures: List[dict],
+        reps: Optional[List[str]] = None,
+        decimal_places: int = 2,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        tokenize: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Generate the representations of structures in the worker processes.
+
+        Args:
+            structures: Structures as ``{"id": ..., "cif": ...}`` or ``{"id": ..., "structure": ...}``
+                with a pymatgen structure dictionary, the id defaults to the index.
+            reps: Representations to generate, `reps` of the service by default.
+            decimal_places: Number of decimal places to round to.
+            timeout: Wall-clock budget in seconds of each heavy representation.
+            deadline: Latency budget in seconds of each structure.
+            tokenize: Whether to add the token ids of the representations that have a tokenizer.
+
+        Yields:
+            dict: The id and the representations of a structure, with its errors and
+                timeouts if any, in the order they are done. If the worker process
+                converting a structure died, its record only has the error.
+
+        Raises:
+            ValueError: If a structure or a representation is invalid.
+            ServiceUnavailable: If the service is not started.
+        """
+        pool = self._pool
+        if pool is None:
+            raise ServiceUnavailable("The service is not started")
+        reps = list(reps or self.reps)
+        unknown = set(reps) - set(TextRep.get_available_representations())
+        if unknown:
+            raise ValueError(f"Unknown representations: {', '.join(sorted(unknown))}")
+        tasks = []
+        for index, entry in enumerate(structures):
+            source = entry.get("cif", entry.get("structure"))
+            if not isinstance(source, (str, dict)):
+                raise ValueError(
+                    f"Structure {index} needs a 'cif' string or a 'structure' dictionary"
+                )
+            structure_id = str(entry.get("id", index))
+            tasks.append(
+                (
+                    structure_id,
+                    source,
+                    reps,
+                    decimal_places,
+                    timeout,
+                    deadline,
+                    tokenize,
+                )
+            )
+
+        try:
+            futures = {pool.submit(_represent_one, task): task[0] for task in tasks}
+        except RuntimeError as e:
+            # the pool was shut down in the meantime
+            raise ServiceUnavailable(f"The service is stopping: {e}") from e
+        for future in as_completed(futures):
+            try:
+                record, recorder = future.result()
+            except Exception as e:
+                # e.g. WorkerCrashed, the worker is already restarted
+                with self._lock:
+                    self.failed_structures += 1
+                logger.warning(f"Structure '{futures[future]}' failed: {e}")
+                yield {
+                    "id": futures[future],
+                    "errors": {"worker": f"{type(e).__name__}: {e}"},
+                }
+                continue
+            for observation in recorder.observations:
+                self.registry.observe_representation(*observation)
+            for tokenization in recorder.tokenizations:
+                self.registry.observe_tokenization(*tokenization)
+            yield record
+
+    def tokenize(self, name: str, texts: List[str]) -> List[List[int]]:
+        """
+        Tokenize texts, batched with the concurrent requests for the same tokenizer.
+
+        Args:
+            name: Name of the tokenizer, see `TOKENIZERS`.
+            texts: Texts to tokenize.
+
+        Returns:
+            List[List[int]]: The token ids of every text.
+        """
+        return self.batcher.submit(name, texts).result()
+
+    def health(self) -> dict:
+        """
+        Report the state of the service.
+
+        The status is "ok" if all worker processes are up, "degraded" while some are
+        restarted and "stopped" before the start and after closing.
+
+        Returns:
+            dict: Status, uptime, workers, loaded tokenizers, warm-up time, recycled
+                workers and failures.
+        """
+        pool = self._pool
+        if pool is None:
+            status, workers_alive, recycled, crashes = "stopped", 0, 0, 0
+        else:
+            workers_alive = sum(worker.is_alive() for worker in pool.workers)
+            status = "ok" if workers_alive == self.n_workers else "degraded"
+            recycled = sum(worker.recycled for worker in pool.workers)
+            crashes = pool.crashes
+        return {
+            "status": status,
+            "uptime_seconds": time.time() - self._started,
+            "workers": self.n_workers,
+            "workers_alive": workers_alive,
+            "workers_recycled": recycled,
+            "worker_crashes": crashes,
+            "failed_structures": self.failed_structures,
+            "representations": self.reps,
+            "tokenizers": sorted(self.batcher.tokenizers),
+            "warm_up_seconds": self.warm_up_seconds,
+            "worker_warm_up_seconds": self.worker_warm_up_seconds,
+        }
+
+    def metrics_snapshot(self) -> dict:
+        """
+        Get the metrics of the service.
+
+        Returns:
+            dict: The representation metrics (see `MetricsRegistry.snapshot`), the
+                requests per endpoint and the tokenization batches.
+        """
+        snapshot = self.registry.snapshot()
+        snapshot["requests"] = dict(self.requests)
+        snapshot["tokenization_batches"] = {
+            "batches": self.batcher.n_batches,
+            "texts": self.batcher.n_texts,
+        }
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        """Dump the metrics of the service in the Prometheus text exposition format."""
+        lines = ["# TYPE xtal2txt_service_requests_total counter"]
+        for endpoint, count in sorted(self.requests.items()):
+            lines.append(
+                f'xtal2txt_service_requests_total{{endpoint="{endpoint}"}} {count}'
+            )
+        lines.append("# TYPE xtal2txt_tokenization_batches_total counter")
+        lines.append(f"xtal2txt_tokenization_batches_total {self.batcher.n_batches}")
+        lines.append("# TYPE xtal2txt_tokenization_texts_total counter")
+        lines.append(f"xtal2txt_tokenization_texts_total {self.batcher.n_texts}")
+        return self.registry.to_prometheus() + "\n".join(lines) + "\n"
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> Xtal2txtService:
+        return self.server.service
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_error(self, error: Exception) -> None:
+        """Send 503 if the service is unavailable, 500 for unexpected errors."""
+        if isinstance(error, ServiceUnavailable):
+            self._send_json(503, {"error": str(error)})
+            return
+        logger.exception("Request failed")
+        self._send_json(500, {"error": f"{type(error).__name__}: {error}"})
+
+    def _send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        self.service.count_request(url.path)
+        if url.path == "/health":
+            health = self.service.health()
+            self._send_json(200 if health["status"] == "ok" else 503, health)
+        elif url.path == "/metrics":
+            if parse_qs(url.query).get("format") == ["json"]:
+                self._send_json(200, self.service.metrics_snapshot())
+            else:
+                self._send(
+                    200,
+                    self.service.to_prometheus().encode("utf-8"),
+                    "text/plain; version=0.0.4",
+                )
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        self.service.count_request(url.path)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("The request body must be a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        if url.path == "/tokenize":
+            try:
+                input_ids = self.service.tokenize(body.get("tokenizer"), body["texts"])
+            except (KeyError, TypeError, ValueError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            except Exception as e:
+                self._send_error(e)
+                return
+            self._send_json(200, {"input_ids": input_ids})
+        elif url.path == "/represent":
+            try:
+                records = self.service.represent(
+                    body.get("structures", []),
+                    reps=body.get("reps"),
+                    decimal_places=body.get("decimal_places", 2),
+                    timeout=body.get("timeout"),
+                    deadline=body.get("deadline"),
+                    tokenize=body.get("tokenize", False),
+                )
+                # validate the request before sending the headers
+                first = next(records, None)
+            except (AttributeError, TypeError, ValueError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            except Exception as e:
+                self._send_error(e)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                if first is not None:
+                    self._send_chunk((json.dumps(first) + "\n").encode("utf-8"))
+                for record in records:
+                    self._send_chunk((json.dumps(record) + "\n").encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                # the client went away
+                return
+            except Exception as e:
+                # the status is sent already, end the stream with an error line
+                logger.exception("Streaming representations failed")
+                error = {"error": f"{type(e).__name__}: {e}"}
+                self._send_chunk((json.dumps(error) + "\n").encode("utf-8"))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+
+
+def create_server(
+    service: Xtal2txtService, host: str = "127.0.0.1", port: int = 8000
+) -> ThreadingHTTPServer:
+    """
+    Create the HTTP server of a service, serving each request in a thread of its own.
+
+    Args:
+        service: The (started) service.
+        host: Address to bind to.
+        port: Port to bind to, 0 for any free port.
+
+    Returns:
+        ThreadingHTTPServer: The server, call `serve_forever` to handle requests.
+    """
+    server = ThreadingHTTPServer((host, port), _RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
@@ -1,7 +1,9 @@
 import json
 import os
 import re
+import time
 
+import numpy as np
 from tokenizers import Tokenizer
 from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
 
@@ -14,6 +16,7 @@ from xtal2txt.analysis import (
 )
 
 from typing import List
+from xtal2txt.metrics import observe_tokenization
 from xtal2txt.utils import xtal2txt_storage
 
 
@@ -245,15 +248,32 @@ class Xtal2txtTokenizer(PreTrainedTokenizer):
         if self.special_num_tokens:
             text = self.get_special_num_tokens(text)
 
-        tokens = list(self.vocab.keys())
-        string_tokens = [token for token in tokens if isinstance(token, str)]
-        string_tokens.sort(key=len, reverse=True)
-        escaped_tokens = [re.escape(token) for token in string_tokens]
-        pattern_str = "|".join(escaped_tokens)
-        pattern = re.compile(pattern_str)
-        matches = pattern.findall(text)
+        return self.vocab_pattern().findall(text)
 
-        return matches
+    def vocab_pattern(self):
+        """Regex matching the tokens of the vocabulary, longest first.
+
+        The pattern is compiled once and recompiled when tokens are added or the
+        vocabulary is replaced.
+
+        Returns:
+            The compiled pattern.
+        """
+        cached = self.__dict__.get("_vocab_pattern")
+        if (
+            cached is None
+            or cached[0] is not self.vocab
+            or cached[1] != len(self.vocab)
+        ):
+            string_tokens = [token for token in self.vocab if isinstance(token, str)]
+            string_tokens.sort(key=len, reverse=True)
+            pattern = re.compile("|".join(re.escape(token) for token in string_tokens))
+            self.__dict__["_vocab_pattern"] = cached = (
+                self.vocab,
+                len(self.vocab),
+                pattern,
+            )
+        return cached[2]
 
     def tokenize(self, text, **kwargs):
         """Tokenize a string into a list of tokens with special tokens handling.
@@ -265,6 +285,7 @@ class Xtal2txtTokenizer(PreTrainedTokenizer):
         Returns:
             List of tokens including special tokens if configured.
         """
+        start = time.perf_counter()
         matches = self._tokenize(text, **kwargs)
 
         # Add [CLS] and [SEP] tokens if present in the vocabulary
@@ -279,6 +300,8 @@ class Xtal2txtTokenizer(PreTrainedTokenizer):
         if self.sep_token is not None:
             matches += [self.sep_token]
 
+        # padding is not counted towards the throughput
+        observe_tokenization(type(self).__name__, start, len(matches))
         if self.padding and len(matches) < self.padding_length:
             matches += [self.pad_token] * (self.padding_length - len(matches))
 
@@ -673,10 +696,16 @@ class RobocrysTokenizer:
                 self._tokenizer.add_special_tokens({"pad_token": "[PAD]"})
 
     def tokenize(self, text):
-        return self._tokenizer.tokenize(text)
+        start = time.perf_counter()
+        tokens = self._tokenizer.tokenize(text)
+        observe_tokenization(type(self).__name__, start, len(tokens))
+        return tokens
 
     def encode(self, text):
-        return self._tokenizer.encode(text)
+        start = time.perf_counter()
+        token_ids = self._tokenizer.encode(text)
+        observe_tokenization(type(self).__name__, start, len(token_ids))
+        return token_ids
 
     def decode(self, token_ids, skip_special_tokens=True):
         # Check if token_ids is a string and convert it to a list of integers
@@ -688,7 +717,14 @@ class RobocrysTokenizer:
 
     def __call__(self, *args, **kwargs):
         """Make the tokenizer callable."""
-        return self._tokenizer(*args, **kwargs)
+        start = time.perf_counter()
+        encoding = self._tokenizer(*args, **kwargs)
+        attention_mask = encoding.get("attention_mask")
+        if attention_mask is not None:
+            # count the tokens of the texts, not the padding
+            n_tokens = int(np.sum([np.sum(mask) for mask in attention_mask]))
+            observe_tokenization(type(self).__name__, start, n_tokens)
+        return encoding
 
     def __len__(self):
         """Return the vocabulary size."""
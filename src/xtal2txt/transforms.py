@@ -1,13 +1,17 @@
+import hashlib
 import random
 import numpy as np
 from pymatgen.core.structure import Structure
-from typing import Union, List
+from typing import Callable, Iterator, List, Optional, Tuple, Union
 
 
 def set_seed(seed: int):
     """
     Set the random seed for both random and numpy.random.
 
+    Not used by the transformations, which draw from their own generators
+    (see `derive_seed`).
+
     Parameters:
         seed (int): The seed value.
     """
@@ -15,41 +19,121 @@ def set_seed(seed: int):
     np.random.seed(seed)
 
 
+def derive_seed(
+    seed: int, structure_id: Optional[str] = None, view_index: Optional[int] = None
+) -> int:
+    """
+    Derive the seed of a single structure and view from a global seed.
+
+    The derived seed only depends on its arguments, so the random numbers drawn for a
+    structure and view are the same in every thread, process and run.
+
+    Args:
+        seed: The global seed.
+        structure_id: Identifier of the structure.
+        view_index: Index of the augmented view of the structure.
+
+    Returns:
+        int: `seed` if neither `structure_id` nor `view_index` is given, otherwise a
+            32 bit hash of (`seed`, `structure_id`, `view_index`).
+    """
+    if structure_id is None and view_index is None:
+        return seed
+    digest = hashlib.sha256(f"{seed}|{structure_id}|{view_index}".encode()).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def _build_structure(
+    structure: Structure, frac_coords: np.ndarray, order: np.ndarray
+) -> Structure:
+    """Build a structure from the sites of `structure` in `order` at new coordinates."""
+    sites = [structure[i] for i in order]
+    return Structure(
+        structure.lattice,
+        [site.species for site in sites],
+        frac_coords,
+        site_properties={
+            key: [values[i] for i in order]
+            for key, values in structure.site_properties.items()
+        }
+        or None,
+        labels=[site.label for site in sites],
+        properties=structure.properties,
+    )
+
+
+def _apply_kernel(kernel: Callable, structure: Structure, seed: int, **params):
+    """Apply a single kernel to a structure."""
+    return CompiledTransformations([(kernel, seed, params)])(structure)
+
+
 class TransformationCallback:
+    """
+    Random transformations of structures.
+
+    Every call draws its random numbers from its own `random.Random` and
+    `numpy.random.RandomState` instances seeded with
+    `derive_seed(seed, structure_id, view_index)`, so transformations can run
+    concurrently in threads or processes and stay reproducible. The global random
+    state is neither used nor modified, and the input structure is not modified.
+    """
+
     @staticmethod
-    def permute_structure(structure: Structure, seed: int = 42) -> Structure:
+    def permute_structure(
+        structure: Structure,
+        seed: int = 42,
+        structure_id: Optional[str] = None,
+        view_index: Optional[int] = None,
+    ) -> Structure:
         """
         Randomly permute the order of atoms in a structure.
+
+        Args:
+            structure (Structure): The input structure.
+            seed (int): The seed for random number generation. Defaults to 42.
+            structure_id (str, optional): Identifier of the structure the seed is derived for.
+            view_index (int, optional): Index of the augmented view the seed is derived for.
+
+        Returns:
+            Structure: The transformed structure.
         """
-        set_seed(seed)
-        shuffled_structure = structure.copy()
-        sites = shuffled_structure.sites
-        random.shuffle(sites)
-        shuffled_structure.sites = sites
-        return shuffled_structure
+        return _apply_kernel(
+            _permute_kernel, structure, derive_seed(seed, structure_id, view_index)
+        )
 
     @staticmethod
     def translate_structure(
         structure: Structure,
         vector: Union[List[float], None] = None,
         seed: int = 42,
-        **kwargs,
+        structure_id: Optional[str] = None,
+        view_index: Optional[int] = None,
+        frac_coords: bool = True,
+        to_unit_cell: bool = True,
     ) -> Structure:
         """
         Randomly translate the atoms in a structure.
-        """
-        set_seed(seed)
 
-        if vector is None:
-            vector = np.random.uniform(size=(3,))
+        Args:
+            structure (Structure): The input structure.
+            vector (List[float], optional): The translation vector. Defaults to a random vector.
+            seed (int): The seed for random number generation. Defaults to 42.
+            structure_id (str, optional): Identifier of the structure the seed is derived for.
+            view_index (int, optional): Index of the augmented view the seed is derived for.
+            frac_coords (bool): Whether the vector is in fractional coordinates. Defaults to True.
+            to_unit_cell (bool): Whether to wrap the sites into the unit cell. Defaults to True.
 
-        structure.translate_sites(
-            indices=range(len(structure.sites)),
+        Returns:
+            Structure: The transformed structure.
+        """
+        return _apply_kernel(
+            _translate_kernel,
+            structure,
+            derive_seed(seed, structure_id, view_index),
             vector=vector,
-            # frac_coords=True,
-            **kwargs,
+            frac_coords_vector=frac_coords,
+            to_unit_cell=to_unit_cell,
         )
-        return structure
 
     @staticmethod
     def translate_single_atom(
@@ -57,7 +141,9 @@ class TransformationCallback:
         max_indices: int = 1,
         vector: List[float] = [0.25, 0.25, 0.25],
         seed: int = 42,
-        **kwargs,
+        structure_id: Optional[str] = None,
+        view_index: Optional[int] = None,
+        to_unit_cell: bool = True,
     ) -> Structure:
         """
         Randomly translate one or more atoms in a structure.
@@ -67,27 +153,342 @@ class TransformationCallback:
             max_indices (int): The maximum number of atoms to translate. Defaults to 1.
             vector (List[float]): The translation vector. Defaults to [0.25, 0.25, 0.25].
             seed (int): The seed for random number generation. Defaults to 42.
+            structure_id (str, optional): Identifier of the structure the seed is derived for.
+            view_index (int, optional): Index of the augmented view the seed is derived for.
+            to_unit_cell (bool): Whether to wrap the sites into the unit cell. Defaults to True.
 
         Returns:
             Structure: The transformed structure.
         """
-        set_seed(seed)
-        indices = random.sample(
-            range(len(structure.sites)), min(max_indices, len(structure.sites))
-        )  # ensures that we select at most max_indices from the available sites
-        structure.translate_sites(
-            indices=indices, vector=vector, frac_coords=True, **kwargs
+        return _apply_kernel(
+            _translate_single_atom_kernel,
+            structure,
+            derive_seed(seed, structure_id, view_index),
+            max_indices=max_indices,
+            vector=vector,
+            to_unit_cell=to_unit_cell,
         )
-        return structure
 
     @staticmethod
     def perturb_structure(
-        structure: Structure, max_distance: float, seed: int = 42, **kwargs
+        structure: Structure,
+        max_distance: float,
+        seed: int = 42,
+        structure_id: Optional[str] = None,
+        view_index: Optional[int] = None,
+        min_distance: Optional[float] = None,
     ) -> Structure:
         """
         Randomly perturb atoms in a structure.
+
+        All sites are displaced in random directions by the same distance, drawn
+        uniformly from [0, `max_distance`], or by individual distances drawn from
+        [`min_distance`, distance] if `min_distance` is given.
+
+        Args:
+            structure (Structure): The input structure.
+            max_distance (float): The maximum displacement in Angstrom.
+            seed (int): The seed for random number generation. Defaults to 42.
+            structure_id (str, optional): Identifier of the structure the seed is derived for.
+            view_index (int, optional): Index of the augmented view the seed is derived for.
+            min_distance (float, optional): The minimum displacement in Angstrom.
+
+        Returns:
+            Structure: The transformed structure.
         """
-        set_seed(seed)
-        distance = random.uniform(0, max_distance)
-        structure.perturb(distance=distance, **kwargs)
-        return structure
+        return _apply_kernel(
+            _perturb_kernel,
+            structure,
+            derive_seed(seed, structure_id, view_index),
+            max_distance=max_distance,
+            min_distance=min_distance,
+        )
+
+
+def _wrap(frac_coords: np.ndarray, pbc) -> np.ndarray:
+    """Wrap fractional coordinates into the unit cell along the periodic directions."""
+    return np.where(np.asarray(pbc), np.mod(frac_coords, 1), frac_coords)
+
+
+def _permute_kernel(seed: int, n_sites: int, lattice) -> tuple:
+    permutation = list(range(n_sites))
+    random.Random(seed).shuffle(permutation)
+    return np.array(permutation, dtype=int), None, None
+
+
+def _translate_kernel(
+    seed: int,
+    n_sites: int,
+    lattice,
+    vector: Union[List[float], None] = None,
+    frac_coords_vector: bool = True,
+    to_unit_cell: bool = True,
+    indices: Union[List[int], slice] = slice(None),
+) -> tuple:
+    if vector is None:
+        vector = np.random.RandomState(seed).uniform(size=(3,))
+    vector = np.asarray(vector, dtype=float)
+    if not frac_coords_vector:
+        vector = lattice.get_fractional_coords(vector)
+    offsets = np.zeros((n_sites, 3))
+    offsets[indices] = vector
+    wrap = np.zeros(n_sites, dtype=bool)
+    wrap[indices] = to_unit_cell
+    return None, offsets, wrap
+
+
+def _translate_single_atom_kernel(
+    seed: int,
+    n_sites: int,
+    lattice,
+    max_indices: int = 1,
+    vector: List[float] = [0.25, 0.25, 0.25],
+    to_unit_cell: bool = True,
+) -> tuple:
+    indices = random.Random(seed).sample(range(n_sites), min(max_indices, n_sites))
+    return _translate_kernel(
+        seed, n_sites, lattice, vector, True, to_unit_cell, indices
+    )
+
+
+def _perturb_kernel(
+    seed: int,
+    n_sites: int,
+    lattice,
+    max_distance: float,
+    min_distance: Union[float, None] = None,
+) -> tuple:
+    distance = random.Random(seed).uniform(0, max_distance)
+    state = np.random.RandomState(seed)
+    vectors = state.standard_normal((n_sites, 3))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    lengths = (
+        state.uniform(min_distance, distance, size=(n_sites, 1))
+        if min_distance is not None
+        else distance
+    )
+    displacements = vectors / norms * lengths
+    return (
+        None,
+        lattice.get_fractional_coords(displacements),
+        np.ones(n_sites, dtype=bool),
+    )
+
+
+#: Array implementations of the `TransformationCallback` methods. None of them depends on
+#: the coordinates, each kernel returns the update it makes to a structure of `n_sites`
+#: sites as (permutation of the sites, offsets (N, 3) in fractional coordinates added after
+#: the permutation, mask of the sites wrapped into the unit cell afterwards), unused parts
+#: are None. The kernels draw the same random numbers as the corresponding method with
+#: the given seed.
+BATCH_KERNELS = {
+    "permute_structure": _permute_kernel,
+    "translate_structure": _translate_kernel,
+    "translate_single_atom": _translate_single_atom_kernel,
+    "perturb_structure": _perturb_kernel,
+}
+
+
+def _kernel_params(transformation: str, params: dict) -> dict:
+    """Translate the arguments of a `TransformationCallback` method for its kernel."""
+    params = {
+        key: value
+        for key, value in params.items()
+        if key not in ("seed", "structure_id", "view_index")
+    }
+    if transformation == "translate_structure" and "frac_coords" in params:
+        params["frac_coords_vector"] = params.pop("frac_coords")
+    return params
+
+
+def _seed_of(params: dict) -> int:
+    """Seed a `TransformationCallback` method derives from its parameters."""
+    return derive_seed(
+        params.get("seed", 42), params.get("structure_id"), params.get("view_index")
+    )
+
+
+class CompiledTransformations:
+    """
+    A list of transformations compiled into a single update of the coordinate array.
+
+    The permutations of all steps are composed into one index map and the
+    translations and perturbations summed into one offset array, so the coordinates
+    are gathered, shifted and wrapped once. Only a step that adds an offset without
+    wrapping to a site that an earlier step wraps splits the update in two.
+    Calling it gives the same structure as applying the `TransformationCallback`
+    methods one after the other, up to rounding, but the structure is only built once.
+
+    Attributes:
+        steps : kernel, seed and kernel parameters of every transformation
+    """
+
+    def __init__(self, steps: List[Tuple[Callable, int, dict]]) -> None:
+        self.steps = steps
+
+    def __call__(self, structure: Structure) -> Structure:
+        """Apply the transformations to a structure, it is not modified."""
+        lattice = structure.lattice
+        n_sites = len(structure)
+        frac_coords = structure.frac_coords
+        order = np.arange(n_sites)
+        # pending update of frac_coords: gather, add offsets, wrap the masked sites
+        permutation = np.arange(n_sites)
+        offsets = np.zeros((n_sites, 3))
+        wrap = np.zeros(n_sites, dtype=bool)
+
+        def flush() -> None:
+            nonlocal frac_coords, order, permutation, offsets, wrap
+            frac_coords = frac_coords[permutation] + offsets
+            frac_coords = np.where(
+                wrap[:, None], _wrap(frac_coords, lattice.pbc), frac_coords
+            )
+            order = order[permutation]
+            permutation = np.arange(n_sites)
+            offsets = np.zeros((n_sites, 3))
+            wrap = np.zeros(n_sites, dtype=bool)
+
+        for kernel, seed, params in self.steps:
+            step_permutation, step_offsets, step_wrap = kernel(
+                seed, n_sites, lattice, **params
+            )
+            if step_permutation is not None:
+                permutation = permutation[step_permutation]
+                offsets = offsets[step_permutation]
+                wrap = wrap[step_permutation]
+            if step_offsets is not None:
+                # wrap(wrap(x + a) + b) == wrap(x + a + b), but wrap(x + a) + b is not
+                moved = step_offsets.any(axis=1)
+                if (wrap & moved & ~step_wrap).any():
+                    flush()
+                offsets = offsets + step_offsets
+                wrap = wrap | step_wrap
+        flush()
+        return _build_structure(structure, frac_coords, order)
+
+
+def compile_transformations(
+    transformations: List[Tuple[str, dict]],
+) -> CompiledTransformations:
+    """
+    Compile transformations in the format of `TextRep(transformations=...)`.
+
+    Every step is seeded as the corresponding `TransformationCallback` method.
+
+    Args:
+        transformations: List of (name, parameters) of `TransformationCallback` methods.
+
+    Returns:
+        CompiledTransformations: Callable applying all transformations to a structure.
+    """
+    for transformation, _ in transformations:
+        if transformation not in BATCH_KERNELS:
+            raise ValueError(f"Unknown transformation '{transformation}'")
+    return CompiledTransformations(
+        [
+            (BATCH_KERNELS[name], _seed_of(params), _kernel_params(name, params))
+            for name, params in transformations
+        ]
+    )
+
+
+class AugmentedViews:
+    """
+    K augmented views of a structure, stored as arrays.
+
+    The views share the lattice and the species of the original structure, structures
+    are only built when a view is accessed.
+
+    Attributes:
+        structure : the original structure
+        frac_coords : fractional coordinates of the views, shape (K, N, 3), in the order of `orders`
+        orders : indices of the original sites in each view, shape (K, N)
+    """
+
+    def __init__(
+        self, structure: Structure, frac_coords: np.ndarray, orders: np.ndarray
+    ) -> None:
+        self.structure = structure
+        self.frac_coords = frac_coords
+        self.orders = orders
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __getitem__(self, view_index: int) -> Structure:
+        """Build the structure of a single view."""
+        return _build_structure(
+            self.structure, self.frac_coords[view_index], self.orders[view_index]
+        )
+
+    def __iter__(self) -> Iterator[Structure]:
+        for view_index in range(len(self)):
+            yield self[view_index]
+
+
+def augment_batch(
+    structure: Structure,
+    transformations: List[Tuple[str, dict]],
+    n_views: int,
+    seed: int = 42,
+    structure_id: Optional[str] = None,
+) -> AugmentedViews:
+    """
+    Generate `n_views` augmented views of a structure with NumPy.
+
+    The transformations are given in the format of `TextRep(transformations=...)` and applied
+    in order to the fractional coordinate array of all views at once. In each step, the
+    kernel of the transformation draws the random numbers of every view, from the seed
+    `derive_seed(seed, structure_id, k)` of view k, and the updates of all views are
+    applied with broadcasting. A step with a "seed" parameter uses it instead of `seed`,
+    its "structure_id" and "view_index" parameters are ignored. View k is therefore the
+    structure the `TransformationCallback` methods give with the same seed,
+    `structure_id` and `view_index=k`, and the views of a run with more views start
+    with the views of a run with fewer.
+
+    Args:
+        structure: The input structure, it is not modified.
+        transformations: List of (name, parameters) of `TransformationCallback` methods.
+        n_views: Number of views to generate.
+        seed: Seed of the steps without a "seed" parameter.
+        structure_id: Identifier of the structure, gives different structures independent views.
+
+    Returns:
+        AugmentedViews: The views, materialized as structures on access.
+    """
+    for transformation, _ in transformations:
+        if transformation not in BATCH_KERNELS:
+            raise ValueError(f"Unknown transformation '{transformation}'")
+
+    lattice = structure.lattice
+    n_sites = len(structure)
+    frac_coords = np.repeat(structure.frac_coords[None], n_views, axis=0)
+    orders = np.repeat(np.arange(n_sites)[None], n_views, axis=0)
+    for name, params in transformations:
+        kernel, kernel_params = BATCH_KERNELS[name], _kernel_params(name, params)
+        step_seed = params.get("seed", seed)
+        updates = [
+            kernel(
+                derive_seed(step_seed, structure_id, view_index),
+                n_sites,
+                lattice,
+                **kernel_params,
+            )
+            for view_index in range(n_views)
+        ]
+        permutations, offsets, wraps = zip(*updates) if updates else ((), (), ())
+        if permutations and permutations[0] is not None:
+            permutations = np.stack(permutations)
+            frac_coords = np.take_along_axis(
+                frac_coords, permutations[:, :, None], axis=1
+            )
+            orders = np.take_along_axis(orders, permutations, axis=1)
+        if offsets and offsets[0] is not None:
+            frac_coords = frac_coords + np.stack(offsets)
+            frac_coords = np.where(
+                np.stack(wraps)[:, :, None],
+                _wrap(frac_coords, lattice.pbc),
+                frac_coords,
+            )
+    return AugmentedViews(structure, frac_coords, orders)
@@ -0,0 +1,520 @@
+"""Supervised subprocess workers for representation generators.
+
+Some generators (robocrys condensation, chemenv, SLICES/m3gnet) can run for a very
+long time or crash the interpreter in openbabel/TensorFlow for pathological
+structures. Running them in a supervised subprocess allows enforcing a wall-clock
+budget: the worker is killed when the budget is exceeded and a fresh one is started
+for the next task.
+
+Workers can be warmed up by an initializer (see `xtal2txt.preload.preload`) and
+recycled after a number of tasks or once their memory exceeds a threshold, which
+contains the leaks of the TensorFlow and openbabel stacks. A `WorkerPool` runs
+calls on several supervised workers, e.g. the structures of a bulk conversion.
+"""
+
+import atexit
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional
+
+from xtal2txt.profiling import get_rss_bytes
+
+
+class RepresentationTimeout(TimeoutError):
+    """Raised when a task exceeds its wall-clock budget."""
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__(f"Task did not finish within {timeout} s")
+        self.timeout = timeout
+
+
+class WorkerCrashed(RuntimeError):
+    """Raised when the worker process dies while running a task."""
+
+
+def _worker_loop(
+    connection: Connection, initializer: Optional[Callable] = None, initargs=()
+) -> None:
+    """Run tasks received through `connection` until a `None` task is received."""
+    start = time.perf_counter()
+    warm_up = initializer(*initargs) if initializer is not None else None
+    connection.send(("ready", (time.perf_counter() - start, warm_up)))
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        # receiving the task imported the modules it needs
+        connection.send(("started", None))
+        func, args, kwargs = task
+        try:
+            result = ("ok", func(*args, **kwargs))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            result = ("error", e)
+        connection.send((*result, get_rss_bytes()))
+
+
+class SupervisedWorker:
+    """
+    A single subprocess that runs tasks with an optional wall-clock budget.
+
+    The process is started lazily on the first task. If the process dies, it is
+    replaced on the next task. If a task exceeds its budget, the process is killed and
+    a new one is started right away. Tasks are run one at a time, concurrent calls to
+    `run` are serialized.
+
+    The budget of a task covers the whole call: waiting for a process that is still
+    starting, importing the modules the task needs and running it. Start the worker
+    ahead of time (`start`) to spend the budget on the task only.
+
+    Every process runs the initializer before its first task. After `max_tasks` tasks,
+    or once its resident set size exceeds `max_rss_bytes` after a task, the process
+    is stopped and a new one is started right away, so that it warms up while the
+    caller handles the result.
+
+    Attributes:
+        start_method : multiprocessing start method used for the worker process
+        initializer : function called with `initargs` in every new process
+        initargs : arguments of the initializer
+        max_tasks : number of tasks after which the process is recycled, None for no limit
+        max_rss_bytes : resident set size above which the process is recycled, None for no limit
+        daemon : whether the process is daemonic, only non-daemonic processes can start processes
+        tasks : number of tasks run by the current process
+        rss_bytes : resident set size of the process after its last task
+        recycled : number of processes recycled so far
+        warm_up_seconds : time the initializer took in the current process
+        warm_up : return value of the initializer in the current process
+    """
+
+    def __init__(
+        self,
+        start_method: str = "spawn",
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        max_tasks: Optional[int] = None,
+        max_rss_bytes: Optional[int] = None,
+        daemon: bool = True,
+    ) -> None:
+        """
+        Initialize SupervisedWorker instance.
+
+        Args:
+            start_method: multiprocessing start method. "spawn" (default) avoids
+                inheriting the state of threaded libraries such as TensorFlow.
+            initializer: Picklable (module level) function called with `initargs`
+                when a process starts, e.g. `xtal2txt.preload.preload`.
+            initargs: Arguments of the initializer.
+            max_tasks: Number of tasks after which the process is recycled.
+            max_rss_bytes: Resident set size in bytes above which the process is recycled.
+            daemon: Whether the process is daemonic. Daemonic processes are killed when this
+                process exits, but can not start processes, e.g. supervised workers, themselves.
+        """
+        self.start_method = start_method
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_tasks = max_tasks
+        self.max_rss_bytes = max_rss_bytes
+        self.daemon = daemon
+        self.tasks = 0
+        self.rss_bytes: Optional[int] = None
+        self.recycled = 0
+        self.warm_up_seconds: Optional[float] = None
+        self.warm_up: Any = None
+        self._process = None
+        self._connection = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def pid(self) -> Optional[int]:
+        """Process id of the worker process, None if it is not running."""
+        return self._process.pid if self._process is not None else None
+
+    def is_alive(self) -> bool:
+        """Whether the worker process is running."""
+        process = self._process
+        return process is not None and process.is_alive()
+
+    def _start(self) -> None:
+        context = multiprocessing.get_context(self.start_method)
+        parent_connection, child_connection = context.Pipe()
+        process = context.Process(
+            target=_worker_loop,
+            args=(child_connection, self.initializer, self.initargs),
+            daemon=self.daemon,
+        )
+        process.start()
+        child_connection.close()
+        self._process = process
+        self._connection = parent_connection
+        self._ready = False
+        self.tasks = 0
+        self.rss_bytes = None
+
+    def _wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the process finished its initializer, at most `timeout` seconds."""
+        if not self._ready:
+            if not self._connection.poll(timeout):
+                return False
+            _, (self.warm_up_seconds, self.warm_up) = self._connection.recv()
+            self._ready = True
+        return True
+
+    def _stop(self) -> None:
+        """Let the process finish its loop, kill it if it does not."""
+        try:
+            self._connection.send(None)
+            self._process.join(timeout=5)
+        except (OSError, EOFError):
+            pass
+        self._kill()
+
+    def _should_recycle(self) -> bool:
+        if self.max_tasks is not None and self.tasks >= self.max_tasks:
+            return True
+        return (
+            self.max_rss_bytes is not None
+            and self.rss_bytes is not None
+            and self.rss_bytes > self.max_rss_bytes
+        )
+
+    def _kill(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def run(
+        self, func: Callable, *args, timeout: Optional[float] = None, **kwargs
+    ) -> Any:
+        """
+        Run `func(*args, **kwargs)` in the worker process.
+
+        The budget covers the whole call, including waiting for a process that is still
+        starting. A process that is not warmed up in time keeps warming up for the next
+        call. A process killed because the task exceeded its budget is replaced by a new
+        one right away, which warms up in the background while the caller goes on.
+
+        Args:
+            func: Picklable (module level) function to call.
+            *args: Positional arguments to pass to func.
+            timeout: Wall-clock budget in seconds of the call, None for no limit.
+            **kwargs: Keyword arguments to pass to func.
+
+        Returns:
+            Result of func.
+
+        Raises:
+            RepresentationTimeout: If the task does not finish within `timeout`.
+            WorkerCrashed: If the worker process dies while running the task.
+            Exception: Any exception raised by func is re-raised.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if end is None else max(end - time.monotonic(), 0.0)
+
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._kill()
+                self._start()
+            try:
+                ready = self._wait_ready(remaining())
+                if ready:
+                    self._connection.send((func, args, kwargs))
+                    # the worker acknowledges the task once it started it
+                    finished = self._connection.poll(remaining())
+                    if finished:
+                        self._connection.recv()
+                        finished = self._connection.poll(remaining())
+                    if finished:
+                        status, result, self.rss_bytes = self._connection.recv()
+            except (EOFError, OSError) as e:
+                self._process.join(timeout=1)
+                exitcode = self._process.exitcode
+                self._kill()
+                raise WorkerCrashed(
+                    f"Worker process died (exit code {exitcode})"
+                ) from e
+            if not ready:
+                # the task was not sent, the process keeps warming up for the next call
+                raise RepresentationTimeout(timeout)
+            if not finished:
+                self._kill()
+                # the replacement warms up while the caller goes on
+                self._start()
+                raise RepresentationTimeout(timeout)
+            self.tasks += 1
+            if self._should_recycle():
+                self._stop()
+                self.recycled += 1
+                self._start()
+
+        if status == "error":
+            raise result
+        return result
+
+    def start(self) -> None:
+        """Start the worker process, if not running, and wait until it is warmed up."""
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._kill()
+                self._start()
+            try:
+                self._wait_ready()
+            except (EOFError, OSError) as e:
+                self._process.join(timeout=1)
+                exitcode = self._process.exitcode
+                self._kill()
+                raise WorkerCrashed(
+                    f"Worker process died while warming up (exit code {exitcode})"
+                ) from e
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._stop()
+            self._kill()
+
+
+class WorkerPool(Executor):
+    """
+    Run calls on a fixed number of supervised worker processes, one call per worker at a time.
+
+    Unlike in a `ProcessPoolExecutor`, a worker process that dies only fails the call
+    it was running, with `WorkerCrashed`. It is restarted and warmed up right away, and
+    the pool stays usable. The workers are recycled as set by `max_tasks` and
+    `max_rss_bytes`, see `SupervisedWorker`. The worker processes are not daemonic, so
+    the calls can use supervised workers, e.g. for timeouts, themselves.
+
+    Attributes:
+        workers : the supervised workers of the pool
+        crashes : number of calls that failed because their worker process died
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        max_tasks: Optional[int] = None,
+        max_rss_bytes: Optional[int] = None,
+        start_method: str = "spawn",
+    ) -> None:
+        """
+        Initialize WorkerPool instance.
+
+        Args:
+            n_workers: Number of worker processes.
+            initializer: Picklable (module level) function called with `initargs`
+                when a worker process starts, e.g. `xtal2txt.preload.preload`.
+            initargs: Arguments of the initializer.
+            max_tasks: Number of tasks after which a worker process is recycled.
+            max_rss_bytes: Resident set size in bytes above which a worker process is recycled.
+            start_method: multiprocessing start method of the worker processes.
+        """
+        self.workers = [
+            SupervisedWorker(
+                start_method, initializer, initargs, max_tasks, max_rss_bytes, False
+            )
+            for _ in range(n_workers)
+        ]
+        self.crashes = 0
+        self._idle: "queue.SimpleQueue[SupervisedWorker]" = queue.SimpleQueue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        self._executor = ThreadPoolExecutor(
+            n_workers, thread_name_prefix="xtal2txt-worker-pool"
+        )
+        self._lock = threading.Lock()
+        _pools.add(self)
+
+    def start(self) -> List[float]:
+        """
+        Start the worker processes that are not running and wait until each has run its initializer.
+
+        Returns:
+            List[float]: Seconds the initializer took in each worker process.
+        """
+        with ThreadPoolExecutor(len(self.workers)) as executor:
+            list(executor.map(SupervisedWorker.start, self.workers))
+        return [worker.warm_up_seconds for worker in self.workers]
+
+    def _call(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        worker = self._idle.get()
+        try:
+            return worker.run(func, *args, **kwargs)
+        except WorkerCrashed:
+            with self._lock:
+                self.crashes += 1
+            try:
+                worker.start()
+            except WorkerCrashed:
+                # the next call starts it again
+                pass
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """
+        Schedule `fn(*args, **kwargs)` on the next idle worker.
+
+        A `timeout` keyword argument is the wall-clock budget of the call, see
+        `SupervisedWorker.run`.
+
+        Returns:
+            Future: Resolves to the result of the call.
+        """
+        return self._executor.submit(self._call, fn, args, kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stop the worker processes once the running calls are done.
+
+        Args:
+            wait: Whether to wait for the running calls and the worker processes.
+            cancel_futures: Whether to cancel the calls that did not start yet.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+        if wait:
+            _close_workers(self.workers)
+        else:
+            threading.Thread(
+                target=_close_workers, args=(self.workers,), daemon=True
+            ).start()
+        _pools.discard(self)
+
+
+def _close_workers(workers: List[SupervisedWorker]) -> None:
+    for worker in workers:
+        worker.close()
+
+
+_pools: "weakref.WeakSet[WorkerPool]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_pools() -> None:
+    # runs before multiprocessing joins the non-daemonic worker processes at exit
+    for pool in list(_pools):
+        _close_workers(pool.workers)
+
+
+_shared_worker: Optional[SupervisedWorker] = None
+_named_workers: Dict[str, SupervisedWorker] = {}
+_shared_pools: Dict[tuple, WorkerPool] = {}
+_worker_options: Dict[str, Any] = {}
+_workers_lock = threading.Lock()
+
+
+def configure_shared_workers(
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+    max_tasks: Optional[int] = None,
+    max_rss_bytes: Optional[int] = None,
+) -> None:
+    """
+    Set the warm-up and the recycling of the shared workers, see `SupervisedWorker`.
+
+    The shared workers running so far are stopped, new ones are created with these
+    options on their next use. The shared pools (`get_shared_pool`) keep their
+    processes and initializer, the recycling limits apply to them from now on.
+
+    Args:
+        initializer: Function called with `initargs` in every new worker process,
+            e.g. `xtal2txt.preload.preload`.
+        initargs: Arguments of the initializer.
+        max_tasks: Number of tasks after which a worker process is recycled.
+        max_rss_bytes: Resident set size in bytes above which a worker process is recycled.
+    """
+    global _shared_worker
+    with _workers_lock:
+        _worker_options.clear()
+        _worker_options.update(
+            initializer=initializer,
+            initargs=initargs,
+            max_tasks=max_tasks,
+            max_rss_bytes=max_rss_bytes,
+        )
+        workers = list(_named_workers.values())
+        if _shared_worker is not None:
+            workers.append(_shared_worker)
+        _shared_worker = None
+        _named_workers.clear()
+        for pool in _shared_pools.values():
+            for worker in pool.workers:
+                worker.max_tasks, worker.max_rss_bytes = max_tasks, max_rss_bytes
+    for worker in workers:
+        worker.close()
+
+
+def get_shared_pool(
+    n_workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()
+) -> WorkerPool:
+    """
+    Return a worker pool shared by the whole process.
+
+    A pool is created and warmed up on the first call with the same arguments, later
+    calls reuse its processes. The pools are recycled as set by `configure_shared_workers`.
+
+    Args:
+        n_workers: Number of worker processes.
+        initializer: Picklable (module level) function called with `initargs` in every
+            worker process, e.g. to load a backend.
+        initargs: Arguments of the initializer.
+
+    Returns:
+        WorkerPool: The started pool.
+    """
+    key = (n_workers, initializer, initargs)
+    with _workers_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = WorkerPool(
+                n_workers,
+                initializer,
+                initargs,
+                _worker_options.get("max_tasks"),
+                _worker_options.get("max_rss_bytes"),
+            )
+            pool.start()
+            _shared_pools[key] = pool
+    return pool
+
+
+def get_shared_worker(name: Optional[str] = None) -> SupervisedWorker:
+    """
+    Return a supervised worker shared by all TextRep instances of this process.
+
+    Args:
+        name: Name of the worker. Tasks on workers with different names run
+            concurrently, None is the default worker.
+
+    Returns:
+        SupervisedWorker: The worker, created on the first call.
+    """
+    global _shared_worker
+    with _workers_lock:
+        if name is not None:
+            if name not in _named_workers:
+                _named_workers[name] = SupervisedWorker(**_worker_options)
+            return _named_workers[name]
+        if _shared_worker is None:
+            _shared_worker = SupervisedWorker(**_worker_options)
+        return _shared_worker
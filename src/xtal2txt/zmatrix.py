@@ -0,0 +1,144 @@
+"""Z-matrix of a crystal structure computed with NumPy.
+
+The Z-matrix describes every atom by the distance to its nearest preceding atom,
+the angle with the second nearest and the dihedral with the third nearest
+preceding atom, with the conventions of pymatgen's `Molecule.get_zmatrix`.
+Values are rendered directly at the requested precision.
+
+By default the atoms of the unit cell are treated as a molecule, as in
+`Molecule.get_zmatrix`. With `minimum_image=True` the distances, angles and
+dihedrals are computed with the periodic images of the reference atoms that
+are closest to each atom, so bonds across the cell boundary are not overlooked.
+"""
+
+from typing import List
+
+import numpy as np
+from pymatgen.core import Structure
+from pymatgen.util.coord import pbc_shortest_vectors
+
+
+def _norms(vectors: np.ndarray) -> np.ndarray:
+    # einsum sums in the same order as the dot product `np.linalg.norm` uses for single
+    # vectors, so that equal distances tie exactly as in `Molecule.get_zmatrix`
+    return np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+
+
+def _references(structure: Structure, minimum_image: bool) -> List[np.ndarray]:
+    """
+    Find the (up to) three nearest preceding atoms of every atom.
+
+    Ties are broken by the lower index, as in `Molecule.get_zmatrix`.
+
+    Returns:
+        List[np.ndarray]: For every atom the indices of its references (first column)
+            and their Cartesian positions (remaining columns).
+    """
+    cart_coords = structure.cart_coords
+    frac_coords = structure.frac_coords
+    references = [np.empty((0, 4))]
+    for i in range(1, len(structure)):
+        if minimum_image:
+            vectors = pbc_shortest_vectors(
+                structure.lattice, frac_coords[i], frac_coords[:i]
+            )[0]
+            positions = cart_coords[i] + vectors
+        else:
+            vectors = cart_coords[i] - cart_coords[:i]
+            positions = cart_coords[:i]
+        nearest = np.argsort(_norms(vectors), kind="stable")[:3]
+        references.append(np.column_stack([nearest, positions[nearest]]))
+    return references
+
+
+def _angles(
+    positions_i: np.ndarray, positions_j: np.ndarray, positions_k: np.ndarray
+) -> np.ndarray:
+    """Angles in degrees at j of triples of positions (`SiteCollection.get_angle`)."""
+    vectors_1 = positions_i - positions_j
+    vectors_2 = positions_k - positions_j
+    cosine = np.einsum("ij,ij->i", vectors_1, vectors_2)
+    cosine = cosine / _norms(vectors_1) / _norms(vectors_2)
+    return np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+
+
+def _dihedrals(
+    positions_i: np.ndarray,
+    positions_j: np.ndarray,
+    positions_k: np.ndarray,
+    positions_l: np.ndarray,
+) -> np.ndarray:
+    """Dihedral angles in degrees of quadruples of positions (`SiteCollection.get_dihedral`)."""
+    vectors_1 = positions_k - positions_l
+    vectors_2 = positions_j - positions_k
+    vectors_3 = positions_i - positions_j
+    cross_23 = np.cross(vectors_2, vectors_3)
+    cross_12 = np.cross(vectors_1, vectors_2)
+    return np.degrees(
+        np.arctan2(
+            _norms(vectors_2) * np.einsum("ij,ij->i", vectors_1, cross_23),
+            np.einsum("ij,ij->i", cross_12, cross_23),
+        )
+    )
+
+
+def _format_length(value: float, decimal_places: int) -> str:
+    # round via the 6 decimal places pymatgen writes, so the output matches the
+    # substitution of the variables of `Molecule.get_zmatrix`
+    return f"{round(float(f'{value:.6f}'), decimal_places):.{decimal_places}f}"
+
+
+def _format_angle(value: float) -> str:
+    return f"{int(round(float(f'{value:.6f}')))}"
+
+
+def get_zmatrix(
+    structure: Structure, decimal_places: int = 1, minimum_image: bool = False
+) -> str:
+    """
+    Generate the Z-matrix of a structure.
+
+    Args:
+        structure: pymatgen Structure object.
+        decimal_places: Number of decimal places of the bond lengths, angles and
+            dihedrals are rounded to integers.
+        minimum_image: Whether to use the periodic images of the reference atoms
+            closest to each atom instead of the atoms in the unit cell.
+
+    Returns:
+        str: One line per atom, e.g. "N\\nN 1 3.79\\nN 1 6.54 2 90\\nN 1 6.54 2 90 3 120".
+    """
+    species = [
+        str(specie.element if hasattr(specie, "element") else specie)
+        for specie in structure.species
+    ]
+    n_sites = len(structure)
+    if n_sites == 0:
+        return ""
+
+    # positions of the first, second and third reference of each atom, NaN if missing
+    positions = np.full((n_sites, 3, 3), np.nan)
+    indices = np.zeros((n_sites, 3), dtype=int)
+    for i, rows in enumerate(_references(structure, minimum_image)):
+        indices[i, : len(rows)] = rows[:, 0]
+        positions[i, : len(rows)] = rows[:, 1:]
+
+    cart_coords = structure.cart_coords
+    with np.errstate(invalid="ignore"):
+        bonds = _norms(cart_coords - positions[:, 0])
+        angles = _angles(cart_coords, positions[:, 0], positions[:, 1])
+        dihedrals = _dihedrals(
+            cart_coords, positions[:, 0], positions[:, 1], positions[:, 2]
+        )
+
+    lines = []
+    for i in range(n_sites):
+        line = [species[i]]
+        if i >= 1:
+            line += [str(indices[i, 0] + 1), _format_length(bonds[i], decimal_places)]
+        if i >= 2:
+            line += [str(indices[i, 1] + 1), _format_angle(angles[i])]
+        if i >= 3:
+            line += [str(indices[i, 2] + 1), _format_angle(dihedrals[i])]
+        lines.append(" ".join(line))
+    return "\n".join(lines)
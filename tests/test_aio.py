@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+import time
+
+from xtal2txt import aio
+from xtal2txt.core import TextRep
+from xtal2txt.decoder import DecodeTextRep
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CIFS = [
+    os.path.join(THIS_DIR, "data", name)
+    for name in ["N2_p1.cif", "SrTiO3_p1.cif", "InCuS2_p1.cif"]
+]
+REPS = ["composition", "crystal_text_llm", "cif_p1"]
+
+
+def test_async_text_reps_do_not_block_the_event_loop():
+    text_rep = TextRep.from_input(CIFS[1])
+    expected = text_rep.get_requested_text_reps(REPS, decimal_places=3)
+    get_composition = text_rep.get_composition
+
+    def slow_composition():
+        # a conversion that blocks its thread for 0.3 s
+        end = time.perf_counter() + 0.3
+        while time.perf_counter() < end:
+            pass
+        return get_composition()
+
+    text_rep.get_composition = slow_composition
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        reps = await text_rep.aget_requested_text_reps(REPS, decimal_places=3)
+        end = time.perf_counter()
+        ticker.cancel()
+        return reps, start, end
+
+    reps, start, end = asyncio.run(main())
+    assert reps == expected
+    assert end - start >= 0.3
+    assert len([t for t in ticks if start < t < end]) > 10
+
+
+def test_executor_bounds_concurrency_and_cancels_queued_calls():
+    started = []
+    release = threading.Event()
+
+    def work(name):
+        started.append(name)
+        release.wait(10)
+        return name
+
+    async def main():
+        first = asyncio.ensure_future(aio.run_in_executor(work, "first"))
+        second = asyncio.ensure_future(aio.run_in_executor(work, "second"))
+        await asyncio.sleep(0.2)
+        assert started == ["first"]
+        second.cancel()
+        await asyncio.wait([second])
+        release.set()
+        return await first
+
+    aio.configure_executor(max_workers=1)
+    try:
+        assert asyncio.run(main()) == "first"
+        aio.get_executor().submit(time.sleep, 0).result()
+        assert started == ["first"]
+    finally:
+        aio.configure_executor()
+
+
+def test_stream_text_reps():
+    async def structures():
+        for cif in CIFS + ["not a cif"]:
+            yield cif
+
+    async def main(max_pending):
+        results, errors = {}, {}
+        async for text_rep, reps, error in aio.stream_text_reps(
+            structures(), REPS, max_pending=max_pending
+        ):
+            if error is None:
+                results[text_rep.structure_id] = reps
+            else:
+                errors[text_rep] = error
+        return results, errors
+
+    expected = {}
+    for cif in CIFS:
+        text_rep = TextRep.from_input(cif)
+        expected[text_rep.structure_id] = text_rep.get_requested_text_reps(REPS)
+    for max_pending in [1, 3]:
+        results, errors = asyncio.run(main(max_pending))
+        assert results == expected
+        assert list(errors) == ["not a cif"]
+
+
+def test_async_decoder():
+    text = TextRep.from_input(CIFS[1]).get_crystal_text_llm()
+    decoder = DecodeTextRep(text)
+
+    async def main():
+        return await decoder.adecode(), await decoder.allm_decoder(text)
+
+    decoded_text, structure = asyncio.run(main())
+    assert decoded_text == text
+    assert structure == decoder.llm_decoder(text)
@@ -0,0 +1,63 @@
+from xtal2txt.cache import RepresentationCache, structure_fingerprint
+from xtal2txt.core import TextRep
+
+
+def test_structure_fingerprint(get_incus2):
+    structure = get_incus2
+    assert structure_fingerprint(structure) == structure_fingerprint(structure.copy())
+
+    moved = structure.copy()
+    moved.translate_sites([0], [0.1, 0.0, 0.0])
+    assert structure_fingerprint(structure) != structure_fingerprint(moved)
+
+
+def test_textrep_uses_cache(get_incus2, tmp_path):
+    cache = RepresentationCache(tmp_path / "cache.sqlite")
+    text_rep = TextRep.from_input(get_incus2, cache=cache)
+    first = text_rep.get_requested_text_reps(["composition", "cif_p1"])
+    assert len(cache) == 2
+
+    # a cache hit must not call the generator again
+    text_rep = TextRep.from_input(get_incus2, cache=cache)
+    text_rep._rep_registry["composition"] = lambda dp: "not from cache"
+    assert text_rep.get_requested_text_reps("composition") == first["composition"]
+
+    # a different number of decimal places is a different entry
+    text_rep.get_requested_text_reps("cif_p1", decimal_places=4)
+    assert len(cache) == 3
+
+
+def test_cache_eviction(tmp_path):
+    cache = RepresentationCache(tmp_path / "cache.sqlite", max_size_bytes=10)
+    cache.set("a", "composition", "x" * 6)
+    cache.set("b", "composition", "y" * 6)
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 6
+    assert cache.size_bytes() <= 10
+
+
+def test_cache_tracks_size_and_batches_access_times(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = RepresentationCache(path, touch_batch_size=2, touch_interval=3600)
+    cache.set("a", "composition", "x" * 6)
+    cache.set("a", "composition", "x" * 4)
+    cache.set("b", "composition", "y" * 5)
+    assert cache.size_bytes() == 9
+
+    def last_access(key):
+        return cache.connection.execute(
+            "SELECT last_access FROM representations WHERE key = ?", (key,)
+        ).fetchone()[0]
+
+    stored = last_access("a")
+    assert cache.get("a") == "x" * 4
+    assert last_access("a") == stored
+    assert cache.get("b") == "y" * 5
+    assert last_access("a") > stored
+    cache.close()
+
+    # the total of an existing database is kept when reopening it
+    cache = RepresentationCache(path)
+    assert cache.size_bytes() == 9
+    cache.clear()
+    assert cache.size_bytes() == 0
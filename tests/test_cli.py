@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+
+from xtal2txt.cli import main
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _read_shards(output_dir):
+    records = []
+    for shard in sorted(output_dir.glob("reps-*.jsonl")):
+        with open(shard) as file:
+            records.extend(json.loads(line) for line in file)
+    return records
+
+
+def test_convert_directory(tmp_path):
+    input_dir = tmp_path / "cifs"
+    input_dir.mkdir()
+    for name in ["N2_p1.cif", "SrTiO3_p1.cif", "InCuS2_p1.cif"]:
+        shutil.copy(os.path.join(THIS_DIR, "data", name), input_dir)
+    (input_dir / "broken.cif").write_text("not a cif")
+
+    output_dir = tmp_path / "out"
+    args = [
+        "convert",
+        str(input_dir),
+        "-o",
+        str(output_dir),
+        "--reps",
+        "composition",
+        "atom_sequences",
+        "--shard-size",
+        "2",
+        "--workers",
+        "2",
+        "--max-tasks-per-worker",
+        "1",
+        "--quiet",
+    ]
+    assert main(args) == 0
+
+    records = _read_shards(output_dir)
+    assert len(list(output_dir.glob("reps-*.jsonl"))) == 2
+    assert {record["id"] for record in records} == {"N2_p1", "SrTiO3_p1", "InCuS2_p1"}
+    srtio3 = next(record for record in records if record["id"] == "SrTiO3_p1")
+    assert srtio3["composition"] == "O3SrTi"
+
+    with open(output_dir / "failures.jsonl") as file:
+        failures = [json.loads(line) for line in file]
+    assert [failure["id"] for failure in failures] == ["broken"]
+    assert "input" in failures[0]["errors"]
+
+    # nothing is converted twice when resuming, unreadable inputs included
+    assert main(args + ["--resume"]) == 0
+    assert len(_read_shards(output_dir)) == 3
+    with open(output_dir / "failures.jsonl") as file:
+        assert [json.loads(line)["id"] for line in file] == ["broken"]
+
+
+def test_convert_dedup(tmp_path):
+    input_dir = tmp_path / "cifs"
+    input_dir.mkdir()
+    for name in ["SrTiO3_p1.cif", "SrTiO3_symmetrized.cif", "N2_p1.cif"]:
+        shutil.copy(os.path.join(THIS_DIR, "data", name), input_dir)
+
+    output_dir = tmp_path / "out"
+    args = ["convert", str(input_dir), "-o", str(output_dir)]
+    assert main(args + ["--reps", "composition", "--dedup", "--quiet"]) == 0
+
+    records = {record["id"]: record for record in _read_shards(output_dir)}
+    assert set(records) == {"N2_p1", "SrTiO3_p1", "SrTiO3_symmetrized"}
+    assert records["SrTiO3_symmetrized"]["composition"] == "O3SrTi"
+    with open(output_dir / "duplicates.json") as file:
+        assert json.load(file) == {"SrTiO3_symmetrized": "SrTiO3_p1"}
+
+    # a duplicate of a representative written by the previous run
+    shutil.copy(input_dir / "SrTiO3_p1.cif", input_dir / "SrTiO3_copy.cif")
+    assert main(args + ["--reps", "composition", "--dedup", "--quiet", "--resume"]) == 0
+    records = _read_shards(output_dir)
+    assert sorted(record["id"] for record in records) == [
+        "N2_p1",
+        "SrTiO3_copy",
+        "SrTiO3_p1",
+        "SrTiO3_symmetrized",
+    ]
+    assert {
+        record["composition"] for record in records if record["id"].startswith("SrTiO3")
+    } == {"O3SrTi"}
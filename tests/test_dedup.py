@@ -0,0 +1,68 @@
+import os
+
+from pymatgen.core import Structure
+
+from xtal2txt.dedup import StructureDeduplicator, canonical_fingerprint, deduplicate
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load(name):
+    return Structure.from_file(os.path.join(THIS_DIR, "data", name))
+
+
+def test_canonical_fingerprint_ignores_site_order():
+    structure = _load("InCuS2_p1.cif")
+    permuted = Structure.from_sites(list(reversed(structure.sites)))
+    assert canonical_fingerprint(structure) == canonical_fingerprint(permuted)
+    perturbed = structure.copy()
+    perturbed.translate_sites([0], [0.01, 0, 0])
+    assert canonical_fingerprint(structure) != canonical_fingerprint(perturbed)
+
+
+def test_deduplicate():
+    srtio3 = _load("SrTiO3_p1.cif")
+    perturbed = srtio3.copy()
+    perturbed.translate_sites([0], [0.001, 0, 0])
+    structures = {
+        "srtio3": srtio3,
+        "srtio3-symmetrized": _load("SrTiO3_symmetrized.cif"),
+        "srtio3-supercell": srtio3 * [1, 1, 2],
+        "srtio3-perturbed": perturbed,
+        "incus2": _load("InCuS2_p1.cif"),
+    }
+    strained = srtio3.copy()
+    strained.scale_lattice(srtio3.volume * 2)
+    structures["srtio3-strained"] = strained
+    result = deduplicate(structures)
+
+    # supercells and scaled cells have other cell-dependent representations
+    assert list(result.representatives) == [
+        "srtio3",
+        "srtio3-supercell",
+        "incus2",
+        "srtio3-strained",
+    ]
+    assert result.duplicates == {
+        "srtio3-symmetrized": "srtio3",
+        "srtio3-perturbed": "srtio3",
+    }
+    assert result.groups()["incus2"] == ["incus2"]
+    assert result.fan_out(
+        {"srtio3": "A", "srtio3-supercell": "B", "incus2": "C", "srtio3-strained": "D"}
+    ) == {
+        "srtio3": "A",
+        "srtio3-symmetrized": "A",
+        "srtio3-supercell": "B",
+        "srtio3-perturbed": "A",
+        "incus2": "C",
+        "srtio3-strained": "D",
+    }
+
+
+def test_exact_duplicates_skip_matching():
+    deduplicator = StructureDeduplicator()
+    structure = _load("N2_p1.cif")
+    deduplicator.add("a", structure)
+    deduplicator.matcher = None  # any call to the matcher would fail
+    assert deduplicator.add("b", structure.copy()) == "a"
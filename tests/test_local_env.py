@@ -1,10 +1,167 @@
-from xtal2txt.local_env import LocalEnvAnalyzer
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymatgen.core import Structure
+
+from xtal2txt import local_env
+from xtal2txt.local_env import (
+    HAS_OPENBABEL,
+    PARALLEL_MIN_SITES,
+    EnvironmentCache,
+    LocalEnvAnalyzer,
+    get_chemenv_engine,
+    star_smiles,
+    warm_up,
+)
+from xtal2txt.workers import get_shared_pool
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 def test_structure_to_local_env_string(get_incus2):
-    lea = LocalEnvAnalyzer()
+    lea = LocalEnvAnalyzer(smiles_backend="openbabel")
     incus2 = get_incus2
     string = lea.structure_to_local_env_string(incus2)
     print(string)
     expected = "I-42d\nCu+ (4a) [S][Cu]([S])([S])[S]\nIn3+ (4b) [S][In]([S])[S].[S]\nS2- (8d) [Cu]S([In])([In])[Cu]"
     assert string == expected
+
+
+def test_star_smiles():
+    assert star_smiles("Cu", ["S"] * 4) == "[S][Cu]([S])([S])[S]"
+    assert star_smiles("S", ["In", "Cu", "In", "Cu"]) == "[Cu]S([Cu])([In])[In]"
+    assert star_smiles("O", ["Ti", "Ti"]) == "[Ti]O[Ti]"
+    assert star_smiles("N", ["N"]) == "[N][N]"
+    assert star_smiles("Na", []) == "[Na]"
+
+
+def _atoms(line: str) -> tuple:
+    site, wyckoff, smiles = line.split(" ")
+    return site, wyckoff, sorted(Counter(re.findall(r"[A-Z][a-z]?", smiles)).items())
+
+
+@pytest.mark.skipif(not HAS_OPENBABEL, reason="openbabel is not installed")
+def test_native_and_openbabel_smiles_differ(get_incus2):
+    native, openbabel = [
+        LocalEnvAnalyzer(smiles_backend=backend).structure_to_local_env_string(
+            get_incus2
+        )
+        for backend in ("native", "openbabel")
+    ]
+    # the strings of a dataset depend on the backend
+    assert native != openbabel
+    assert "In3+ (4b) [S][In]([S])([S])[S]" in native.split("\n")
+    assert "In3+ (4b) [S][In]([S])[S].[S]" in openbabel.split("\n")
+
+
+@pytest.mark.skipif(not HAS_OPENBABEL, reason="openbabel is not installed")
+@pytest.mark.parametrize("cif", ["InCuS2_p1.cif", "SrTiO3_p1.cif", "TlCr5Se8_p1.cif"])
+def test_native_smiles_have_the_atoms_of_openbabel(cif):
+    structure = Structure.from_file(os.path.join(THIS_DIR, "data", cif))
+    native, openbabel = [
+        LocalEnvAnalyzer(smiles_backend=backend)
+        .structure_to_local_env_string(structure)
+        .split("\n")
+        for backend in ("native", "openbabel")
+    ]
+    assert native[0] == openbabel[0]
+    assert sorted(map(_atoms, native[1:])) == sorted(map(_atoms, openbabel[1:]))
+
+
+def test_unknown_smiles_backend():
+    with pytest.raises(ValueError, match="Unknown SMILES backend"):
+        LocalEnvAnalyzer(smiles_backend="rdkit")
+
+
+def test_chemenv_engine_is_reused_per_thread():
+    engine = get_chemenv_engine(1.4, 0.3)
+    assert get_chemenv_engine(1.4, 0.3) is engine
+    assert get_chemenv_engine(1.2, 0.3) is not engine
+    with ThreadPoolExecutor(1) as executor:
+        assert executor.submit(get_chemenv_engine, 1.4, 0.3).result() is not engine
+
+
+def test_environment_cache_lru_and_persistence(tmp_path):
+    cache = EnvironmentCache(max_size=2, path=tmp_path / "envs.json")
+    cache.set(("Ti4+", ("O2-",) * 6, "O:6", "native"), "[O][Ti]([O])([O])([O])([O])[O]")
+    cache.set(("O2-", ("Ti4+", "Ti4+"), "L:2", "native"), "[Ti]O[Ti]")
+    cache.get(("Ti4+", ("O2-",) * 6, "O:6", "native"))
+    cache.set(("Sr2+", ("O2-",), "S:1", "native"), "[O][Sr]")
+    assert len(cache) == 2
+    assert cache.get(("O2-", ("Ti4+", "Ti4+"), "L:2", "native")) is None
+    cache.save()
+    loaded = EnvironmentCache(path=tmp_path / "envs.json")
+    assert loaded.get(("Sr2+", ("O2-",), "S:1", "native")) == "[O][Sr]"
+    assert loaded.get(("Ti4+", ("O2-",) * 6, "O:6", "native")) is not None
+
+
+def test_local_env_with_environment_cache(get_incus2):
+    expected = LocalEnvAnalyzer(smiles_backend="native").structure_to_local_env_string(
+        get_incus2
+    )
+    cache = EnvironmentCache()
+    analyzer = LocalEnvAnalyzer(smiles_backend="native", env_cache=cache)
+    assert analyzer.structure_to_local_env_string(get_incus2) == expected
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert analyzer.structure_to_local_env_string(get_incus2) == expected
+    assert cache.hits == 3
+
+    envs, _, _ = analyzer.get_local_environments(get_incus2)
+    assert all(env["Molecule"] is None and env["SMILES"] for env in envs)
+
+    # Openbabel SMILES depend on the geometry and are not memoized
+    with pytest.warns(UserWarning, match="only memoizes the native"):
+        analyzer = LocalEnvAnalyzer(smiles_backend="openbabel", env_cache=cache)
+    analyzer.structure_to_local_env_string(get_incus2)
+    assert (cache.hits, cache.misses, len(cache)) == (6, 3, 3)
+
+
+def test_enable_env_cache_warns_with_openbabel_default(monkeypatch):
+    monkeypatch.setattr(local_env, "DEFAULT_SMILES_BACKEND", "openbabel")
+    try:
+        with pytest.warns(UserWarning, match="XTAL2TXT_SMILES_BACKEND=native"):
+            local_env.enable_env_cache()
+    finally:
+        local_env.disable_env_cache()
+
+
+def test_fast_mode(get_incus2):
+    exact = LocalEnvAnalyzer(smiles_backend="native").structure_to_local_env_string(
+        get_incus2
+    )
+    fast = LocalEnvAnalyzer(smiles_backend="native", mode="fast")
+    assert fast.structure_to_local_env_string(get_incus2) == exact
+    envs, _, _ = fast.get_local_environments(get_incus2)
+    assert all(env["Environment"] is None for env in envs)
+    with pytest.raises(ValueError, match="Unknown mode"):
+        LocalEnvAnalyzer(mode="voronoi")
+
+
+def test_parallel_sites_match_serial(get_incus2):
+    # displaced sites make all 16 sites of the cell inequivalent
+    structure = get_incus2.copy()
+    structure.perturb(0.05)
+    serial = LocalEnvAnalyzer(smiles_backend="native")
+    parallel = LocalEnvAnalyzer(smiles_backend="native", n_workers=2)
+    assert parallel.structure_to_local_env_string(
+        structure
+    ) == serial.structure_to_local_env_string(structure)
+
+
+def test_parallel_sites_reuse_the_shared_pool(get_incus2):
+    structure = get_incus2.copy()
+    structure.perturb(0.05)
+    analyzer = LocalEnvAnalyzer(smiles_backend="native", n_workers=2)
+    first = analyzer.structure_to_local_env_string(structure)
+    pool = get_shared_pool(
+        2, warm_up, (analyzer.distance_cutoff, analyzer.angle_cutoff)
+    )
+    pids = [worker.pid for worker in pool.workers]
+    assert analyzer.structure_to_local_env_string(structure) == first
+    assert get_shared_pool(2, warm_up, (1.4, 0.3)) is pool
+    assert [worker.pid for worker in pool.workers] == pids
+    # below the threshold the sites stay in the calling process
+    assert not analyzer._parallel(PARALLEL_MIN_SITES - 1)
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from xtal2txt import metrics
+from xtal2txt.core import TextRep
+from xtal2txt.metrics import LatencyHistogram
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.enable_metrics()
+    yield registry
+    metrics.disable_metrics()
+
+
+def test_latency_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for i in range(1, 101):
+        histogram.observe(i / 100)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == pytest.approx(0.5, rel=0.15)
+    assert histogram.quantile(0.99) == pytest.approx(0.99, rel=0.15)
+    assert histogram.quantile(1.0) == pytest.approx(1.0)
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_textrep_metrics(registry, get_incus2):
+    text_rep = TextRep.from_input(get_incus2)
+    text_rep._rep_registry["zmatrix"] = lambda dp: 1 / 0
+    text_rep.get_requested_text_reps(["composition", "composition", "zmatrix"])
+
+    snapshot = registry.snapshot()["representations"]
+    assert snapshot["composition"]["calls"] == 2
+    assert snapshot["composition"]["failures"] == 0
+    assert snapshot["zmatrix"]["failures"] == 1
+    assert snapshot["composition"]["p50_seconds"] > 0
+
+    assert json.loads(registry.to_json())["representations"]["zmatrix"]["calls"] == 1
+    prometheus = registry.to_prometheus()
+    assert (
+        'xtal2txt_representation_seconds_count{representation="composition"} 2'
+        in prometheus
+    )
+    assert (
+        'xtal2txt_representation_failures_total{representation="zmatrix"} 1'
+        in prometheus
+    )
+
+
+def test_metrics_disabled_by_default(get_incus2):
+    assert metrics.get_metrics() is None
+    TextRep.from_input(get_incus2).get_requested_text_reps("composition")
@@ -0,0 +1,43 @@
+from xtal2txt.core import TextRep
+from xtal2txt.plan import ExecutionPlan
+
+
+def test_plan_skips_unused_intermediates(get_incus2):
+    plan = ExecutionPlan(get_incus2, ["cif_p1", "composition", "zmatrix"])
+    assert plan.intermediates == []
+    plan = ExecutionPlan(
+        get_incus2, ["cif_symmetrized", "local_env", "atom_sequences_plusplus"]
+    )
+    assert plan.intermediates == [
+        "symmetrized_structure",
+        "element_symbols",
+        "lattice_parameters",
+    ]
+    assert plan.describe()["representations"]["local_env"] == ["symmetrized_structure"]
+
+
+def test_plan_computes_intermediates_once(get_incus2):
+    plan = ExecutionPlan(get_incus2, ["cif_symmetrized", "local_env"])
+    first = plan.get("symmetrized_structure")
+    assert plan.get("symmetrized_structure") is first
+    assert list(plan.seconds) == ["symmetrized_structure"]
+
+
+def test_requested_reps_use_plan(get_incus2):
+    reps = ["cif_symmetrized", "local_env", "atom_sequences", "crystal_text_llm"]
+    text_rep = TextRep(get_incus2)
+    results = text_rep.get_requested_text_reps(reps)
+    assert text_rep.plan.rep_names == reps
+    assert set(text_rep.plan.seconds) == {
+        "symmetrized_structure",
+        "element_symbols",
+        "lattice_parameters",
+    }
+    # without a plan, every generator computes its intermediates itself
+    direct = TextRep(get_incus2)
+    assert results == {
+        "cif_symmetrized": direct.get_cif_string("symmetrized", 2),
+        "local_env": direct.get_local_env_rep(),
+        "atom_sequences": direct.get_atom_sequences_plusplus(False, 2),
+        "crystal_text_llm": direct.get_crystal_text_llm(),
+    }
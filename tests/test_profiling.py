@@ -0,0 +1,60 @@
+import pstats
+
+import pytest
+
+from xtal2txt.core import TextRep
+from xtal2txt.profiling import SlowestProfiles
+
+
+def test_slowest_profiles(get_incus2, tmp_path):
+    profiler = SlowestProfiles(tmp_path, n=2)
+    text_rep = TextRep.from_input(get_incus2, structure_id="InCuS2", profiler=profiler)
+    text_rep.get_requested_text_reps(
+        ["composition", "atom_sequences", "cif_symmetrized", "cif_p1"]
+    )
+
+    entries = profiler.entries()
+    assert len(entries) == 2
+    assert entries[0].seconds >= entries[1].seconds
+    assert entries[0].structure_id == "InCuS2"
+    # only the files of the kept profiles remain
+    assert len(list(tmp_path.glob("*.pstats"))) == 2
+    assert len(list(tmp_path.glob("*.cif"))) == 2
+    for entry in entries:
+        assert pstats.Stats(str(entry.pstats_path)).total_calls > 0
+        assert entry.cif_path.read_text().startswith("# generated using pymatgen")
+    assert "InCuS2" in profiler.report()
+
+
+def test_slowest_profiles_skip_supervised_calls(get_incus2, tmp_path):
+    profiler = SlowestProfiles(tmp_path, n=5)
+    text_rep = TextRep.from_input(get_incus2, structure_id="InCuS2", profiler=profiler)
+    text_rep.get_requested_text_reps(
+        ["composition", "cif_p1"], timeout={"composition": 60}
+    )
+    # the supervised call would only profile the parent waiting on the pipe
+    assert [entry.rep_name for entry in profiler.entries()] == ["cif_p1"]
+    with pytest.raises(ValueError, match="concurrent"):
+        text_rep.get_requested_text_reps(["composition", "cif_p1"], concurrent=True)
+
+
+def test_profile_memory(get_incus2):
+    text_rep = TextRep.from_input(get_incus2)
+    text_rep.get_requested_text_reps(["composition", "cif_p1"], profile_memory=True)
+    assert set(text_rep.memory_usage) == {"composition", "cif_p1"}
+    usage = text_rep.memory_usage["cif_p1"]
+    assert usage["peak_traced_bytes"] > 0
+    assert isinstance(usage["rss_delta_bytes"], int)
+
+    # stale numbers are dropped when a representation is generated without profiling
+    text_rep.get_requested_text_reps("cif_p1")
+    assert "cif_p1" not in text_rep.memory_usage
+
+
+def test_profile_memory_in_worker(get_incus2):
+    text_rep = TextRep.from_input(get_incus2)
+    text_rep.get_requested_text_reps(
+        ["composition", "cif_p1"], timeout={"cif_p1": 60}, profile_memory=True
+    )
+    assert set(text_rep.memory_usage) == {"composition", "cif_p1"}
+    assert text_rep.memory_usage["cif_p1"]["peak_traced_bytes"] > 0
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pymatgen.core import Structure
+
+from xtal2txt.core import TextRep
+from xtal2txt.server import MicroBatcher, Xtal2txtService, create_server
+from xtal2txt.tokenizer import CompositionTokenizer
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    service = Xtal2txtService(
+        reps=["composition", "crystal_text_llm"],
+        n_workers=1,
+        tokenizer_names=["composition"],
+    )
+    service.start()
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def _request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+        return response.headers.get("Content-Type"), response.read().decode("utf-8")
+
+
+def test_micro_batcher_batches_concurrent_requests():
+    batcher = MicroBatcher(window=0.5)
+    try:
+        texts = ["Sr1Ti1O3", "N4", "In1Cu1S2"]
+        futures = [batcher.submit("composition", [text]) for text in texts]
+        tokenizer = CompositionTokenizer()
+        assert [future.result()[0] for future in futures] == tokenizer(texts)[
+            "input_ids"
+        ]
+        assert batcher.n_batches == 1
+        assert batcher.n_texts == 3
+        with pytest.raises(ValueError, match="Unknown tokenizer"):
+            batcher.submit("unknown", ["N4"])
+    finally:
+        batcher.close()
+
+
+def test_server_health_and_tokenize(server_url):
+    _, body = _request(f"{server_url}/health")
+    health = json.loads(body)
+    assert health["status"] == "ok"
+    assert health["tokenizers"] == ["composition"]
+
+    with ThreadPoolExecutor(2) as executor:
+        responses = list(
+            executor.map(
+                lambda text: json.loads(
+                    _request(
+                        f"{server_url}/tokenize",
+                        {"tokenizer": "composition", "texts": [text]},
+                    )[1]
+                ),
+                ["Sr1Ti1O3", "N4"],
+            )
+        )
+    expected = CompositionTokenizer()(["Sr1Ti1O3", "N4"])["input_ids"]
+    assert [response["input_ids"][0] for response in responses] == expected
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _request(f"{server_url}/tokenize", {"tokenizer": "unknown", "texts": ["N4"]})
+    assert error.value.code == 400
+
+
+def test_server_streams_representations(server_url):
+    path = os.path.join(THIS_DIR, "data", "SrTiO3_p1.cif")
+    with open(path) as file:
+        cif = file.read()
+    n2 = Structure.from_file(os.path.join(THIS_DIR, "data", "N2_p1.cif"))
+    content_type, body = _request(
+        f"{server_url}/represent",
+        {
+            "structures": [
+                {"id": "srtio3", "cif": cif},
+                {"id": "n2", "structure": n2.as_dict()},
+                {"id": "broken", "cif": "not a cif"},
+            ],
+            "reps": ["composition"],
+            "tokenize": True,
+        },
+    )
+    assert content_type == "application/x-ndjson"
+    records = {record["id"]: record for record in map(json.loads, body.splitlines())}
+    assert set(records) == {"srtio3", "n2", "broken"}
+    composition = TextRep.from_input(path).get_composition()
+    assert records["srtio3"]["representations"] == {"composition": composition}
+    assert (
+        records["srtio3"]["tokens"]["composition"]
+        == (CompositionTokenizer()(composition)["input_ids"])
+    )
+    assert "input" in records["broken"]["errors"]
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _request(f"{server_url}/represent", {"structures": [{}]})
+    assert error.value.code == 400
+
+    _, body = _request(f"{server_url}/metrics")
+    assert 'xtal2txt_representation_seconds_count{representation="composition"}' in (
+        body
+    )
+    _, body = _request(f"{server_url}/metrics?format=json")
+    assert json.loads(body)["representations"]["composition"]["calls"] >= 2
+
+
+def test_service_survives_worker_crash():
+    service = Xtal2txtService(reps=["composition"], n_workers=1, tokenizer_names=[])
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        for path in ["/health", "/represent"]:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                _request(f"{url}{path}", None if path == "/health" else {})
+            assert error.value.code == 503
+
+        service.start()
+        assert service.health()["status"] == "ok"
+        worker = service._pool.workers[0]
+        worker._process.kill()
+        worker._process.join()
+        health = service.health()
+        assert (health["status"], health["workers_alive"]) == ("degraded", 0)
+        with open(os.path.join(THIS_DIR, "data", "N2_p1.cif")) as file:
+            cif = file.read()
+        (record,) = service.represent([{"id": "n2", "cif": cif}], ["composition"])
+        assert record["representations"]["composition"]
+        assert service.health()["status"] == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_service_workers_preload_supervised_reps_and_tokenizers():
+    service = Xtal2txtService(
+        reps=["composition", "local_env"],
+        n_workers=1,
+        tokenizer_names=["composition", "smiles"],
+    )
+    try:
+        service.start()
+        warm_up = service._pool.workers[0].warm_up
+        # local_env is warm both in the worker and in its supervised worker
+        assert {
+            "composition",
+            "local_env",
+            "supervised:local_env",
+            "tokenizer:composition",
+            "tokenizer:smiles",
+        } <= set(warm_up)
+
+        path = os.path.join(THIS_DIR, "data", "SrTiO3_p1.cif")
+        with open(path) as file:
+            cif = file.read()
+        (record,) = service.represent(
+            [{"id": "srtio3", "cif": cif}], timeout=120, tokenize=True
+        )
+        composition = TextRep.from_input(path).get_composition()
+        assert (
+            record["tokens"]["composition"]
+            == (CompositionTokenizer()(composition)["input_ids"])
+        )
+        assert set(record["tokens"]) == {"composition", "local_env"}
+        # the tokenization in the worker is recorded in the metrics of the service
+        assert service.registry.snapshot()["tokenizers"]
+    finally:
+        service.close()
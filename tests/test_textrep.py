@@ -1,4 +1,4 @@
-from xtal2txt.core import TextRep
+from xtal2txt.core import TextRep, generate_representation
 import os
 import pytest
 from pymatgen.core import Structure
@@ -63,6 +63,58 @@ def test_get_crystal_llm_rep() -> None:
     assert N2.get_crystal_text_llm() == expected_output
 
 
+def test_get_crystal_text_llm_views() -> None:
+    views = srtio3_p1.get_crystal_text_llm_views(4, seed=1)
+    assert len(views) == 4
+    for view_index, view in enumerate(views):
+        assert view == srtio3_p1.get_crystal_text_llm(
+            permute_atoms=True, seed=1, view_index=view_index
+        )
+        assert view.split("\n")[:2] == srtio3_p1.get_crystal_text_llm().split("\n")[:2]
+    assert len(set(views)) > 1
+
+
+def test_get_requested_text_reps_concurrent() -> None:
+    reps = ["cif_p1", "composition", "zmatrix", "crystal_text_llm", "local_env"]
+    concurrent = srtio3_p1.get_requested_text_reps(reps, concurrent=True)
+    assert concurrent == srtio3_p1.get_requested_text_reps(reps)
+    assert list(concurrent) == reps
+    with pytest.raises(ValueError, match="concurrent"):
+        srtio3_p1.get_requested_text_reps(reps, profile_memory=True, concurrent=True)
+
+
+def test_get_requested_text_reps_deadline() -> None:
+    reps = ["local_env", "composition", "crystal_text_llm"]
+    text_rep = TextRep.from_input(srtio3_p1.structure)
+    assert text_rep.get_requested_text_reps(reps, deadline=0) == dict.fromkeys(reps)
+    assert set(text_rep.timeouts) == set(reps)
+
+    results = text_rep.get_requested_text_reps(reps, deadline=600)
+    assert results == srtio3_p1.get_requested_text_reps(reps)
+    assert list(results) == reps
+    assert text_rep.timeouts == {}
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_deadline_bounds_heavy_reps_in_subprocesses(monkeypatch, concurrent) -> None:
+    reps = ["zmatrix", "composition", "local_env", "cif_p1", "crystal_text_llm"]
+    text_rep = TextRep.from_input(srtio3_p1.structure)
+    budgets = {}
+
+    def run_supervised(rep_name, decimal_places, timeout, worker, profile_memory):
+        budgets[rep_name] = (timeout, worker)
+        return generate_representation(text_rep.structure, rep_name, decimal_places)
+
+    monkeypatch.setattr(text_rep, "_run_supervised", run_supervised)
+    results = text_rep.get_requested_text_reps(reps, deadline=30, concurrent=concurrent)
+    assert results == srtio3_p1.get_requested_text_reps(reps)
+    # the millisecond representations stay in this process
+    assert set(budgets) == {"local_env"}
+    timeout, worker = budgets["local_env"]
+    assert 0 < timeout <= 30
+    assert worker == ("local_env" if concurrent else None)
+
+
 def test_robocrys_for_cif_format() -> None:
     assert srtio3_p1.get_robocrys_rep() == srtio3_symmetrized.get_robocrys_rep()
 
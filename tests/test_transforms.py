@@ -0,0 +1,206 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from pymatgen.core import Structure
+
+from xtal2txt.core import TextRep
+from xtal2txt.transforms import (
+    TransformationCallback,
+    augment_batch,
+    compile_transformations,
+    derive_seed,
+)
+
+
+def test_augment_batch_permutation(get_incus2):
+    views = augment_batch(get_incus2, [("permute_structure", {})], n_views=4)
+    assert len(views) == 4
+    assert views.frac_coords.shape == (4, len(get_incus2), 3)
+    for order, view in zip(views.orders, views):
+        assert sorted(order) == list(range(len(get_incus2)))
+        assert [site.species_string for site in view] == [
+            get_incus2[i].species_string for i in order
+        ]
+        assert np.allclose(view.frac_coords, get_incus2.frac_coords[order])
+    assert not all((order == views.orders[0]).all() for order in views.orders[1:])
+
+
+def test_augment_batch_is_deterministic_per_view(get_incus2):
+    transformations = [
+        ("permute_structure", {}),
+        ("translate_structure", {}),
+        ("translate_single_atom", {"max_indices": 2}),
+        ("perturb_structure", {"max_distance": 0.1}),
+    ]
+    few = augment_batch(get_incus2, transformations, n_views=2, seed=7)
+    many = augment_batch(get_incus2, transformations, n_views=5, seed=7)
+    assert np.array_equal(few.frac_coords, many.frac_coords[:2])
+    assert np.array_equal(few.orders, many.orders[:2])
+    other = augment_batch(get_incus2, transformations, n_views=2, seed=8)
+    assert not np.allclose(few.frac_coords, other.frac_coords)
+    assert ((many.frac_coords >= 0) & (many.frac_coords < 1)).all()
+
+
+def test_augment_batch_matches_transformation_callback(get_incus2):
+    transformations = [
+        ("permute_structure", {}),
+        ("translate_structure", {"seed": 3}),
+        ("translate_single_atom", {"max_indices": 2}),
+        ("perturb_structure", {"max_distance": 0.1, "min_distance": 0.05}),
+    ]
+    views = augment_batch(
+        get_incus2, transformations, n_views=4, seed=7, structure_id="incus2"
+    )
+    for view_index, view in enumerate(views):
+        expected = get_incus2
+        for name, params in transformations:
+            expected = getattr(TransformationCallback, name)(
+                expected,
+                **{"seed": 7, **params},
+                structure_id="incus2",
+                view_index=view_index,
+            )
+        assert np.allclose(view.frac_coords, expected.frac_coords)
+        assert [site.species_string for site in view] == [
+            site.species_string for site in expected
+        ]
+
+
+def test_augment_batch_perturbation(get_incus2):
+    views = augment_batch(
+        get_incus2, [("perturb_structure", {"max_distance": 0.2})], n_views=3
+    )
+    for view in views:
+        distances = [
+            site.distance(original) for site, original in zip(view, get_incus2)
+        ]
+        # every site of a view is displaced by the same distance
+        assert np.allclose(distances, distances[0])
+        assert 0 <= distances[0] <= 0.2
+
+
+def test_augment_batch_unknown_transformation(get_incus2):
+    with pytest.raises(ValueError, match="Unknown transformation"):
+        augment_batch(get_incus2, [("rotate_structure", {})], n_views=1)
+
+
+def test_derive_seed():
+    assert derive_seed(42) == 42
+    assert derive_seed(42, "a", 0) == derive_seed(42, "a", 0)
+    assert derive_seed(42, "a", 0) != derive_seed(42, "b", 0)
+    assert derive_seed(42, "a", 0) != derive_seed(42, "a", 1)
+    assert 0 <= derive_seed(42, "a", 1) < 2**32
+
+
+def test_transformations_leave_global_state(get_incus2):
+    random.seed(0)
+    np.random.seed(0)
+    expected = (random.random(), np.random.random())
+    random.seed(0)
+    np.random.seed(0)
+    original = get_incus2.frac_coords.copy()
+    TransformationCallback.permute_structure(get_incus2, seed=1)
+    TransformationCallback.translate_structure(get_incus2, seed=1)
+    TransformationCallback.perturb_structure(get_incus2, max_distance=0.1, seed=1)
+    assert (random.random(), np.random.random()) == expected
+    assert np.array_equal(get_incus2.frac_coords, original)
+
+
+def test_transformations_are_reproducible_across_threads(get_incus2):
+    def transform(view_index):
+        structure = TransformationCallback.permute_structure(
+            get_incus2, seed=3, structure_id="incus2", view_index=view_index
+        )
+        structure = TransformationCallback.perturb_structure(
+            structure, 0.1, seed=3, structure_id="incus2", view_index=view_index
+        )
+        return structure.frac_coords
+
+    serial = [transform(view_index) for view_index in range(16)]
+    with ThreadPoolExecutor(4) as executor:
+        threaded = list(executor.map(transform, range(16)))
+    assert all(np.array_equal(a, b) for a, b in zip(serial, threaded))
+    assert not np.allclose(serial[0], serial[1])
+
+
+def test_crystal_text_llm_seeded_permutation(get_incus2):
+    text_rep = TextRep(get_incus2, structure_id="incus2")
+    permuted = text_rep.get_crystal_text_llm(permute_atoms=True, seed=5, view_index=0)
+    assert permuted == text_rep.get_crystal_text_llm(
+        permute_atoms=True, seed=5, view_index=0
+    )
+    assert sorted(permuted.split("\n")[2:]) == sorted(
+        text_rep.get_crystal_text_llm().split("\n")[2:]
+    )
+
+
+def _apply_with_pymatgen(structure, transformations):
+    """Apply transformations with the site operations of pymatgen, drawing the random
+    numbers as documented for the `TransformationCallback` methods."""
+    structure = structure.copy()
+    n_sites = len(structure)
+    for name, params in transformations:
+        seed = derive_seed(
+            params.get("seed", 42), params.get("structure_id"), params.get("view_index")
+        )
+        if name == "permute_structure":
+            permutation = list(range(n_sites))
+            random.Random(seed).shuffle(permutation)
+            structure = Structure.from_sites([structure[i] for i in permutation])
+        elif name == "translate_structure":
+            vector = params.get("vector")
+            if vector is None:
+                vector = np.random.RandomState(seed).uniform(size=(3,))
+            structure.translate_sites(
+                list(range(n_sites)),
+                vector,
+                frac_coords=params.get("frac_coords", True),
+                to_unit_cell=params.get("to_unit_cell", True),
+            )
+        elif name == "translate_single_atom":
+            indices = random.Random(seed).sample(
+                range(n_sites), min(params.get("max_indices", 1), n_sites)
+            )
+            structure.translate_sites(
+                indices,
+                params.get("vector", [0.25, 0.25, 0.25]),
+                to_unit_cell=params.get("to_unit_cell", True),
+            )
+        elif name == "perturb_structure":
+            distance = random.Random(seed).uniform(0, params["max_distance"])
+            state = np.random.RandomState(seed)
+            vectors = state.standard_normal((n_sites, 3))
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            for i, vector in enumerate(vectors):
+                structure.translate_sites([i], vector * distance, frac_coords=False)
+    return structure
+
+
+def test_compiled_transformations_match_pymatgen(get_incus2):
+    transformations = [
+        ("permute_structure", {"seed": 1}),
+        (
+            "translate_structure",
+            {"seed": 2, "vector": [1.0, 0.5, 0.0], "frac_coords": False},
+        ),
+        ("perturb_structure", {"max_distance": 0.1, "seed": 3, "view_index": 1}),
+        # splits the update, an offset without wrapping after a wrapped one
+        ("translate_structure", {"vector": [0.7, 0.0, 0.0], "to_unit_cell": False}),
+        ("translate_single_atom", {"max_indices": 2, "seed": 4}),
+        ("translate_structure", {"seed": 6}),
+        ("permute_structure", {"seed": 5, "structure_id": "incus2"}),
+    ]
+    expected = _apply_with_pymatgen(get_incus2, transformations)
+    compiled = compile_transformations(transformations)(get_incus2)
+    assert np.allclose(compiled.frac_coords, expected.frac_coords)
+    assert [site.species_string for site in compiled] == [
+        site.species_string for site in expected
+    ]
+
+    sequential = get_incus2
+    for name, params in transformations:
+        sequential = getattr(TransformationCallback, name)(sequential, **params)
+    assert np.allclose(sequential.frac_coords, expected.frac_coords)
+    assert TextRep(get_incus2, transformations).structure == compiled
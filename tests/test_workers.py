@@ -0,0 +1,160 @@
+import os
+import time
+
+import pytest
+
+from xtal2txt.core import TextRep, generate_representation
+from xtal2txt.preload import init_worker, preload, preload_tokenizers
+from xtal2txt.workers import (
+    RepresentationTimeout,
+    SupervisedWorker,
+    WorkerCrashed,
+    WorkerPool,
+    configure_shared_workers,
+    get_shared_worker,
+)
+from xtal2txt.tokenizer import CifTokenizer, RobocrysTokenizer
+
+
+def test_supervised_worker_recycles_after_timeout_and_crash():
+    worker = SupervisedWorker()
+    try:
+        assert worker.run(divmod, 7, 2) == (3, 1)
+        with pytest.raises(ZeroDivisionError):
+            worker.run(divmod, 1, 0)
+
+        pid = worker.pid
+        with pytest.raises(RepresentationTimeout):
+            worker.run(time.sleep, 60, timeout=0.5)
+        # the killed process is replaced right away
+        assert worker.pid not in (None, pid)
+
+        with pytest.raises(WorkerCrashed):
+            worker.run(os._exit, 1)
+
+        assert worker.run(divmod, 7, 2) == (3, 1)
+        assert worker.pid != pid
+    finally:
+        worker.close()
+
+
+def test_supervised_worker_budget_includes_cold_start(get_incus2):
+    worker = SupervisedWorker(initializer=preload, initargs=(["composition"],))
+    try:
+        # preloading xtal2txt.core in the new process takes far longer than the budget
+        start = time.monotonic()
+        with pytest.raises(RepresentationTimeout):
+            worker.run(
+                generate_representation, get_incus2, "composition", 2, timeout=0.2
+            )
+        assert time.monotonic() - start < 2
+        pid = worker.pid
+        assert pid is not None
+
+        worker.start()
+        result = worker.run(
+            generate_representation, get_incus2, "composition", 2, timeout=5
+        )
+        assert result == TextRep.from_input(get_incus2).get_composition()
+        # the process kept warming up after the first call gave up on it
+        assert worker.pid == pid
+    finally:
+        worker.close()
+
+
+def test_supervised_worker_preloads_and_recycles():
+    worker = SupervisedWorker(
+        initializer=preload, initargs=(["composition"],), max_tasks=2
+    )
+    try:
+        worker.start()
+        assert set(worker.warm_up) == {"composition", "total"}
+        assert worker.warm_up_seconds >= worker.warm_up["total"]
+
+        pids = [worker.run(os.getpid) for _ in range(3)]
+        assert pids[0] == pids[1] != pids[2]
+        assert worker.recycled == 1
+        assert worker.rss_bytes > 0
+
+        worker.max_tasks, worker.max_rss_bytes = None, 1
+        assert worker.run(os.getpid) != worker.run(os.getpid)
+        assert worker.recycled == 3
+    finally:
+        worker.close()
+
+
+def test_preload_rejects_unknown_representations():
+    with pytest.raises(ValueError, match="unknown_rep"):
+        preload(["composition", "unknown_rep"])
+
+
+def test_configure_shared_workers():
+    try:
+        configure_shared_workers(max_tasks=10, max_rss_bytes=2 * 1024**3)
+        worker = get_shared_worker("configured")
+        assert (worker.max_tasks, worker.max_rss_bytes) == (10, 2 * 1024**3)
+    finally:
+        configure_shared_workers()
+    assert get_shared_worker("configured").max_tasks is None
+
+
+def test_textrep_timeouts(get_incus2):
+    text_rep = TextRep.from_input(get_incus2)
+    results = text_rep.get_requested_text_reps(
+        ["composition", "robocrys_rep"],
+        timeout={"composition": 120, "robocrys_rep": 0.001},
+    )
+    assert results["composition"] == text_rep.get_composition()
+    assert results["robocrys_rep"] is None
+    assert text_rep.timeouts == {"robocrys_rep": 0.001}
+    assert "robocrys_rep" not in text_rep.errors
+
+
+def test_worker_pool_restarts_crashed_workers():
+    pool = WorkerPool(2, initializer=preload, initargs=(["composition"],))
+    try:
+        assert len(pool.start()) == 2
+        pids = {worker.pid for worker in pool.workers}
+        with pytest.raises(WorkerCrashed):
+            pool.submit(os._exit, 1).result()
+        assert pool.crashes == 1
+        # the crashed worker is warmed up again before the call fails
+        assert all(worker.is_alive() for worker in pool.workers)
+        assert {worker.pid for worker in pool.workers} != pids
+        futures = [pool.submit(divmod, 7, 2) for _ in range(4)]
+        assert [future.result() for future in futures] == [(3, 1)] * 4
+    finally:
+        pool.shutdown()
+    assert not any(worker.is_alive() for worker in pool.workers)
+
+
+def _shared_worker_pids(n_tasks):
+    worker = get_shared_worker()
+    return worker.pid, [worker.run(os.getpid) for _ in range(n_tasks)]
+
+
+def test_init_worker_preloads_and_recycles_supervised_workers():
+    pool = WorkerPool(
+        1,
+        initializer=init_worker,
+        initargs=(["composition", "crystal_text_llm"], ["composition"], 2),
+        max_tasks=2,
+    )
+    try:
+        pool.start()
+        (worker,) = pool.workers
+        assert set(worker.warm_up) == {"composition", "crystal_text_llm", "total"}
+        pid = worker.pid
+        # the supervised worker was started by the initializer
+        started_pid, pids = pool.submit(_shared_worker_pids, 3).result()
+        assert started_pid == pids[0] == pids[1] != pids[2]
+        assert pool.submit(os.getpid).result() == pid
+        assert pool.submit(os.getpid).result() != pid
+    finally:
+        pool.shutdown()
+
+
+def test_preload_tokenizers():
+    tokenizers = {"cif": CifTokenizer(), "robocrys": RobocrysTokenizer()}
+    assert set(preload_tokenizers(tokenizers)) == {"cif"}
+    assert "_vocab_pattern" in tokenizers["cif"].__dict__
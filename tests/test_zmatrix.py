@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Molecule, Structure
+
+from xtal2txt.core import TextRep
+from xtal2txt.zmatrix import get_zmatrix
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+CIFS = sorted(
+    f for f in os.listdir(os.path.join(THIS_DIR, "data")) if f.endswith(".cif")
+)
+
+
+def _pymatgen_zmatrix(structure: Structure, decimal_places: int) -> str:
+    """Z-matrix of `Molecule.get_zmatrix` with the variables replaced by their values,
+    bond lengths rounded to `decimal_places` and angles to integers."""
+    species = [s.element if hasattr(s, "element") else s for s in structure.species]
+    zmatrix = Molecule(species, structure.cart_coords).get_zmatrix()
+    lines = [line for line in zmatrix.split("\n") if line.strip()]
+    values = {}
+    for line in lines:
+        if "=" in line:
+            name, value = line.split("=")
+            value = float(value.strip())
+            values[name] = (
+                f"{round(value, decimal_places):.{decimal_places}f}"
+                if name.startswith("B")
+                else f"{int(round(value))}"
+            )
+    return "\n".join(
+        " ".join(values.get(part, part) for part in line.split())
+        for line in lines
+        if "=" not in line
+    )
+
+
+@pytest.mark.parametrize("cif", CIFS)
+@pytest.mark.parametrize("decimal_places", [1, 3])
+def test_zmatrix_matches_pymatgen(cif, decimal_places):
+    structure = Structure.from_file(os.path.join(THIS_DIR, "data", cif))
+    assert get_zmatrix(structure, decimal_places) == _pymatgen_zmatrix(
+        structure, decimal_places
+    )
+
+
+def test_zmatrix_rep_supercell():
+    structure = Structure.from_file(os.path.join(THIS_DIR, "data", "SrTiO3_p1.cif"))
+    structure.make_supercell([3, 2, 2])
+    assert TextRep(structure).get_zmatrix_rep(2) == _pymatgen_zmatrix(structure, 2)
+
+
+def test_zmatrix_minimum_image():
+    structure = Structure(
+        Lattice.cubic(10), ["H", "H"], [[0.01, 0.5, 0.5], [0.99, 0.5, 0.5]]
+    )
+    assert get_zmatrix(structure, 2) == "H\nH 1 9.80"
+    assert get_zmatrix(structure, 2, minimum_image=True) == "H\nH 1 0.20"
+    assert np.isclose(
+        structure.get_distance(0, 1),
+        float(get_zmatrix(structure, 2, minimum_image=True).split()[-1]),
+    )
@@ -1,5 +1,5 @@
 import pytest
-from xtal2txt.tokenizer import CompositionTokenizer
+from xtal2txt.tokenizer import CompositionTokenizer, RobocrysTokenizer
 
 
 @pytest.fixture
@@ -51,3 +51,37 @@ def test_encode_decode(tokenizer):
 def test_tokenizer(tokenizer, input_string, expected):
     tokens = tokenizer.tokenize(input_string)
     assert tokens == expected
+
+
+def test_tokenizer_metrics(tokenizer):
+    from xtal2txt import metrics
+
+    registry = metrics.enable_metrics()
+    try:
+        tokens = tokenizer.tokenize("SrTiO3")
+    finally:
+        metrics.disable_metrics()
+    stats = registry.snapshot()["tokenizers"]["CompositionTokenizer"]
+    assert stats["calls"] == 1
+    assert stats["tokens"] == len(tokens)
+
+
+def test_tokenizer_metrics_exclude_padding():
+    from xtal2txt import metrics
+
+    tokenizer = CompositionTokenizer()
+    n_tokens = len(tokenizer.tokenize("SrTiO3"))
+    tokenizer.enable_padding(n_tokens + 10)
+    robocrys = RobocrysTokenizer()
+    texts = ["SrTiO3 is Perovskite structured.", "N2 is molecular."]
+    lengths = [len(robocrys.encode(text)) for text in texts]
+
+    registry = metrics.enable_metrics()
+    try:
+        assert len(tokenizer.tokenize("SrTiO3")) == n_tokens + 10
+        robocrys(texts, padding=True)
+    finally:
+        metrics.disable_metrics()
+    stats = registry.snapshot()["tokenizers"]
+    assert stats["CompositionTokenizer"]["tokens"] == n_tokens
+    assert stats["RobocrysTokenizer"]["tokens"] == sum(lengths)